@@ -1,12 +1,11 @@
 import asyncio
-import base64
 import os
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Any, Callable, Dict, List, Optional, Union
 
 from fastapi import Depends, FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import JSONResponse, Response
 from nicegui import app as nicegui_app
 from nicegui import ui
 from slowapi import _rate_limit_exceeded_handler
@@ -14,11 +13,31 @@ from slowapi.errors import RateLimitExceeded
 from starlette.middleware.base import BaseHTTPMiddleware
 from tinydb import Query
 
-from db.db import check_db_access, search_with_logging
+from css.stylesheets import (
+    LANDING_STYLESHEET,
+    RECONNECT_SCRIPT,
+    script_tag,
+    stylesheet_link,
+)
+from db.db import USAGE_DAILY_TABLE, aget, check_db_access
 from models.schemas import AppInfoResponse
 from observatory import observatory
+from observatory_static import start_snapshots
+from utils.assets import (
+    ASSETS_PATH,
+    StaticAsset,
+    asset_response,
+    build_asset,
+    get_asset,
+)
+from utils.clients import SWEEP_INTERVAL, client_stats, sweep_idle_clients
+from utils.generate_projects import project_flights
 from utils.limiter import limiter
 from utils.logger import get_logger
+from utils.media import LOGO
+from utils.openai_scheduler import openai_scheduler
+from utils.profiling import lap, profile_stats, profiled, reset_profile_stats
+from utils.project_cache import project_cache
 
 logger = get_logger(__name__)
 
@@ -103,35 +122,48 @@ nicegui_app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handle
 nicegui_app.add_middleware(LocalOnlyMiddleware)
 # --- End Apply Local Only Middleware ---
 
+# Render (or clear) the static observatory snapshot once the app is up
+nicegui_app.on_startup(start_snapshots)
 
-@nicegui_app.exception_handler(429)
-async def ratelimit_handler(request, exc):
+# Delete clients left idle, as the page's own idle script would
+nicegui_app.timer(SWEEP_INTERVAL, sweep_idle_clients)
+
+
+def build_limited_page() -> StaticAsset:
+    """Build the 429 page once, with the logo pointing at its cached variants."""
     try:
         # Read the limited.html file
         with open("./limited.html", "r") as f:
             html_content = f.read()
 
-        # Read and encode the logo image
-        try:
-            with open("img/logo.png", "rb") as img_file:
-                logo_base64 = base64.b64encode(img_file.read()).decode()
+        # Point the logo at the fingerprinted copy served by the app
+        html_content = html_content.replace(
+            'src="/img/logo.png"',
+            f'src="{LOGO.assets["png", 1].url}" srcset="{LOGO.srcset("png")}"',
+        )
+    except Exception as e:
+        logger.error(f"Error loading limited.html: {str(e)}")
+        # Fallback page if we can't load the HTML file
+        html_content = "<html><body><h1>Rate limit exceeded</h1><p>Please try again tomorrow.</p></body></html>"
+    return build_asset("limited.html", html_content.encode("utf-8"), compress=True)
 
-            # Replace the image placeholder with the actual base64 image
-            html_content = html_content.replace(
-                'src="/img/logo.png"', f'src="data:image/png;base64,{logo_base64}"'
-            )
-        except Exception as img_error:
-            logger.error(f"Error encoding logo: {str(img_error)}")
-            # If we can't encode the logo, the fallback in the HTML will work
 
-        return HTMLResponse(content=html_content, status_code=429)
-    except Exception as e:
-        logger.error(f"Error serving limited.html: {str(e)}")
-        # Fallback response if we can't load the HTML file
-        return HTMLResponse(
-            content="<html><body><h1>Rate limit exceeded</h1><p>Please try again tomorrow.</p></body></html>",
-            status_code=429,
-        )
+# Rate-limited floods are served from memory, without touching the disk
+LIMITED_PAGE = build_limited_page()
+
+
+@nicegui_app.exception_handler(429)
+async def ratelimit_handler(request, exc):
+    return asset_response(LIMITED_PAGE, request, "no-cache", status_code=429)
+
+
+@nicegui_app.get(ASSETS_PATH + "/{filename}")
+async def static_asset(request: Request, filename: str):
+    """Serve a fingerprinted static asset from memory."""
+    asset = get_asset(filename)
+    if asset is None:
+        return Response(status_code=404)
+    return asset_response(asset, request)
 
 
 # Health check endpoint
@@ -171,32 +203,17 @@ async def token_usage_stats(request: Request):
             date = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
             dates.append(date)
 
-        Usage = Query()
+        Daily = Query()
         usage_stats = {}
 
-        # Get usage for each date
+        # Read the per-day totals maintained alongside the usage log
         for date in dates:
-            logs = search_with_logging("openai_usage_log", Usage.date == date)
-
-            # Sum successful API calls
-            total_tokens = sum(
-                log.get("tokens_used", 0)
-                for log in logs
-                if log.get("status") == "success"
-            )
-
-            # Get breakdown by endpoint
-            endpoint_usage = {}
-            for log in logs:
-                if log.get("status") == "success":
-                    endpoint = log.get("endpoint", "unknown")
-                    tokens = log.get("tokens_used", 0)
-                    endpoint_usage[endpoint] = endpoint_usage.get(endpoint, 0) + tokens
+            day = await aget(USAGE_DAILY_TABLE, Daily.date == date) or {}
 
             # Add to results
             usage_stats[date] = {
-                "total_tokens": total_tokens,
-                "endpoints": endpoint_usage,
+                "total_tokens": day.get("tokens_used", 0),
+                "endpoints": day.get("endpoints", {}),
             }
 
         logger.info(f"✅ Retrieved token usage for {len(dates)} days")
@@ -217,6 +234,41 @@ async def token_usage_stats(request: Request):
         )
 
 
+@nicegui_app.get("/api/clients")
+async def get_client_stats():
+    """Live NiceGUI clients, their element counts and approximate memory."""
+    stats = client_stats()
+    logger.info(
+        f"👥 {stats['clients']} clients | {stats['elements']} elements | "
+        f"~{stats['approx_bytes'] // 1024} KB | RSS {stats['rss_bytes'] // 2**20} MB"
+    )
+    return JSONResponse(content=stats)
+
+
+@nicegui_app.get("/api/cache")
+async def get_project_cache_stats():
+    """Entries and hit counts of the project answer cache."""
+    stats = project_cache.stats()
+    stats["flights"] = project_flights.stats()
+    return JSONResponse(content=stats)
+
+
+@nicegui_app.get("/api/openai")
+async def get_openai_queue_stats():
+    """Running and queued OpenAI calls, with recent wait and call times."""
+    return JSONResponse(content=openai_scheduler.stats())
+
+
+@nicegui_app.get("/api/profile")
+async def get_profile_stats(reset: bool = False):
+    """Render stage histograms of the profiled pages (PROFILE_PAGES=true)."""
+    stats = profile_stats()
+    if reset:
+        reset_profile_stats()
+        logger.info("🔬 Render profiling stats reset")
+    return JSONResponse(content=stats)
+
+
 @nicegui_app.get("/api/stats")
 async def get_rate_limit_stats():
     logger.info("📊 Starting to gather rate limit stats from temporary storage...")
@@ -248,201 +300,25 @@ async def get_rate_limit_stats():
 
 # Main landing page
 @ui.page("/")
+@profiled("main")
 def main():
     """Main landing page with terminal-style animation."""
-    ui.add_head_html(
-        """
-    <style>
-        .logo-container {
-            position: fixed;
-            top: 20px;
-            left: 0;
-            right: 0;
-            display: flex;
-            justify-content: center;
-            z-index: 1000;
-        }
-
-        .logo-img {
-            width: 60px;
-            height: 60px;
-            object-fit: contain;
-        }
-    </style>
-    """
-    )
-    ui.add_head_html(
-        """
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Cormorant+Garamond:wght@400;600&display=swap');
-
-        body {
-            margin: 0;
-            padding: 0;
-            background: #000;
-            height: 100vh;
-            overflow: hidden;
-            font-family: 'Cormorant Garamond', serif;
-            cursor: pointer;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-        }
-
-        .screen-container {
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            transition: all 0.4s ease-in-out;
-            clip-path: inset(0% 0% 0% 0%);
-            z-index: 10;
-        }
-
-        .screen-container.tv-close {
-            clip-path: inset(0% 50% 0% 50%);
-            opacity: 0;
-        }
-
-        .noise {
-            background: url('https://media.giphy.com/media/oEI9uBYSzLpBK/giphy.gif') center center / cover;
-            filter: brightness(0.7) contrast(1.3);
-            opacity: 0.3;
-            position: fixed;
-            top: 0; left: 0; width: 100%; height: 100%;
-            z-index: -1;
-        }
-        .centered-container {
-            height: 100vh;                    /* Full viewport height */
-            display: flex;
-            align-items: center;             /* Vertical centering */
-            justify-content: center;         /* Horizontal centering */
-            flex-direction: column;
-            text-align: center;
-        }
-
-        .terminal {
-            background-color: #000 !important;
-            border: 1px solid #333;
-            padding: 2rem;
-            width: 600px;
-            text-align: center;
-            z-index: 100;
-            border-radius: 8px;
-            box-shadow: 0 0 20px rgba(0,0,0,0.8);
-            color: white;
-            font-family: 'Cormorant Garamond', serif;
-        }
-
-        .init-text {
-            font-family: 'Cormorant Garamond', serif;
-            font-size: clamp(1.2rem, 4vw, 1.8rem);
-            color: white;
-            display: inline-block;
-            position: relative;
-        }
-
-        @keyframes blink {
-            from, to { opacity: 0; }
-            50% { opacity: 1; }
-        }
-
-        .dots {
-            position: relative;
-            color: white;
-            font-family: 'Cormorant Garamond', serif;
-            font-size: clamp(1.2rem, 4vw, 1.8rem);
-            display: inline-block;
-        }
-
-        .dots span {
-            opacity: 0;
-            transition: opacity 0.5s ease;
-        }
-
-        .dots span:nth-child(1) { animation-delay: 0.5s; }
-        .dots span:nth-child(2) { animation-delay: 1s; }
-        .dots span:nth-child(3) { animation-delay: 1.5s; }
-
-        .dots::after {
-            content: '|';
-            position: absolute;
-            margin-left: 2px;
-            animation: blink 0.75s step-end infinite;
-            color: white;
-        }
-
-        .loading-completed {
-            font-family: 'Cormorant Garamond', serif;
-            font-size: clamp(1.2rem, 4vw, 1.8rem);
-            color: white;
-            display: inline-block;
-            position: relative;
-            opacity: 0;
-            animation: fade-in 0.5s ease-in forwards;
-            animation-delay: 2s; /* Appears after all dots finish */
-        }
-
-        @keyframes fade-in {
-            from { opacity: 0; }
-            to { opacity: 1; }
-        }
-
-        .telescope {
-            opacity: 1 !important;
-            font-size: clamp(2rem, 8vw, 4rem);
-            margin-top: 1rem;
-            animation: float 3s ease-in-out infinite;
-        }
-
-        @keyframes float {
-            0%, 100% { transform: translateY(0); }
-            50% { transform: translateY(0); }
-        }
-
-        .prompt {
-            color: white;
-            font-size: clamp(1rem, 3vw, 1.5rem);
-            font-family: 'Cormorant Garamond', serif;
-            font-weight: 600;
-            text-shadow: 0 2px 4px rgba(0,0,0,0.5);
-            margin-top: 1.5rem;
-            cursor: pointer;
-        }
-
-        @keyframes fade-in {
-            to { opacity: 1; }
-        }
-
-        /* Mobile responsiveness */
-        @media (max-width: 768px) {
-            .terminal {
-                padding: 1rem;
-                margin-bottom: 1rem;
-            }
-        }
-    </style>
-    """
-    )
+    ui.add_head_html(stylesheet_link(LANDING_STYLESHEET))
+    lap("head_html")
+
+    logo_html = LOGO.html("logo-img", "cocoex Logo")
+    lap("logo")
 
     # Logo and header
-    with open("img/logo.png", "rb") as img_file:
-        logo_base64 = base64.b64encode(img_file.read()).decode()
-        ui.html(
-            f"""
-        <div class="logo-container">
-            <a href="https://cocoex.xyz" target="_blank">
-                <img src="data:image/png;base64,{logo_base64}" class="logo-img">
-            </a>
-        </div>
-        """
-        )
+    ui.html(
+        f"""
+    <div class="logo-container">
+        <a href="https://cocoex.xyz" target="_blank">
+            {logo_html}
+        </a>
+    </div>
+    """
+    )
 
     # Create screen container that will animate
     screen = ui.element("div").classes("screen-container")
@@ -481,6 +357,7 @@ def main():
     screen.on("click", tv_close_and_go)
     prompt.on("click", tv_close_and_go)
     ui.keyboard(on_key=lambda e: tv_close_and_go() if e.key.enter else None)
+    lap("elements")
 
 
 def configure_nicegui():
@@ -488,69 +365,9 @@ def configure_nicegui():
     ui.add_head_html(
         """
         <link rel="icon" href="data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 100 100%22><text y=%22.9em%22 font-size=%2290%22>🔭</text></svg>">
-        <script>
-        // Custom NiceGUI WebSocket reconnection logic for better mobile experience
-        window.addEventListener('DOMContentLoaded', function() {
-            // Override the default NiceGUI reconnection behavior
-            if (window._nicegui && window._nicegui.connectSocket) {
-                const originalConnect = window._nicegui.connectSocket;
-                window._nicegui.connectSocket = function() {
-                    // Add custom connection settings
-                    if (window._nicegui.socket && window._nicegui.socket.io) {
-                        window._nicegui.socket.io.reconnectionDelay = 1000; // Start with 1s delay
-                        window._nicegui.socket.io.reconnectionDelayMax = 10000; // Max 10s delay
-                        window._nicegui.socket.io.timeout = 10000; // 10s timeout
-                        window._nicegui.socket.io.reconnectionAttempts = 10; // More attempts
-                    }
-                    return originalConnect.apply(this, arguments);
-                };
-            }
-
-            // Custom handler for reconnection notification
-            const showReconnecting = function(isReconnecting) {
-                let notificationEl = document.getElementById('reconnection-notification');
-                if (!notificationEl && isReconnecting) {
-                    notificationEl = document.createElement('div');
-                    notificationEl.id = 'reconnection-notification';
-                    notificationEl.style.position = 'fixed';
-                    notificationEl.style.bottom = '10px';
-                    notificationEl.style.left = '10px';
-                    notificationEl.style.backgroundColor = 'rgba(0,0,0,0.8)';
-                    notificationEl.style.color = 'white';
-                    notificationEl.style.padding = '10px';
-                    notificationEl.style.borderRadius = '5px';
-                    notificationEl.style.zIndex = '10000';
-                    notificationEl.style.fontSize = '14px';
-                    notificationEl.style.transition = 'opacity 0.3s';
-                    notificationEl.innerHTML = 'Reconnecting to server...';
-                    document.body.appendChild(notificationEl);
-                } else if (notificationEl) {
-                    if (isReconnecting) {
-                        notificationEl.style.display = 'block';
-                        notificationEl.style.opacity = '1';
-                    } else {
-                        notificationEl.style.opacity = '0';
-                        setTimeout(function() {
-                            notificationEl.style.display = 'none';
-                        }, 300);
-                    }
-                }
-            };
-
-            // Listen for socket events if available
-            setTimeout(function() {
-                if (window._nicegui && window._nicegui.socket) {
-                    window._nicegui.socket.on('reconnect_attempt', function() {
-                        showReconnecting(true);
-                    });
-                    window._nicegui.socket.on('connect', function() {
-                        showReconnecting(false);
-                    });
-                }
-            }, 1000);
-        });
-        </script>
-"""
+        """
+        + script_tag(RECONNECT_SCRIPT),
+        shared=True,
     )
     ui.run_with(nicegui_app, title="Muse Observatory", favicon="🔭")
 
@@ -0,0 +1,264 @@
+"""
+Stand-in for the OpenAI chat completions API, for load and latency tests.
+
+Usage:
+    python -m benchmarks.fake_openai [--port 8999] [--latency lognormal]
+                                     [--latency-ms 2000] [--spread 0.5]
+                                     [--first-token 0.2] [--error-rate 0.0]
+                                     [--error-status 500] [--seed 0]
+
+Then point the app and the scheduler at it:
+    OPENAI_BASE_URL=http://localhost:8999/v1 OPENAI_API_KEY=fake python app.py
+
+``POST /v1/chat/completions`` answers with a schema-valid fun fact when the
+prompt asks for one and with three projects otherwise, streamed when the
+request says ``stream``. Every call takes a latency drawn from the chosen
+distribution (spread over the chunks when streaming), reports token usage
+estimated from the text (or fixed with ``--prompt-tokens`` and
+``--completion-tokens``), and fails with ``--error-status`` at
+``--error-rate``. ``GET /stats`` counts what was served.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCIES = ["fixed", "uniform", "lognormal"]
+
+# Characters per streamed chunk, about one token
+CHUNK_CHARS = 4
+
+ORGANISMS = ["Axolotl", "Tardigrade", "Mycelium", "Mantis shrimp", "Baobab", "Lichen"]
+ADJECTIVES = ["Blue", "Living", "Open", "Circular", "Wild", "Coastal", "Urban"]
+NOUNS = ["Reef", "Commons", "Canopy", "Delta", "Seedbank", "Watershed", "Corridor"]
+ORGANISATIONS = ["Foundation", "Alliance", "Trust", "Network", "Cooperative"]
+LEVELS = ["global", "national", "regional", "local"]
+
+
+@dataclass
+class Settings:
+    latency: str = "lognormal"
+    latency_ms: float = 2000.0
+    spread: float = 0.5
+    first_token: float = 0.2
+    error_rate: float = 0.0
+    error_status: int = 500
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    seed: int = 0
+
+
+@dataclass
+class Stats:
+    requests: int = 0
+    streamed: int = 0
+    errors: int = 0
+    tokens: int = 0
+    by_kind: Dict[str, int] = field(default_factory=dict)
+
+
+settings = Settings()
+stats = Stats()
+rng = random.Random(0)
+app = FastAPI(title="Fake OpenAI")
+
+
+def draw_latency() -> float:
+    """Seconds the next call takes, from the configured distribution."""
+    median = settings.latency_ms / 1000
+    if settings.latency == "fixed":
+        return median
+    if settings.latency == "uniform":
+        return rng.uniform(
+            median * (1 - settings.spread), median * (1 + settings.spread)
+        )
+    # Long-tailed like real completions; the median is latency_ms
+    return rng.lognormvariate(0, settings.spread) * median
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def fake_projects() -> Dict[str, Any]:
+    projects = []
+    for _ in range(3):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} Project"
+        organization = f"{rng.choice(NOUNS)} {rng.choice(ORGANISATIONS)}"
+        projects.append(
+            {
+                "project_name": name,
+                "organization": organization,
+                "geographic_level": rng.choice(LEVELS),
+                "link_to_organization": f"https://example.org/{_slug(organization)}",
+            }
+        )
+    return {"projects": projects}
+
+
+def fake_fun_fact() -> Dict[str, Any]:
+    organism = rng.choice(ORGANISMS)
+    return {
+        "kingdoms_life_subject": organism,
+        "fun_fact": f"The {organism.lower()} is a stand-in fact from the fake "
+        "OpenAI server. It has no scientific value whatsoever.",
+        "question_asked": f"What could the {organism.lower()} teach your city?",
+        "fact_check_link": f"https://www.ecosia.org/search?q={_slug(organism)}",
+    }
+
+
+def _usage(messages: List[Dict[str, Any]], content: str) -> Dict[str, int]:
+    prompt = sum(len(str(message.get("content", ""))) for message in messages)
+    prompt_tokens = settings.prompt_tokens or max(1, prompt // 4)
+    completion_tokens = settings.completion_tokens or max(1, len(content) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _error() -> JSONResponse:
+    stats.errors += 1
+    return JSONResponse(
+        status_code=settings.error_status,
+        content={
+            "error": {
+                "message": "Injected failure from the fake OpenAI server",
+                "type": "server_error",
+                "code": settings.error_status,
+            }
+        },
+    )
+
+
+async def _chunks(
+    completion_id: str,
+    model: str,
+    content: str,
+    usage: Dict[str, int],
+    include_usage: bool,
+    latency: float,
+) -> AsyncIterator[str]:
+    pieces = [content[i : i + CHUNK_CHARS] for i in range(0, len(content), CHUNK_CHARS)]
+    first_wait = latency * settings.first_token
+    between = (latency - first_wait) / max(1, len(pieces))
+    base = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+    }
+
+    await asyncio.sleep(first_wait)
+    for index, piece in enumerate(pieces):
+        delta = {"content": piece}
+        if index == 0:
+            delta["role"] = "assistant"
+        choice = {"index": 0, "delta": delta, "finish_reason": None}
+        yield f"data: {json.dumps({**base, 'choices': [choice]})}\n\n"
+        await asyncio.sleep(between)
+    choice = {"index": 0, "delta": {}, "finish_reason": "stop"}
+    yield f"data: {json.dumps({**base, 'choices': [choice]})}\n\n"
+    if include_usage:
+        yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "gpt-4o")
+    stats.requests += 1
+
+    prompt = " ".join(str(message.get("content", "")) for message in messages)
+    kind = "fun_fact" if "kingdoms_life_subject" in prompt else "projects"
+    stats.by_kind[kind] = stats.by_kind.get(kind, 0) + 1
+
+    latency = draw_latency()
+    if rng.random() < settings.error_rate:
+        await asyncio.sleep(latency * settings.first_token)
+        return _error()
+
+    content = json.dumps(fake_fun_fact() if kind == "fun_fact" else fake_projects())
+    usage = _usage(messages, content)
+    stats.tokens += usage["total_tokens"]
+    completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+
+    if body.get("stream"):
+        stats.streamed += 1
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return StreamingResponse(
+            _chunks(completion_id, model, content, usage, include_usage, latency),
+            media_type="text/event-stream",
+        )
+
+    await asyncio.sleep(latency)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": usage,
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return {"settings": settings.__dict__, **stats.__dict__}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", choices=LATENCIES, default=settings.latency)
+    parser.add_argument(
+        "--latency-ms", type=float, default=settings.latency_ms, help="median"
+    )
+    parser.add_argument(
+        "--spread",
+        type=float,
+        default=settings.spread,
+        help="lognormal sigma, or +/- share of the median for uniform",
+    )
+    parser.add_argument(
+        "--first-token",
+        type=float,
+        default=settings.first_token,
+        help="share of the latency before the first streamed chunk",
+    )
+    parser.add_argument("--error-rate", type=float, default=settings.error_rate)
+    parser.add_argument("--error-status", type=int, default=settings.error_status)
+    parser.add_argument("--prompt-tokens", type=int, default=0, help="0: estimate")
+    parser.add_argument("--completion-tokens", type=int, default=0, help="0: estimate")
+    parser.add_argument("--seed", type=int, default=settings.seed)
+    args = parser.parse_args()
+
+    for name in settings.__dict__:
+        setattr(settings, name, getattr(args, name))
+    rng.seed(args.seed)
+    print(f"Fake OpenAI listening on http://{args.host}:{args.port}/v1")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""
+Storage benchmarks for the database helpers.
+
+Usage:
+    python -m benchmarks.storage [--sizes 1000 10000 ...] [--backends tinydb sqlite]
+                                 [--iterations 200] [--output results.json]
+                                 [--baseline previous.json] [--tolerance 0.25]
+
+For every backend and dataset size a synthetic database is generated in a
+throwaway directory by one subprocess, then benchmarked by a fresh one, so
+start-up cost, peak RSS and file sizes are those of a serving process. The
+results are written as JSON; with ``--baseline`` the run fails when a helper's
+p50 or p99 latency got slower than the baseline by more than the tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_BACKENDS = ["tinydb", "sqlite"]
+DEFAULT_ITERATIONS = 200
+DEFAULT_TOLERANCE = 0.25
+
+# Share of the records going to each table; daily totals come on top
+TABLE_SHARES = {
+    "openai_usage_log": 0.5,
+    "projects": 0.3,
+    "inspirations": 0.1,
+    "daily_facts": 0.1,
+}
+MUSES = ["lunes", "ares", "rabu", "thunor", "shukra", "dosei", "solis"]
+
+# Records committed per write while generating a dataset
+LOAD_BATCH = 5_000
+
+
+def synthetic_records(size: int, seed: int = 0) -> Iterator[Tuple[str, dict]]:
+    """
+    Yield ``(table_name, document)`` pairs for a database of about ``size``
+    records, shaped like production data.
+
+    Dates go back one day per daily fact from today, inspirations get three
+    projects each and the daily token totals match the generated usage log.
+    """
+    rng = random.Random(seed)
+    days = max(1, int(size * TABLE_SHARES["daily_facts"]))
+    today = date.today()
+    dates = [(today - timedelta(days=i)).isoformat() for i in range(days)]
+
+    for i, day in enumerate(dates):
+        yield "daily_facts", {
+            "date": day,
+            "muse": MUSES[i % len(MUSES)],
+            "social_cause": "biodiversity",
+            "fun_fact": f"Synthetic fact number {i}",
+            "question_asked": "What can we learn from it?",
+            "fact_check_link": "https://example.org",
+        }
+
+    for i in range(int(size * TABLE_SHARES["inspirations"])):
+        day = rng.choice(dates)
+        created_at = f"{day}T12:00:00"
+        yield "inspirations", {
+            "date": day,
+            "id": inspiration_id(i),
+            "user_inspiration": "A synthetic idea " * 8,
+            "created_at": created_at,
+        }
+        for j in range(3):
+            yield "projects", {
+                "id": f"proj-{i:07d}-{j}",
+                "project_name": f"Project {i}-{j}",
+                "organisation": "Synthetic Org",
+                "geographical_level": "Local",
+                "link_to_organisation": "https://example.org",
+                "sk_inspiration": inspiration_id(i),
+                "created_at": created_at,
+            }
+
+    totals: Dict[str, dict] = {}
+    for i in range(int(size * TABLE_SHARES["openai_usage_log"])):
+        day = rng.choice(dates)
+        tokens = rng.randint(200, 2_000)
+        yield "openai_usage_log", {
+            "timestamp": f"{day}T12:00:00",
+            "date": day,
+            "endpoint": "projects",
+            "tokens_used": tokens,
+            "model": "gpt-4o-mini",
+            "status": "success",
+            "error": None,
+        }
+        total = totals.setdefault(day, {"date": day, "calls": 0, "tokens_used": 0})
+        total["calls"] += 1
+        total["tokens_used"] += tokens
+        total["endpoints"] = {"projects": total["tokens_used"]}
+    for day in sorted(totals):
+        yield "token_usage_daily", totals[day]
+
+
+def inspiration_id(i: int) -> str:
+    return f"insp-{i:07d}"
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def disk_bytes(db_dir: Path) -> int:
+    """
+    Size of the database files only: JSON tables, manifest and write-ahead
+    log, or the SQLite file with its -wal and -shm. The worker's logs/ and
+    other files sharing the directory don't count.
+    """
+    total = 0
+    for path in db_dir.glob("muse_observatory*"):
+        files = path.rglob("*") if path.is_dir() else [path]
+        total += sum(f.stat().st_size for f in files if f.is_file())
+    return total
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency percentiles (ms) and throughput for per-call durations (s)."""
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    total = sum(ordered)
+    return {
+        "iterations": len(ordered),
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+        "mean_ms": total / len(ordered) * 1000,
+        "ops_per_second": len(ordered) / total if total else 0.0,
+    }
+
+
+# --- Worker side: runs with DB_DIR / DB_BACKEND pointing at the dataset ---
+
+
+def load_dataset(size: int) -> Dict[str, Any]:
+    """Generate the synthetic database through the batch insert helper."""
+    from db.db import get_db, insert_many
+
+    started = time.perf_counter()
+    counts: Dict[str, int] = {}
+    batch: List[Tuple[str, dict]] = []
+    for table_name, doc in synthetic_records(size):
+        counts[table_name] = counts.get(table_name, 0) + 1
+        batch.append((table_name, doc))
+        if len(batch) >= LOAD_BATCH:
+            insert_many(batch)
+            batch = []
+    insert_many(batch)
+    storage = get_db().storage
+    if hasattr(storage, "compact"):
+        # Start the measurements from table files, not a long log
+        storage.compact()
+    seconds = time.perf_counter() - started
+    records = sum(counts.values())
+    return {
+        "records": counts,
+        "seconds": seconds,
+        "records_per_second": records / seconds if seconds else 0.0,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def run_helpers(size: int, iterations: int) -> Dict[str, Any]:
+    """Time each database helper against the loaded dataset."""
+    from tinydb import Query
+
+    from db.db import get_db, get_with_logging, insert_with_logging, search_with_logging
+    from models.muse import Oracle
+    from utils.generate_projects import get_current_token_usage
+
+    rng = random.Random(1)
+    days = max(1, int(size * TABLE_SHARES["daily_facts"]))
+    inspirations = max(1, int(size * TABLE_SHARES["inspirations"]))
+    today = date.today()
+    Q = Query()
+    loop = asyncio.new_event_loop()
+
+    started = time.perf_counter()
+    get_db()
+    open_seconds = time.perf_counter() - started
+
+    project = {
+        "project_name": "Benchmark project",
+        "organization": "Synthetic Org",
+        "geographic_level": "Local",
+        "link_to_organization": "https://example.org",
+    }
+    helpers: Dict[str, Callable[[], Any]] = {
+        "get_with_logging": lambda: get_with_logging(
+            "daily_facts",
+            Q.date == (today - timedelta(days=rng.randrange(days))).isoformat(),
+        ),
+        "search_with_logging": lambda: search_with_logging(
+            "projects", Q.sk_inspiration == inspiration_id(rng.randrange(inspirations))
+        ),
+        "insert_with_logging": lambda: insert_with_logging(
+            "inspirations",
+            {
+                "date": today.isoformat(),
+                "id": f"bench-{rng.random()}",
+                "user_inspiration": "A benchmark idea",
+                "created_at": datetime.now().isoformat(),
+            },
+        ),
+        "Oracle.get_todays_fact": Oracle.get_todays_fact,
+        "Oracle.save_inspiration": lambda: Oracle.today().save_inspiration(
+            "A benchmark idea", [project] * 3
+        ),
+        "get_current_token_usage": lambda: loop.run_until_complete(
+            get_current_token_usage()
+        ),
+    }
+
+    results = {}
+    for name, helper in helpers.items():
+        # The first call pays for lazily loaded data, so it's reported apart
+        started = time.perf_counter()
+        helper()
+        first = time.perf_counter() - started
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            helper()
+            samples.append(time.perf_counter() - started)
+        results[name] = {"first_ms": first * 1000, **summarize(samples)}
+    loop.close()
+    return {
+        "open_seconds": open_seconds,
+        "helpers": results,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def worker(args: argparse.Namespace) -> None:
+    if not args.verbose:
+        import logging
+
+        # The helpers log every call; keep the measurement about storage
+        logging.disable(logging.INFO)
+    if args.worker == "load":
+        result = load_dataset(args.size)
+    else:
+        result = run_helpers(args.size, args.iterations)
+    print(json.dumps(result))
+
+
+# --- Orchestration ---
+
+
+def run_worker(
+    mode: str, backend: str, size: int, db_dir: Path, args: argparse.Namespace
+) -> Dict[str, Any]:
+    env = dict(
+        os.environ,
+        DB_DIR=str(db_dir),
+        DB_BACKEND=backend,
+        # The OpenAI client is built at import time but never called here
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark"),
+    )
+    command = [sys.executable, "-m", "benchmarks.storage", "--worker", mode]
+    command += ["--size", str(size), "--iterations", str(args.iterations)]
+    if args.verbose:
+        command.append("--verbose")
+    done = subprocess.run(
+        command,
+        env=env,
+        cwd=db_dir,
+        stdout=subprocess.PIPE,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+        text=True,
+        check=True,
+    )
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+
+def benchmark(backend: str, size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="muse-bench-") as tmp:
+        db_dir = Path(tmp)
+        load = run_worker("load", backend, size, db_dir, args)
+        size_on_disk = disk_bytes(db_dir)
+        run = run_worker("run", backend, size, db_dir, args)
+    return {
+        "backend": backend,
+        "size": size,
+        "records": load.pop("records"),
+        "load": load,
+        "disk_bytes": size_on_disk,
+        **run,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def regressions(
+    report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Describe every helper latency that got slower than the baseline allows."""
+    previous = {(r["backend"], r["size"]): r for r in baseline.get("results", [])}
+    found = []
+    for result in report["results"]:
+        base = previous.get((result["backend"], result["size"]))
+        if base is None:
+            continue
+        for name, stats in result["helpers"].items():
+            base_stats = base["helpers"].get(name)
+            if base_stats is None:
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                limit = base_stats[metric] * (1 + tolerance)
+                if stats[metric] > limit:
+                    found.append(
+                        f"{result['backend']} {result['size']} {name} {metric}: "
+                        f"{stats[metric]:.3f} > {base_stats[metric]:.3f}"
+                    )
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muse Observatory storage benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--verbose", action="store_true", help="keep helper logs")
+    parser.add_argument("--worker", choices=["load", "run"], help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    # Workers run from the dataset directory; keep our modules importable
+    os.environ["PYTHONPATH"] = os.pathsep.join(
+        filter(
+            None, [str(Path(__file__).resolve().parent.parent), os.getenv("PYTHONPATH")]
+        )
+    )
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "results": [],
+    }
+    for size in args.sizes:
+        for backend in args.backends:
+            print(f"Benchmarking {backend} with {size} records...", file=sys.stderr)
+            result = benchmark(backend, size, args)
+            report["results"].append(result)
+            for name, stats in result["helpers"].items():
+                print(
+                    f"  {name:<26} p50 {stats['p50_ms']:8.3f} ms"
+                    f"  p99 {stats['p99_ms']:8.3f} ms"
+                    f"  {stats['ops_per_second']:10.1f} ops/s",
+                    file=sys.stderr,
+                )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        slower = regressions(
+            report, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for line in slower:
+            print(f"Regression: {line}", file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
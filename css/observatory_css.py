@@ -1,4 +1,376 @@
 import random
+from typing import Optional
+
+# Stars and pulsars per field, drawn in the browser by js/starfield.js
+STAR_FIELDS = {
+    "cosmic": {"stars": 50, "pulsars": 5},
+    "loader": {"stars": 20, "pulsars": 0},
+}
+
+
+def star_field_html(layout: str, seed: Optional[int] = None) -> str:
+    """
+    Return a star field placeholder that js/starfield.js fills in.
+
+    Only the seed and counts are sent; the same seed draws the same stars,
+    so a fixed seed gives a reproducible layout.
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+    counts = STAR_FIELDS[layout]
+    return (
+        f'<div data-star-field="{layout}" data-seed="{seed}" '
+        f'data-stars="{counts["stars"]}" data-pulsars="{counts["pulsars"]}"></div>'
+    )
+
+
+def get_layout_css() -> str:
+    """Mobile-responsive layout of the observatory page, the same for every muse."""
+    return """
+    <style>
+    /* Fix body and html to prevent infinite scrolling */
+    html, body {
+        height: 100vh !important;
+        max-height: 100vh !important;
+        overflow-x: hidden !important;
+        overflow-y: auto !important;
+        position: relative !important;
+        margin: 0 !important;
+        padding: 0 !important;
+        width: 100% !important;
+    }
+
+    /* Constrain cosmic background elements */
+    .cosmic-overlay, .dust-overlay {
+        position: fixed !important;
+        top: 0 !important;
+        left: 0 !important;
+        width: 100vw !important;
+        height: 100vh !important;
+        max-height: 100vh !important;
+        overflow: hidden !important;
+        z-index: -1 !important;
+    }
+
+    /* Constrain all cosmic elements */
+    .star, .shooting-star, .cosmic-dust, .nebula-particle, .pulsar {
+        position: fixed !important;
+        max-height: 100vh !important;
+        overflow: hidden !important;
+    }
+
+    /* Logo container alignment - responsive */
+    .logo-container {
+        top: 8px;
+        left: 0;
+        right: 0;
+        display: flex;
+        justify-content: center;
+        z-index: 1000;
+        margin-bottom: 0px;
+    }
+    .logo-img {
+        width: 50px;
+        height: 50px;
+        object-fit: contain;
+    }
+
+    /* Main container with proper height constraints and small margins */
+    .main-container {
+        min-height: 100vh !important;
+        /* max-height: 100vh !important; */
+        /* height: 100vh !important; */
+        width: calc(100% - 1rem) !important;
+        max-width: calc(100% - 1rem) !important;
+        margin: 0 0.5rem !important;
+        padding: 0.5rem !important;
+        padding-top: 0 !important;  /* Remove top padding */
+        overflow-y: auto !important;
+        overflow-x: hidden !important;
+        display: flex !important;
+        flex-direction: column !important;
+        justify-content: flex-start !important;  /* Start from top */
+        box-sizing: border-box !important;
+    }
+
+    @media (max-width: 430px) {
+        .muse-title {
+            font-size: 36px !important;  /* Reduce title size on mobile */
+        }
+
+        .muse-subtitle {
+            font-size: 16px !important;  /* Reduce subtitle size on mobile */
+        }
+
+        .fun-fact, .question-text {
+            font-size: 14px !important;  /* Reduce text size on mobile */
+            line-height: 1.3 !important;
+        }
+        .main-container {
+            justify-content: flex-start !important;
+            width: calc(100% - 0.75rem) !important;
+            max-width: calc(100% - 0.75rem) !important;
+            margin: 0 0.375rem !important;
+            padding: 0.25rem !important;
+            padding-top: 0 !important;  /* Start from very top */
+            padding-bottom: 10px !important;
+        }
+
+        /* Adjust logo position to account for no top padding */
+        .logo-container {
+            top: 5px !important;  /* Reduced from 8px */
+            margin-bottom: 5px !important;
+        }
+    }
+
+    @media (max-width: 375px) {
+        /* iPhone 13 mini specific */
+        .main-container {
+            justify-content: flex-start !important;
+            width: calc(100% - 0.5rem) !important;
+            max-width: calc(100% - 0.5rem) !important;
+            margin: 0 0.25rem !important;
+            padding: 0.25rem !important;
+            padding-top: 0 !important;  /* Start from very top */
+            padding-bottom: 8px !important;
+        }
+
+        /* Adjust logo position */
+        .logo-container {
+            top: 3px !important;  /* Very close to top */
+            margin-bottom: 3px !important;
+        }
+    }
+
+    /* Ensure all text elements are properly centered with minimal spacing */
+    .muse-subtitle, .muse-title, .fun-fact, .source-link, .question-text {
+        text-align: center !important;
+        display: block !important;
+        width: 100% !important;
+        margin-top: 0px !important;
+        margin-bottom: 0px !important;
+        padding-top: 0px !important;
+        padding-bottom: 0px !important;
+    }
+
+    /* Minimize spacing between UI elements */
+    .main-container > * {
+        margin-top: 0px !important;
+        margin-bottom: 0px !important;
+    }
+
+    /* Ensure content fits within viewport */
+    * {
+        box-sizing: border-box !important;
+    }
+
+    /* Mobile-specific input styling */
+    @media (max-width: 430px) {
+        input, textarea {
+            font-size: 16px !important; /* Prevents zoom on iOS */
+            -webkit-appearance: none !important;
+            border-radius: 12px !important;
+        }
+    }
+
+    /* Safari-specific fixes */
+    @supports (-webkit-touch-callout: none) {
+        .main-container {
+            -webkit-overflow-scrolling: touch !important;
+        }
+
+        /* Additional iOS Safari fixes */
+        body {
+            position: fixed !important;
+            width: 100% !important;
+            height: 100% !important;
+        }
+
+        .main-container {
+            position: relative !important;
+            height: 100vh !important;
+            overflow-y: scroll !important;
+        }
+    }
+    </style>
+    """
+
+
+def get_landing_css() -> str:
+    """Terminal-style landing page."""
+    return """
+    <style>
+        @import url('https://fonts.googleapis.com/css2?family=Cormorant+Garamond:wght@400;600&display=swap');
+
+        body {
+            margin: 0;
+            padding: 0;
+            background: #000;
+            height: 100vh;
+            overflow: hidden;
+            font-family: 'Cormorant Garamond', serif;
+            cursor: pointer;
+            display: flex;
+            flex-direction: column;
+            align-items: center;
+            justify-content: center;
+        }
+
+        .screen-container {
+            position: fixed;
+            top: 0;
+            left: 0;
+            width: 100%;
+            height: 100%;
+            display: flex;
+            flex-direction: column;
+            align-items: center;
+            justify-content: center;
+            transition: all 0.4s ease-in-out;
+            clip-path: inset(0% 0% 0% 0%);
+            z-index: 10;
+        }
+
+        .screen-container.tv-close {
+            clip-path: inset(0% 50% 0% 50%);
+            opacity: 0;
+        }
+
+        .noise {
+            background: url('https://media.giphy.com/media/oEI9uBYSzLpBK/giphy.gif') center center / cover;
+            filter: brightness(0.7) contrast(1.3);
+            opacity: 0.3;
+            position: fixed;
+            top: 0; left: 0; width: 100%; height: 100%;
+            z-index: -1;
+        }
+        .centered-container {
+            height: 100vh;                    /* Full viewport height */
+            display: flex;
+            align-items: center;             /* Vertical centering */
+            justify-content: center;         /* Horizontal centering */
+            flex-direction: column;
+            text-align: center;
+        }
+
+        .terminal {
+            background-color: #000 !important;
+            border: 1px solid #333;
+            padding: 2rem;
+            width: 600px;
+            text-align: center;
+            z-index: 100;
+            border-radius: 8px;
+            box-shadow: 0 0 20px rgba(0,0,0,0.8);
+            color: white;
+            font-family: 'Cormorant Garamond', serif;
+        }
+
+        .init-text {
+            font-family: 'Cormorant Garamond', serif;
+            font-size: clamp(1.2rem, 4vw, 1.8rem);
+            color: white;
+            display: inline-block;
+            position: relative;
+        }
+
+        @keyframes blink {
+            from, to { opacity: 0; }
+            50% { opacity: 1; }
+        }
+
+        .dots {
+            position: relative;
+            color: white;
+            font-family: 'Cormorant Garamond', serif;
+            font-size: clamp(1.2rem, 4vw, 1.8rem);
+            display: inline-block;
+        }
+
+        .dots span {
+            opacity: 0;
+            transition: opacity 0.5s ease;
+        }
+
+        .dots span:nth-child(1) { animation-delay: 0.5s; }
+        .dots span:nth-child(2) { animation-delay: 1s; }
+        .dots span:nth-child(3) { animation-delay: 1.5s; }
+
+        .dots::after {
+            content: '|';
+            position: absolute;
+            margin-left: 2px;
+            animation: blink 0.75s step-end infinite;
+            color: white;
+        }
+
+        .loading-completed {
+            font-family: 'Cormorant Garamond', serif;
+            font-size: clamp(1.2rem, 4vw, 1.8rem);
+            color: white;
+            display: inline-block;
+            position: relative;
+            opacity: 0;
+            animation: fade-in 0.5s ease-in forwards;
+            animation-delay: 2s; /* Appears after all dots finish */
+        }
+
+        @keyframes fade-in {
+            from { opacity: 0; }
+            to { opacity: 1; }
+        }
+
+        .telescope {
+            opacity: 1 !important;
+            font-size: clamp(2rem, 8vw, 4rem);
+            margin-top: 1rem;
+            animation: float 3s ease-in-out infinite;
+        }
+
+        @keyframes float {
+            0%, 100% { transform: translateY(0); }
+            50% { transform: translateY(0); }
+        }
+
+        .prompt {
+            color: white;
+            font-size: clamp(1rem, 3vw, 1.5rem);
+            font-family: 'Cormorant Garamond', serif;
+            font-weight: 600;
+            text-shadow: 0 2px 4px rgba(0,0,0,0.5);
+            margin-top: 1.5rem;
+            cursor: pointer;
+        }
+
+        @keyframes fade-in {
+            to { opacity: 1; }
+        }
+
+        /* Mobile responsiveness */
+        @media (max-width: 768px) {
+            .terminal {
+                padding: 1rem;
+                margin-bottom: 1rem;
+            }
+        }
+
+        .logo-container {
+            position: fixed;
+            top: 20px;
+            left: 0;
+            right: 0;
+            display: flex;
+            justify-content: center;
+            z-index: 1000;
+        }
+
+        .logo-img {
+            width: 60px;
+            height: 60px;
+            object-fit: contain;
+        }
+    </style>
+    """
 
 
 def get_opposite_color(hex_color: str):
@@ -292,58 +664,12 @@ def get_cosmic_css(
     </style>
     """
 
-    stars_html = '<div class="bottom-accent"></div>'
-
-    # Star types with more emphasis on colored stars (muse color)
-    star_types = [
-        {"class": "star", "weight": 0.5},
-        {"class": "star bright", "weight": 0.3},
-        {"class": "star colored", "weight": 0.2},  # Increased weight for colored stars
-    ]
-
-    # Increased number of stars
-    for _ in range(50):  # Increased from 25 to 40
-        star_type = random.choices(
-            star_types, weights=[t["weight"] for t in star_types]
-        )[0]
-        top = random.uniform(0, 100)
-        left = random.uniform(0, 100)
-        delay = random.uniform(0, 4)
-        duration = random.uniform(3, 8)
-
-        if "bright" in star_type["class"]:
-            size = random.uniform(2, 4)
-        else:
-            size = random.uniform(1, 3)
-
-        stars_html += f"""
-        <div class="{star_type['class']}" style="
-            top: {top}%;
-            left: {left}%;
-            animation-delay: {delay}s;
-            animation-duration: {duration}s;
-            width: {size}px;
-            height: {size}px;
-        "></div>
-        """
+    return css, get_cosmic_stars()
 
-    # Add two pulsars with muse color
-    for _ in range(5):  # Increased from 1 to 2
-        top = random.uniform(20, 80)
-        left = random.uniform(20, 80)
-        delay = random.uniform(0, 2)
-        size = random.uniform(3, 4)
-        stars_html += f"""
-        <div class="pulsar" style="
-            top: {top}%;
-            left: {left}%;
-            animation-delay: {delay}s;
-            width: {size}px;
-            height: {size}px;
-        "></div>
-        """
 
-    return css, stars_html
+def get_cosmic_stars(seed: Optional[int] = None) -> str:
+    """Placeholder for the observatory background stars and pulsars."""
+    return star_field_html("cosmic", seed)
 
 
 def get_load_cosmic_css(color: str) -> tuple[str, str]:
@@ -387,26 +713,130 @@ def get_load_cosmic_css(color: str) -> tuple[str, str]:
     </style>
     """
 
-    # Only create stars, the loading text is now handled by the UI card
-    stars_html = ""
-
-    # Add stars for the loading screen
-    for _ in range(20):
-        top = random.uniform(0, 100)
-        left = random.uniform(0, 100)
-        delay = random.uniform(0, 3)
-        duration = random.uniform(1, 3)
-        size = random.uniform(2, 4)
-
-        stars_html += f"""
-            <div class="star" style="
-                top: {top}%;
-                left: {left}%;
-                animation-delay: {delay}s;
-                animation-duration: {duration}s;
-                width: {size}px;
-                height: {size}px;
-            "></div>
-        """
+    return css, get_load_stars()
+
+
+def get_load_stars(seed: Optional[int] = None) -> str:
+    """Placeholder for the share loader stars."""
+    return star_field_html("loader", seed)
+
+
+def get_static_page_css() -> str:
+    """
+    Widgets of the pre-rendered observatory page, which has no NiceGUI/Quasar.
 
-    return css, stars_html
+    Colors come from the ``--muse-color`` variable set on ``<body>``.
+    """
+    return """
+    <style>
+        .help-button {
+            position: fixed;
+            top: 1rem;
+            left: 1rem;
+            z-index: 9999;
+            width: 30px;
+            height: 30px;
+            border: none;
+            border-radius: 50%;
+            background: var(--muse-color);
+            color: white;
+            font-size: 18px;
+            font-weight: bold;
+            cursor: pointer;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.4), 0 0 2px rgba(255,255,255,0.3);
+            transition: transform 0.3s ease, box-shadow 0.3s ease;
+        }
+
+        .help-button:hover {
+            transform: scale(1.1);
+            box-shadow: 0 4px 12px rgba(0,0,0,0.4), 0 0 4px rgba(255,255,255,0.5);
+        }
+
+        .muse-link {
+            color: #a0b9ff !important;
+            text-decoration: underline !important;
+            font-weight: 500 !important;
+        }
+
+        .muse-dialog {
+            max-width: 24rem;
+            width: calc(100% - 2rem);
+            max-height: 85vh;
+            overflow-y: auto;
+            padding: 0.75rem;
+            border-radius: 16px;
+        }
+
+        .muse-dialog::backdrop {
+            background: rgba(0, 0, 0, 0.5);
+        }
+
+        .help-dialog {
+            background: linear-gradient(135deg, rgba(0,0,0,0.9), rgba(20,20,40,0.9));
+            color: white;
+            border: 1px solid rgba(255,255,255,0.2);
+        }
+
+        .help-dialog h2 {
+            text-align: center;
+            color: var(--muse-color);
+            font-size: 1.2rem;
+            margin: 0 0 0.5rem 0;
+        }
+
+        .projects-dialog {
+            background: white;
+            color: black;
+            border: none;
+        }
+
+        .projects-dialog h2 {
+            text-align: center;
+            font-size: 1rem;
+            margin: 0 0 0.5rem 0;
+        }
+
+        .project-card {
+            background: rgba(255, 255, 255, 0.9);
+            border-left: 2px solid var(--muse-color);
+            box-shadow: 0 1px 3px rgba(0,0,0,0.2);
+            padding: 0.5rem;
+            margin-bottom: 0.5rem;
+            font-size: 0.8rem;
+        }
+
+        .project-card strong {
+            display: block;
+            font-size: 0.9rem;
+        }
+
+        .dialog-actions {
+            display: flex;
+            justify-content: center;
+            margin-top: 0.5rem;
+        }
+
+        .share-form textarea {
+            display: block;
+            resize: vertical;
+        }
+
+        .share-status {
+            min-height: 1.5em;
+            margin-top: 0.5rem;
+            text-align: center;
+            color: white;
+        }
+
+        .share-loader-text {
+            position: absolute;
+            top: 50%;
+            left: 50%;
+            transform: translate(-50%, -50%);
+            z-index: 10002;
+            color: white;
+            font-size: 1.5rem;
+            font-weight: bold;
+        }
+    </style>
+    """
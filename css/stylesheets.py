@@ -0,0 +1,85 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from css.observatory_css import (
+    get_cosmic_css,
+    get_landing_css,
+    get_layout_css,
+    get_load_cosmic_css,
+    get_static_page_css,
+    get_text_css,
+)
+from models.muse import CHART
+from utils.assets import StaticAsset, register_asset, register_bundle, register_bytes
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_STYLE_TAG = re.compile(r"</?style>")
+
+
+@dataclass(frozen=True)
+class MuseStylesheets:
+    """The observatory stylesheets of one muse, served as static assets."""
+
+    cosmic: StaticAsset
+    text: StaticAsset
+    loader: StaticAsset
+
+
+def _stylesheet(name: str, style_html: str) -> StaticAsset:
+    css = _STYLE_TAG.sub("", style_html).strip() + "\n"
+    return register_bytes(f"{name}.css", css.encode("utf-8"), compress=True)
+
+
+@lru_cache(maxsize=None)
+def muse_stylesheets(
+    color: str, support_color: str, astro_color: str
+) -> MuseStylesheets:
+    """Compile the stylesheets for a color triple, once per process."""
+    cosmic_css, _ = get_cosmic_css(color, support_color, astro_color)
+    load_css, _ = get_load_cosmic_css(color)
+    sheets = MuseStylesheets(
+        cosmic=_stylesheet("cosmic", cosmic_css),
+        text=_stylesheet("text", get_text_css(color)),
+        loader=_stylesheet("loader", load_css),
+    )
+    logger.info(f"🎨 Compiled stylesheets for {color}/{support_color}/{astro_color}")
+    return sheets
+
+
+def stylesheet_link(asset: StaticAsset) -> str:
+    return f'<link rel="stylesheet" href="{asset.url}">'
+
+
+def script_tag(asset: StaticAsset) -> str:
+    return f'<script src="{asset.url}" defer></script>'
+
+
+# Page layout shared by every muse
+LAYOUT_STYLESHEET = _stylesheet("layout", get_layout_css())
+
+# Widgets of the pre-rendered observatory page
+STATIC_PAGE_STYLESHEET = _stylesheet("static-page", get_static_page_css())
+
+# Terminal-style landing page
+LANDING_STYLESHEET = _stylesheet("landing", get_landing_css())
+
+# Star fields drawn from the seeds sent by the server, and the idle timeout
+OBSERVATORY_SCRIPT = register_bundle(
+    "observatory.js", ["js/starfield.js", "js/idle.js"]
+)
+
+# Star fields and share form of the pre-rendered observatory page
+STATIC_PAGE_SCRIPT = register_bundle(
+    "static-page.js", ["js/starfield.js", "js/share.js"]
+)
+
+# Websocket reconnection settings, on every NiceGUI page
+RECONNECT_SCRIPT = register_asset("js/reconnect.js", compress=True)
+
+
+# Every muse of the chart is known up front
+for _muse in CHART.values():
+    muse_stylesheets(_muse["color"], _muse["support_color"], _muse["astro_color"])
@@ -1,10 +1,16 @@
+import asyncio
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 from dotenv import load_dotenv
-from tinydb import Query, TinyDB
+from tinydb import Query
 
+from db.sqlite import SQLiteDB
+from db.storage import LogTinyDB, add_counts
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -13,62 +19,116 @@ load_dotenv()
 # Database file paths
 DB_DIR = Path(os.getenv("DB_DIR", "db_files"))
 DB_FILE = DB_DIR / "muse_observatory.json"
+SQLITE_FILE = DB_DIR / "muse_observatory.sqlite3"
+
+# "tinydb" (JSON files and a write-ahead log) or "sqlite" (SQLite in WAL mode)
+DB_BACKEND = os.getenv("DB_BACKEND", "tinydb").lower()
+
+# Secondary indexes kept up to date on every write; equality and range queries
+# on these fields are answered without scanning the table
+INDEXES = {
+    "daily_facts": ["date", "muse"],
+    "openai_usage_log": ["date"],
+    "projects": ["sk_inspiration"],
+    "token_usage_daily": ["date"],
+}
+
+# High-volume tables are split into one file per month of this field, so
+# date-filtered queries only read the months they need and old months can be
+# moved to cold storage (see ``python -m db.manage archive``)
+PARTITIONS = {
+    "inspirations": "date",
+    "openai_usage_log": "date",
+    "projects": "created_at",
+}
+
+# OpenAI usage log and its per-day totals, kept in step within each commit
+USAGE_TABLE = "openai_usage_log"
+USAGE_DAILY_TABLE = "token_usage_daily"
 
 # Database instances (lazy-loaded)
 _db_instance = None
+_db_init_lock = threading.Lock()
 
+# Single writer thread: async writes are committed one at a time, in order
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
 
-def get_db() -> TinyDB:
-    """Get the TinyDB database instance."""
+
+def get_db() -> Union[LogTinyDB, SQLiteDB]:
+    """Get the database instance for the configured backend."""
     global _db_instance
     if _db_instance is None:
-        logger.info("No instance of TinyDB found, initializing...")
-        try:
-            # Ensure directory exists with proper permissions
-            try:
-                DB_DIR.mkdir(exist_ok=True)
-                logger.info(f"Database directory initialized at {DB_DIR}")
-                # Attempt to make the directory writable if it exists but isn't writable
-                if DB_DIR.exists() and not os.access(DB_DIR, os.W_OK):
-                    os.chmod(DB_DIR, 0o777)
-                    logger.info(f"Updated permissions for {DB_DIR}")
-            except PermissionError:
-                logger.error(
-                    f"Permission denied: Cannot create or modify directory {DB_DIR}"
-                )
-                logger.info(
-                    "Trying to continue anyway, in case the database file is already accessible"
-                )
-
-            # Try to open or create the database file
-            try:
-                _db_instance = TinyDB(DB_FILE)
-                logger.info(f"TinyDB initialized at {DB_FILE}")
-
-                # Log database file existence and tables
-                if os.path.exists(DB_FILE):
-                    file_size = os.path.getsize(DB_FILE)
-                    logger.info(f"Database file exists with size: {file_size} bytes")
-
-                    # Log tables and record counts
-                    tables = _db_instance.tables()
-                    logger.info(f"Available tables: {tables}")
-                    for table_name in tables:
-                        table = _db_instance.table(table_name)
-                        logger.info(f"Table '{table_name}' has {len(table)} records")
-                else:
-                    logger.warning(f"Database file doesn't exist yet: {DB_FILE}")
-
-            except PermissionError:
-                error_msg = f"Permission denied: Cannot write to {DB_FILE}. Check that the application has proper permissions."
-                logger.error(error_msg)
-                raise PermissionError(error_msg)
-        except Exception as e:
-            logger.error(f"Error initializing TinyDB: {e}")
-            raise
+        # Reads and writes run on worker threads, so only one may open the db
+        with _db_init_lock:
+            if _db_instance is None:
+                _db_instance = _open_db()
     return _db_instance
 
 
+def _open_db() -> Union[LogTinyDB, SQLiteDB]:
+    """Open the database, preparing its directory if needed."""
+    logger.info(f"No database instance found, initializing {DB_BACKEND}...")
+    try:
+        # Ensure directory exists with proper permissions
+        try:
+            DB_DIR.mkdir(exist_ok=True)
+            logger.info(f"Database directory initialized at {DB_DIR}")
+            # Attempt to make the directory writable if it exists but isn't writable
+            if DB_DIR.exists() and not os.access(DB_DIR, os.W_OK):
+                os.chmod(DB_DIR, 0o777)
+                logger.info(f"Updated permissions for {DB_DIR}")
+        except PermissionError:
+            logger.error(
+                f"Permission denied: Cannot create or modify directory {DB_DIR}"
+            )
+            logger.info(
+                "Trying to continue anyway, in case the database file is already accessible"
+            )
+
+        # Try to open or create the database files: SQLite in WAL mode, or
+        # JSON files whose writes are appended to a write-ahead log and
+        # compacted into per-table files in the background
+        try:
+            if DB_BACKEND == "sqlite":
+                db_path = SQLITE_FILE
+                existed = db_path.exists()
+                db = SQLiteDB(db_path, indexes=INDEXES, partitions=PARTITIONS)
+                logger.info(f"SQLite initialized at {db_path} (WAL mode)")
+            else:
+                db_path = DB_FILE.with_suffix("")
+                existed = DB_FILE.exists() or db_path.exists()
+                db = LogTinyDB(DB_FILE, indexes=INDEXES, partitions=PARTITIONS)
+                logger.info(f"TinyDB initialized at {DB_FILE} (write-ahead log)")
+
+            # Log database files existence and tables
+            if existed:
+                logger.info(f"Database tables are stored in {db_path}")
+
+                # Log tables and record counts
+                tables = db.tables()
+                logger.info(f"Available tables: {tables}")
+                for table_name in tables:
+                    table = db.table(table_name)
+                    logger.info(f"Table '{table_name}' has {len(table)} records")
+            else:
+                logger.warning(f"Database files don't exist yet: {db_path}")
+
+            # Databases created before the daily totals existed get them once
+            tables = db.tables()
+            if USAGE_TABLE in tables and USAGE_DAILY_TABLE not in tables:
+                logger.info(f"'{USAGE_DAILY_TABLE}' missing, building it from the log")
+                _rebuild_daily_token_usage(db)
+
+        except PermissionError:
+            error_msg = f"Permission denied: Cannot write to {DB_DIR}. Check that the application has proper permissions."
+            logger.error(error_msg)
+            raise PermissionError(error_msg)
+    except Exception as e:
+        logger.error(f"Error initializing the database: {e}")
+        raise
+    return db
+
+
 def check_db_access() -> bool:
     """
     Check if the database is accessible with proper permissions.
@@ -118,6 +178,187 @@ def insert_with_logging(table_name: str, data: dict) -> int:
     return doc_id
 
 
+def insert_many(
+    records: List[Tuple[str, dict]],
+    increments: Optional[List[Tuple[str, str, Any, Dict[str, Any]]]] = None,
+) -> List[int]:
+    """
+    Insert records into one or more tables in a single durable write.
+
+    Args:
+        records: (table_name, data) pairs, committed all-or-nothing
+        increments: (table_name, key_field, key, deltas) counters to bump in
+            the same write, see :meth:`UnitOfWork.increment`
+
+    Returns:
+        List[int]: The new document IDs, in the order of ``records``
+    """
+    increments = increments or []
+    if not records and not increments:
+        return []
+    db = get_db()
+    table_names = sorted(
+        {table_name for table_name, _ in records}
+        | {table_name for table_name, *_ in increments}
+    )
+
+    # Log the operation
+    logger.info(f"Inserting {len(records)} records into {table_names} in one commit")
+    logger.debug(f"Data to insert: {records}")
+
+    # Perform the batch insert
+    doc_ids = db.insert_many(records, increments)
+
+    # Log the result
+    logger.info(f"Successfully committed documents with IDs {doc_ids}")
+    for table_name in table_names:
+        logger.info(f"Table '{table_name}' now has {len(db.table(table_name))} records")
+
+    return doc_ids
+
+
+class UnitOfWork:
+    """Collect inserts across tables and commit them in one durable write."""
+
+    def __init__(self: "UnitOfWork") -> None:
+        self.records: List[Tuple[str, dict]] = []
+        self.increments: List[Tuple[str, str, Any, Dict[str, Any]]] = []
+
+    def insert(self: "UnitOfWork", table_name: str, data: dict) -> None:
+        """Stage a record for insertion into ``table_name``."""
+        self.records.append((table_name, data))
+
+    def increment(
+        self: "UnitOfWork",
+        table_name: str,
+        key_field: str,
+        key: Any,
+        deltas: Dict[str, Any],
+    ) -> None:
+        """Stage adding ``deltas`` to the record where ``key_field == key``."""
+        self.increments.append((table_name, key_field, key, deltas))
+
+    def commit(self: "UnitOfWork") -> List[int]:
+        """Write all staged records at once and return their document IDs."""
+        records, self.records = self.records, []
+        increments, self.increments = self.increments, []
+        return insert_many(records, increments)
+
+    async def acommit(self: "UnitOfWork") -> List[int]:
+        """Like :meth:`commit`, but through the writer thread."""
+        records, self.records = self.records, []
+        increments, self.increments = self.increments, []
+        return await ainsert_many(records, increments)
+
+
+@contextmanager
+def unit_of_work() -> Iterator[UnitOfWork]:
+    """
+    Stage inserts and commit them together when the block exits cleanly.
+
+    If the block raises, nothing staged inside it is written.
+    """
+    work = UnitOfWork()
+    yield work
+    work.commit()
+
+
+def _usage_deltas(usage_data: dict) -> Dict[str, Any]:
+    """Counters a usage log entry adds to its day's totals"""
+    deltas: Dict[str, Any] = {"calls": 1}
+    # Only successful calls count towards the daily token quota
+    if usage_data.get("status") == "success":
+        tokens = usage_data.get("tokens_used", 0)
+        endpoint = usage_data.get("endpoint", "unknown")
+        deltas["tokens_used"] = tokens
+        deltas["endpoints"] = {endpoint: tokens}
+    return deltas
+
+
+def stage_usage_entry(work: UnitOfWork, usage_data: dict) -> None:
+    """Stage an OpenAI usage log entry together with its daily total update"""
+    work.insert(USAGE_TABLE, usage_data)
+    work.increment(
+        USAGE_DAILY_TABLE, "date", usage_data["date"], _usage_deltas(usage_data)
+    )
+
+
+def rebuild_daily_token_usage() -> int:
+    """
+    Recompute the per-day token totals from the raw OpenAI usage log.
+
+    Returns:
+        int: Number of days rebuilt
+    """
+    return _rebuild_daily_token_usage(get_db())
+
+
+def _rebuild_daily_token_usage(db: Union[LogTinyDB, SQLiteDB]) -> int:
+    """Rebuild the daily totals table of ``db`` in one commit"""
+    # Hold the storage lock so no usage entry lands between read and replace
+    with db.storage.locked():
+        totals: Dict[str, dict] = {}
+        for usage_data in db.table(USAGE_TABLE).all():
+            date = usage_data.get("date")
+            if not date:
+                continue
+            day = totals.setdefault(date, {"date": date})
+            add_counts(day, _usage_deltas(usage_data))
+        # Days whose log entries were archived keep their existing totals
+        for day in db.table(USAGE_DAILY_TABLE).all():
+            totals.setdefault(day["date"], dict(day))
+        db.replace_table(USAGE_DAILY_TABLE, [totals[date] for date in sorted(totals)])
+    logger.info(f"Rebuilt '{USAGE_DAILY_TABLE}' for {len(totals)} days")
+    return len(totals)
+
+
+def archive_before(month: str) -> List[Tuple[str, str]]:
+    """
+    Move the partitioned tables' months before ``month`` ("YYYY-MM") to
+    compressed cold storage.
+
+    Returns:
+        List[Tuple[str, str]]: The (table_name, month) partitions archived
+    """
+    return get_db().storage.archive(month)
+
+
+def migrate_to_sqlite() -> Dict[str, int]:
+    """
+    Copy the JSON database into a new SQLite database for ``DB_BACKEND=sqlite``.
+
+    Returns:
+        Dict[str, int]: Number of documents migrated per table
+    """
+    # Imported here: the migrator is only needed for this one-shot command
+    from db.migrate import migrate_to_sqlite as migrate
+
+    logger.info(f"Migrating {DB_FILE} to {SQLITE_FILE}")
+    return migrate(DB_FILE, SQLITE_FILE, indexes=INDEXES, partitions=PARTITIONS)
+
+
+def table_version(table_name: str) -> int:
+    """
+    Get a counter that changes whenever ``table_name`` changes, in this
+    process or another one sharing the database files.
+    """
+    return get_db().storage.table_version(table_name)
+
+
+def on_change(table_name: str, callback: Callable[[], None]) -> None:
+    """
+    Call ``callback()`` from a watcher thread after ``table_name`` changes,
+    in this process or another one sharing the database. Lets each process
+    keep in-memory caches and refresh them only when the data moved.
+    """
+
+    def notify(changed_tables: Set[str]) -> None:
+        if table_name in changed_tables:
+            callback()
+
+    get_db().storage.subscribe(notify)
+
+
 def search_with_logging(
     table_name: str, query: Union[Query, Dict[str, Any]]
 ) -> List[Dict[str, Any]]:
@@ -160,3 +401,33 @@ def get_with_logging(
         logger.warning(f"No matching record found in '{table_name}'")
 
     return result
+
+
+# Async counterparts for coroutines running on the NiceGUI event loop
+async def aget(
+    table_name: str, query: Union[Query, Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Get a single record without blocking the event loop"""
+    return await asyncio.to_thread(get_with_logging, table_name, query)
+
+
+async def asearch(
+    table_name: str, query: Union[Query, Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Search records without blocking the event loop"""
+    return await asyncio.to_thread(search_with_logging, table_name, query)
+
+
+async def ainsert(table_name: str, data: dict) -> int:
+    """Insert a record through the writer thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_writer, insert_with_logging, table_name, data)
+
+
+async def ainsert_many(
+    records: List[Tuple[str, dict]],
+    increments: Optional[List[Tuple[str, str, Any, Dict[str, Any]]]] = None,
+) -> List[int]:
+    """Insert records in one durable write through the writer thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_writer, insert_many, records, increments)
@@ -0,0 +1,163 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# Values we index; anything else (lists, dicts, ...) is always a scan candidate
+_SCALARS = (str, int, float, bool, type(None))
+
+_RANGE_OPS = {"<", "<=", ">", ">="}
+
+
+def _range_group(value: Any) -> Optional[str]:
+    """Group values that can be ordered against each other."""
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, (int, float)):
+        return "num"
+    return None
+
+
+class FieldIndex:
+    """Value -> document IDs map for one top-level field, with sorted keys for ranges."""
+
+    def __init__(self: "FieldIndex", field: str) -> None:
+        self.field = field
+        self._ids: Dict[Any, Set[str]] = {}
+        self._sorted: Dict[str, List[Any]] = {"str": [], "num": []}
+        # Documents whose value can't be indexed; they always need a check
+        self._unindexed: Set[str] = set()
+
+    def add(self: "FieldIndex", doc_id: str, doc: Mapping) -> None:
+        if self.field not in doc:
+            return
+        value = doc[self.field]
+        if not isinstance(value, _SCALARS):
+            self._unindexed.add(doc_id)
+            return
+        ids = self._ids.get(value)
+        if ids is None:
+            ids = self._ids[value] = set()
+            group = _range_group(value)
+            if group:
+                insort(self._sorted[group], value)
+        ids.add(doc_id)
+
+    def remove(self: "FieldIndex", doc_id: str, doc: Mapping) -> None:
+        if self.field not in doc:
+            return
+        value = doc[self.field]
+        if not isinstance(value, _SCALARS):
+            self._unindexed.discard(doc_id)
+            return
+        ids = self._ids.get(value)
+        if ids is None:
+            return
+        ids.discard(doc_id)
+        if not ids:
+            del self._ids[value]
+            group = _range_group(value)
+            if group:
+                keys = self._sorted[group]
+                pos = bisect_left(keys, value)
+                if pos < len(keys) and keys[pos] == value:
+                    del keys[pos]
+
+    def equal(self: "FieldIndex", value: Any) -> Optional[Set[str]]:
+        """IDs of documents whose field may equal ``value``."""
+        if not isinstance(value, _SCALARS):
+            return None
+        return self._ids.get(value, set()) | self._unindexed
+
+    def range(self: "FieldIndex", op: str, value: Any) -> Optional[Set[str]]:
+        """IDs of documents whose field may satisfy ``field <op> value``."""
+        group = _range_group(value)
+        if group is None or isinstance(value, bool):
+            return None
+        keys = self._sorted[group]
+        if op == "<":
+            matched = keys[: bisect_left(keys, value)]
+        elif op == "<=":
+            matched = keys[: bisect_right(keys, value)]
+        elif op == ">":
+            matched = keys[bisect_right(keys, value) :]
+        else:
+            matched = keys[bisect_left(keys, value) :]
+        ids = set(self._unindexed)
+        for key in matched:
+            ids |= self._ids[key]
+        return ids
+
+
+class TableIndexes:
+    """Secondary indexes declared for one table, plus a tiny query planner."""
+
+    def __init__(self: "TableIndexes", fields: Iterable[str]) -> None:
+        self.fields = tuple(fields)
+        self.clear()
+
+    def clear(self: "TableIndexes") -> None:
+        self._indexes = {field: FieldIndex(field) for field in self.fields}
+
+    def add(self: "TableIndexes", doc_id: str, doc: Mapping) -> None:
+        for index in self._indexes.values():
+            index.add(doc_id, doc)
+
+    def remove(self: "TableIndexes", doc_id: str, doc: Mapping) -> None:
+        for index in self._indexes.values():
+            index.remove(doc_id, doc)
+
+    def plan(self: "TableIndexes", cond: Any) -> Optional[Set[str]]:
+        """
+        Return candidate document IDs for a TinyDB query, or None for a full scan.
+
+        Equality, ``one_of``, ``fragment`` and range tests on an indexed field are
+        answered from the index, and combined through ``&`` / ``|``. Candidates
+        are a superset of the matches: callers still apply the query to them.
+        """
+        return self._plan(getattr(cond, "_hash", None))
+
+    def _plan(self: "TableIndexes", node: Optional[Tuple]) -> Optional[Set[str]]:
+        if not isinstance(node, tuple) or not node:
+            return None
+        op = node[0]
+
+        if op in ("==", "one_of") or op in _RANGE_OPS:
+            path = node[1]
+            if len(path) != 1 or path[0] not in self._indexes:
+                return None
+            index = self._indexes[path[0]]
+            if op == "==":
+                return index.equal(node[2])
+            if op == "one_of":
+                ids: Set[str] = set()
+                for value in node[2]:
+                    matched = index.equal(value)
+                    if matched is None:
+                        return None
+                    ids |= matched
+                return ids
+            return index.range(op, node[2])
+
+        if op == "fragment":
+            return self._plan_all(
+                ("==", (field,), value) for field, value in node[1].items()
+            )
+        if op == "and":
+            return self._plan_all(node[1])
+        if op == "or":
+            ids = set()
+            for child in node[1]:
+                matched = self._plan(child)
+                if matched is None:
+                    return None
+                ids |= matched
+            return ids
+        return None
+
+    def _plan_all(self: "TableIndexes", nodes: Iterable[Tuple]) -> Optional[Set[str]]:
+        """Intersect the candidates of every child that can use an index."""
+        result: Optional[Set[str]] = None
+        for child in nodes:
+            matched = self._plan(child)
+            if matched is not None:
+                result = matched if result is None else result & matched
+        return result
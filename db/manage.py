@@ -0,0 +1,75 @@
+"""
+Database maintenance commands.
+
+Usage:
+    python -m db.manage rebuild-usage
+    python -m db.manage archive [--keep-months N]
+    python -m db.manage migrate-sqlite
+"""
+
+import argparse
+from datetime import date
+
+from db.db import archive_before, migrate_to_sqlite, rebuild_daily_token_usage
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Months kept in the live table files besides the current one
+DEFAULT_KEEP_MONTHS = 6
+
+
+def rebuild_usage(args: argparse.Namespace) -> None:
+    """Recompute the per-day token totals from the raw usage log"""
+    days = rebuild_daily_token_usage()
+    logger.info(f"✅ Daily token usage rebuilt for {days} days")
+
+
+def archive(args: argparse.Namespace) -> None:
+    """Move month partitions older than the kept window to cold storage"""
+    today = date.today()
+    months = today.year * 12 + today.month - 1 - args.keep_months
+    cutoff = f"{months // 12:04d}-{months % 12 + 1:02d}"
+    moved = archive_before(cutoff)
+    for table_name, month in moved:
+        logger.info(f"📦 Archived '{table_name}' {month}")
+    logger.info(f"✅ {len(moved)} partitions older than {cutoff} archived")
+
+
+def migrate_sqlite(args: argparse.Namespace) -> None:
+    """Copy the JSON database into SQLite, to switch to DB_BACKEND=sqlite"""
+    counts = migrate_to_sqlite()
+    for table_name, count in counts.items():
+        logger.info(f"📦 '{table_name}': {count} documents")
+    logger.info(f"✅ {sum(counts.values())} documents migrated to SQLite")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muse Observatory database tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "rebuild-usage", help="recompute token_usage_daily from openai_usage_log"
+    ).set_defaults(handler=rebuild_usage)
+
+    archive_parser = commands.add_parser(
+        "archive", help="move old months of partitioned tables to cold storage"
+    )
+    archive_parser.add_argument(
+        "--keep-months",
+        type=int,
+        default=DEFAULT_KEEP_MONTHS,
+        help=f"months kept besides the current one (default {DEFAULT_KEEP_MONTHS})",
+    )
+    archive_parser.set_defaults(handler=archive)
+
+    commands.add_parser(
+        "migrate-sqlite", help="copy the JSON database into a new SQLite database"
+    ).set_defaults(handler=migrate_sqlite)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+One-shot migration of the JSON database into the SQLite backend.
+
+Documents are streamed from the JSON files instead of loading the whole
+database, then the write-ahead logs are replayed on top, so every committed
+record arrives in SQLite with its document ID.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from db.partition import ARCHIVE_DIR_NAME, partition_of
+from db.sqlite import SQLiteDB, SQLiteStorage
+from db.storage import MANIFEST_NAME
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Documents written to SQLite per batch
+BATCH_SIZE = 1000
+
+_decoder = json.JSONDecoder()
+
+
+class _JSONStream:
+    """Pull JSON values one at a time from a file that is read in chunks."""
+
+    def __init__(self: "_JSONStream", f: IO[str], chunk_size: int = 1 << 16) -> None:
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+
+    def _fill(self: "_JSONStream") -> bool:
+        data = self._f.read(self._chunk_size)
+        if not data:
+            return False
+        self._buf = self._buf[self._pos :] + data
+        self._pos = 0
+        return True
+
+    def peek(self: "_JSONStream") -> str:
+        """Return the next non-blank character without consuming it."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buf) or not self._fill():
+                return self._buf[self._pos : self._pos + 1]
+
+    def expect(self: "_JSONStream", char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON database, found {found!r}")
+        self._pos += 1
+
+    def skip(self: "_JSONStream", char: str) -> bool:
+        """Consume ``char`` if it comes next."""
+        if self.peek() == char:
+            self._pos += 1
+            return True
+        return False
+
+    def value(self: "_JSONStream") -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def _members(stream: _JSONStream) -> Iterator[str]:
+    """Yield the keys of a JSON object, leaving the stream at each value."""
+    stream.expect("{")
+    if stream.skip("}"):
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        yield key
+        if not stream.skip(","):
+            break
+    stream.expect("}")
+
+
+def iter_snapshot(f: IO[str]) -> Iterator[Tuple[str, str, dict]]:
+    """Yield ``(table, doc_id, doc)`` from a TinyDB JSON file, one at a time."""
+    stream = _JSONStream(f)
+    if not stream.peek():
+        return
+    for name in _members(stream):
+        for doc_id in _members(stream):
+            yield name, doc_id, stream.value()
+
+
+def iter_json_database(path: Path) -> Iterator[Tuple[str, str, dict]]:
+    """
+    Yield every document stored in the JSON files of the database at ``path``.
+
+    Reads the single-file layout if it hasn't been split into per-table files
+    yet, otherwise the table files one partition at a time.
+    """
+    data_dir = path.with_suffix("")
+    if not (data_dir / MANIFEST_NAME).exists():
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                yield from iter_snapshot(f)
+        return
+    for entry in sorted(data_dir.iterdir()):
+        if entry.name in (MANIFEST_NAME, ARCHIVE_DIR_NAME):
+            continue
+        if entry.is_dir():
+            name, files = entry.name, sorted(entry.glob("*.json"))
+        elif entry.suffix == ".json":
+            name, files = entry.stem, [entry]
+        else:
+            continue
+        for part_file in files:
+            with open(part_file, encoding="utf-8") as f:
+                stream = _JSONStream(f)
+                for doc_id in _members(stream):
+                    yield name, doc_id, stream.value()
+
+
+def migrate_to_sqlite(
+    json_path: Path,
+    sqlite_path: Path,
+    indexes: Optional[Dict[str, List[str]]] = None,
+    partitions: Optional[Dict[str, str]] = None,
+) -> Dict[str, int]:
+    """
+    Copy the JSON database at ``json_path`` into a new SQLite database.
+
+    Documents keep their IDs. Commits still sitting in the write-ahead logs
+    are replayed after the bulk copy. Returns the number of documents per table.
+    """
+    if sqlite_path.exists():
+        raise FileExistsError(f"{sqlite_path} already exists, not migrating twice")
+    tmp_path = sqlite_path.with_name(sqlite_path.name + ".migrating")
+    for stale in tmp_path.parent.glob(tmp_path.name + "*"):
+        stale.unlink()
+
+    db = SQLiteDB(tmp_path, indexes=indexes, partitions=partitions)
+    storage = db.storage
+    with storage.transaction() as conn:
+        # Empty tables have no file, only a manifest entry
+        last_ids: Dict[str, int] = {}
+        manifest_path = json_path.with_suffix("") / MANIFEST_NAME
+        if manifest_path.exists():
+            with open(manifest_path, encoding="utf-8") as f:
+                for name, info in json.load(f).get("tables", {}).items():
+                    storage.ensure_table(conn, name)
+                    last_ids[name] = info.get("last_id", 0)
+
+        batch: List[Tuple[str, str, dict]] = []
+        for row in iter_json_database(json_path):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                _write_batch(storage, conn, batch)
+                batch = []
+        _write_batch(storage, conn, batch)
+
+        for wal in (".wal.compacting", ".wal"):
+            wal_path = json_path.with_name(json_path.name + wal)
+            if wal_path.exists():
+                replayed = _replay_log(db, conn, wal_path)
+                logger.info(f"Replayed {replayed} log entries from {wal_path}")
+
+        # IDs of documents deleted before the migration stay taken
+        for name, last_id in last_ids.items():
+            if storage.exists(name):
+                storage.reserve_ids(conn, name, last_id)
+
+    counts = {name: len(db.table(name)) for name in sorted(db.tables())}
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        moved = tmp_path.with_name(tmp_path.name + suffix)
+        if moved.exists():
+            moved.rename(sqlite_path.with_name(sqlite_path.name + suffix))
+    return counts
+
+
+def _write_batch(
+    storage: SQLiteStorage,
+    conn: sqlite3.Connection,
+    batch: List[Tuple[str, str, dict]],
+) -> None:
+    rows: Dict[str, List[Tuple[int, dict]]] = {}
+    for name, doc_id, doc in batch:
+        rows.setdefault(name, []).append((int(doc_id), doc))
+    for name, table_rows in rows.items():
+        storage.ensure_table(conn, name)
+        storage.load(conn, name, table_rows)
+        storage.touch(conn, name)
+
+
+def _replay_log(db: SQLiteDB, conn: sqlite3.Connection, path: Path) -> int:
+    """Apply the change records of a write-ahead log file to SQLite."""
+    storage = db.storage
+    replayed = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping torn write-ahead log entry in {path}")
+                continue
+            # The generation header, see LogStructuredStorage
+            if not isinstance(records, list):
+                continue
+            for op, name, *args in records:
+                if op == "put":
+                    storage.ensure_table(conn, name)
+                    storage.load(conn, name, [(int(args[0]), args[1])])
+                elif op == "del":
+                    db.table(name).remove(doc_ids=[int(args[0])])
+                elif op == "clear":
+                    # Cleared tables still exist, even if just dropped
+                    storage.ensure_table(conn, name)
+                    db.table(name).truncate()
+                elif op == "drop":
+                    db.drop_table(name)
+                elif op == "archive":
+                    field = storage.partitions.get(name)
+                    db.table(name).remove(
+                        lambda doc: partition_of(doc.get(field)) == args[0]
+                    )
+                storage.touch(conn, name)
+            replayed += 1
+    return replayed
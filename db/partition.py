@@ -0,0 +1,113 @@
+import gzip
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Partition for documents whose key isn't a "YYYY-MM..." string
+UNDATED = "undated"
+
+# Cold storage folder, next to the live table files
+ARCHIVE_DIR_NAME = "archive"
+
+_MONTH = re.compile(r"\d{4}-\d{2}")
+
+_RANGE_OPS = {"<", "<=", ">", ">="}
+
+
+def partition_of(value: Any) -> str:
+    """Return the month partition (``"YYYY-MM"``) for a date or timestamp."""
+    if isinstance(value, str) and _MONTH.match(value):
+        return value[:7]
+    return UNDATED
+
+
+def plan_partitions(
+    cond: Any, field: str, available: Iterable[str]
+) -> Optional[Set[str]]:
+    """
+    Return the partitions a TinyDB query on ``field`` can match, or None for all.
+
+    Works on the same query AST as :meth:`db.index.TableIndexes.plan`. Range
+    tests keep every month that overlaps the range, and the undated partition
+    is always kept for them since its documents can't be placed by month.
+    """
+    return _plan(getattr(cond, "_hash", None), field, sorted(available))
+
+
+def _plan(node: Optional[Tuple], field: str, available: list) -> Optional[Set[str]]:
+    if not isinstance(node, tuple) or not node:
+        return None
+    op = node[0]
+
+    if op in ("==", "one_of") or op in _RANGE_OPS:
+        if tuple(node[1]) != (field,):
+            return None
+        if op == "==":
+            return {partition_of(node[2])}
+        if op == "one_of":
+            return {partition_of(value) for value in node[2]}
+        month = partition_of(node[2])
+        if month == UNDATED:
+            return None
+        # A date below (above) the bound lives in the bound's month or earlier (later)
+        if op in ("<", "<="):
+            parts = {part for part in available if part <= month}
+        else:
+            parts = {part for part in available if part >= month}
+        return parts | {UNDATED}
+
+    if op == "fragment":
+        if field not in node[1]:
+            return None
+        return {partition_of(node[1][field])}
+    if op == "and":
+        result: Optional[Set[str]] = None
+        for child in node[1]:
+            parts = _plan(child, field, available)
+            if parts is not None:
+                result = parts if result is None else result & parts
+        return result
+    if op == "or":
+        result = set()
+        for child in node[1]:
+            parts = _plan(child, field, available)
+            if parts is None:
+                return None
+            result |= parts
+        return result
+    return None
+
+
+def archived_partitions(archive_dir: Path, name: str) -> List[str]:
+    """Return the months of a table held in cold storage."""
+    folder = archive_dir / name
+    if not folder.is_dir():
+        return []
+    return sorted(path.name[: -len(".json.gz")] for path in folder.glob("*.json.gz"))
+
+
+def read_archive(archive_dir: Path, name: str, part: str) -> Dict[str, dict]:
+    """Return the documents of an archived partition."""
+    path = archive_dir / name / f"{part}.json.gz"
+    if not path.exists():
+        return {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_archive(
+    archive_dir: Path, name: str, part: str, docs: Dict[str, dict]
+) -> None:
+    """Durably write a partition's documents to ``<table>/<part>.json.gz``."""
+    # Late writes to an already archived month are merged into it
+    docs = {**read_archive(archive_dir, name, part), **docs}
+    path = archive_dir / name / f"{part}.json.gz"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(docs, f)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
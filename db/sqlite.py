@@ -0,0 +1,718 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from tinydb import Query
+from tinydb.queries import QueryLike
+from tinydb.table import Document
+
+from db.partition import (
+    ARCHIVE_DIR_NAME,
+    UNDATED,
+    archived_partitions,
+    partition_of,
+    read_archive,
+    write_archive,
+)
+from db.storage import add_counts
+from db.watch import ChangeWatcher
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Per-table change counters; also the list of tables created through us
+META_TABLE = "_tables"
+
+# How long a writer waits for another process's transaction before failing
+DEFAULT_TIMEOUT = 30.0
+
+_RANGE_OPS = {"<", "<=", ">", ">="}
+
+# Values that compare the same way in SQLite and Python
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _quote(name: str) -> str:
+    """Quote an SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _json_path(field: str) -> str:
+    """SQL string literal selecting a top-level JSON field."""
+    path = '$."' + field.replace('"', '""') + '"'
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _dumps(doc: Mapping) -> str:
+    return json.dumps(dict(doc), ensure_ascii=False, separators=(",", ":"))
+
+
+class SQLiteStorage:
+    """
+    SQLite database in WAL mode, one SQL table per TinyDB table.
+
+    Documents are stored as JSON in a ``doc`` column under an integer
+    ``doc_id`` key. Fields declared in ``indexes`` as ``{table: [field, ...]}``
+    become generated columns with an SQL index, so queries on them are
+    answered by SQLite instead of a scan. Every thread gets its own
+    connection; writes run in ``BEGIN IMMEDIATE`` transactions, which makes
+    them safe across threads and processes sharing the file.
+    """
+
+    def __init__(
+        self: "SQLiteStorage",
+        path: Union[str, Path],
+        indexes: Optional[Mapping[str, Iterable[str]]] = None,
+        partitions: Optional[Mapping[str, str]] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        self.path = Path(path)
+        self.archive_dir = self.path.with_suffix("") / ARCHIVE_DIR_NAME
+        self.indexes = {name: tuple(fields) for name, fields in (indexes or {}).items()}
+        for fields in self.indexes.values():
+            if {"doc", "doc_id"} & set(fields):
+                raise ValueError("'doc' and 'doc_id' can't be indexed fields")
+        self.partitions = dict(partitions or {})
+        self.timeout = timeout
+        self._local = threading.local()
+        # Tables known to exist with their indexed columns in place
+        self._ready: Set[str] = set()
+        self._watcher: Optional[ChangeWatcher] = None
+        self._watcher_lock = threading.Lock()
+        with self.transaction() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {META_TABLE} "
+                "(name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    # --- Connections and transactions ---
+
+    def connection(self: "SQLiteStorage") -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self: "SQLiteStorage") -> Iterator[sqlite3.Connection]:
+        """
+        Run a write transaction; nested blocks join the outermost one.
+
+        Everything inside is committed together, or rolled back if it raises.
+        """
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            # Tables created inside the transaction are gone again
+            self._ready.clear()
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    # Same name as LogStructuredStorage, for code holding the write lock
+    locked = transaction
+
+    def close(self: "SQLiteStorage") -> None:
+        """Close this thread's connection."""
+        if self._watcher is not None:
+            self._watcher.stop()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- Schema ---
+
+    def table_names(self: "SQLiteStorage") -> Set[str]:
+        """Return the names of all document tables."""
+        rows = self.connection().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            f"AND name != '{META_TABLE}' AND name NOT LIKE 'sqlite_%'"
+        )
+        return {name for (name,) in rows}
+
+    def exists(self: "SQLiteStorage", name: str) -> bool:
+        if name in self._ready:
+            return True
+        row = (
+            self.connection()
+            .execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (name,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return False
+        # Made by another process or version: it may lack indexed columns,
+        # which SQLite would silently read as string literals
+        with self.transaction() as conn:
+            self.ensure_table(conn, name)
+        return True
+
+    def ensure_table(
+        self: "SQLiteStorage", conn: sqlite3.Connection, name: str
+    ) -> None:
+        """Create a table and its indexed columns if they don't exist yet."""
+        if name in self._ready:
+            return
+        table = _quote(name)
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()
+        if row and "AUTOINCREMENT" not in row[0].upper():
+            # Earlier tables reused the largest ID once it was deleted; the
+            # table is copied over, its indexes are made again below
+            old = _quote(name + "__old")
+            conn.execute(f"ALTER TABLE {table} RENAME TO {old}")
+            self._create_table(conn, table)
+            conn.execute(
+                f"INSERT INTO {table} (doc_id, doc) SELECT doc_id, doc FROM {old}"
+            )
+            conn.execute(f"DROP TABLE {old}")
+        else:
+            self._create_table(conn, table)
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+        for field in self.indexes.get(name, ()):
+            if field not in columns:
+                # Virtual generated columns can be added to existing tables
+                conn.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {_quote(field)} "
+                    f"GENERATED ALWAYS AS (json_extract(doc, {_json_path(field)})) "
+                    "VIRTUAL"
+                )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(name + '__' + field)} "
+                f"ON {table} ({_quote(field)})"
+            )
+        conn.execute(f"INSERT OR IGNORE INTO {META_TABLE} (name) VALUES (?)", (name,))
+        self._ready.add(name)
+
+    @staticmethod
+    def _create_table(conn: sqlite3.Connection, table: str) -> None:
+        # Like TinyDB, never hand out the ID of a deleted document again
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(doc_id INTEGER PRIMARY KEY AUTOINCREMENT, doc TEXT NOT NULL)"
+        )
+
+    def clear(self: "SQLiteStorage", conn: sqlite3.Connection, name: str) -> None:
+        """Delete a table's documents; IDs start over, as in TinyDB."""
+        conn.execute(f"DELETE FROM {_quote(name)}")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (name,))
+
+    def reserve_ids(
+        self: "SQLiteStorage", conn: sqlite3.Connection, name: str, last_id: int
+    ) -> None:
+        """Never hand out IDs up to ``last_id``, e.g. of deleted documents."""
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?",
+            (last_id, name),
+        )
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? WHERE NOT EXISTS "
+            "(SELECT 1 FROM sqlite_sequence WHERE name = ?)",
+            (name, last_id, name),
+        )
+
+    def touch(self: "SQLiteStorage", conn: sqlite3.Connection, name: str) -> None:
+        """Bump a table's version inside the current write transaction."""
+        conn.execute(
+            f"INSERT INTO {META_TABLE} (name, version) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            (name,),
+        )
+
+    def table_version(self: "SQLiteStorage", name: str) -> int:
+        """
+        Return a counter that changes whenever the table changes.
+
+        It is stored with the data, so writes from other processes count too.
+        """
+        row = (
+            self.connection()
+            .execute(f"SELECT version FROM {META_TABLE} WHERE name = ?", (name,))
+            .fetchone()
+        )
+        return row[0] if row else 0
+
+    def versions(self: "SQLiteStorage") -> Dict[str, int]:
+        """Return every table's change counter, see :meth:`table_version`."""
+        rows = self.connection().execute(f"SELECT name, version FROM {META_TABLE}")
+        return dict(rows.fetchall())
+
+    def subscribe(self: "SQLiteStorage", callback: Callable[[Set[str]], None]) -> None:
+        """Call ``callback(changed_tables)`` from a watcher thread on changes."""
+        with self._watcher_lock:
+            if self._watcher is None:
+                self._watcher = ChangeWatcher(self.versions)
+        self._watcher.subscribe(callback)
+
+    def drop(self: "SQLiteStorage", name: str) -> None:
+        with self.transaction() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(name)}")
+            self.touch(conn, name)
+        self._ready.discard(name)
+
+    # --- Queries ---
+
+    def where(
+        self: "SQLiteStorage", name: str, cond: Any
+    ) -> Optional[Tuple[str, list]]:
+        """
+        Translate a TinyDB query into an SQL filter on indexed columns.
+
+        Equality, ``one_of``, ``fragment`` and range tests on indexed fields
+        are translated and combined through ``&`` / ``|``. The filter selects
+        a superset of the matches; callers still apply the query to the rows.
+        Returns None when the query can't use an index.
+        """
+        return self._where(getattr(cond, "_hash", None), self.indexes.get(name, ()))
+
+    def _where(
+        self: "SQLiteStorage", node: Optional[Tuple], fields: Tuple[str, ...]
+    ) -> Optional[Tuple[str, list]]:
+        if not isinstance(node, tuple) or not node:
+            return None
+        op = node[0]
+
+        if op in ("==", "one_of") or op in _RANGE_OPS:
+            path = node[1]
+            if len(path) != 1 or path[0] not in fields:
+                return None
+            column = _quote(path[0])
+            if op == "==":
+                return self._equal(column, node[2])
+            if op == "one_of":
+                clauses = [self._equal(column, value) for value in node[2]]
+                return self._combine(clauses, " OR ", empty="0")
+            value = node[2]
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                return None
+            return f"{column} {op} ?", [value]
+
+        if op == "fragment":
+            clauses = [
+                self._where(("==", (field,), value), fields)
+                for field, value in node[1].items()
+            ]
+            return self._combine([c for c in clauses if c], " AND ")
+        if op == "and":
+            clauses = [self._where(child, fields) for child in node[1]]
+            return self._combine([c for c in clauses if c], " AND ")
+        if op == "or":
+            clauses = [self._where(child, fields) for child in node[1]]
+            if not clauses or None in clauses:
+                return None
+            return self._combine(clauses, " OR ")
+        return None
+
+    @staticmethod
+    def _equal(column: str, value: Any) -> Optional[Tuple[str, list]]:
+        if not isinstance(value, _SCALARS):
+            return None
+        if value is None:
+            return f"{column} IS NULL", []
+        return f"{column} = ?", [value]
+
+    @staticmethod
+    def _combine(
+        clauses: List[Optional[Tuple[str, list]]],
+        joiner: str,
+        empty: Optional[str] = None,
+    ) -> Optional[Tuple[str, list]]:
+        if None in clauses:
+            return None
+        if not clauses:
+            return (empty, []) if empty else None
+        sql = joiner.join(f"({clause})" for clause, _ in clauses)
+        return sql, [param for _, params in clauses for param in params]
+
+    def select(
+        self: "SQLiteStorage", name: str, cond: Any = None
+    ) -> Iterator[Tuple[int, dict]]:
+        """Yield ``(doc_id, doc)`` rows a query needs to look at, in ID order."""
+        if not self.exists(name):
+            return
+        where = self.where(name, cond) if cond is not None else None
+        sql = f"SELECT doc_id, doc FROM {_quote(name)}"
+        params: list = []
+        if where is not None:
+            sql += f" WHERE {where[0]}"
+            params = where[1]
+        for doc_id, doc in self.connection().execute(sql + " ORDER BY doc_id", params):
+            yield doc_id, json.loads(doc)
+
+    # --- Writes ---
+
+    def insert(
+        self: "SQLiteStorage",
+        conn: sqlite3.Connection,
+        name: str,
+        doc: Mapping,
+        doc_id: Optional[int] = None,
+    ) -> int:
+        """Insert a document inside the current transaction; return its ID."""
+        cursor = conn.execute(
+            f"INSERT INTO {_quote(name)} (doc_id, doc) VALUES (?, ?)",
+            (doc_id, _dumps(doc)),
+        )
+        return cursor.lastrowid
+
+    def load(
+        self: "SQLiteStorage",
+        conn: sqlite3.Connection,
+        name: str,
+        rows: Iterable[Tuple[int, Mapping]],
+    ) -> None:
+        """Write ``(doc_id, doc)`` pairs as they are, replacing existing IDs."""
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {_quote(name)} (doc_id, doc) VALUES (?, ?)",
+            ((doc_id, _dumps(doc)) for doc_id, doc in rows),
+        )
+
+    # --- Cold storage ---
+
+    def archive(self: "SQLiteStorage", before: str) -> List[Tuple[str, str]]:
+        """
+        Move documents of the partitioned tables from months before ``before``
+        (``"YYYY-MM"``) to the same gzip cold storage as the JSON backend.
+
+        Rows are deleted in the transaction that read them, after their
+        archive files were written.
+        """
+        moved = []
+        for name, field in sorted(self.partitions.items()):
+            if not self.exists(name):
+                continue
+            with self.transaction() as conn:
+                months: Dict[str, Dict[str, dict]] = {}
+                rows = conn.execute(
+                    f"SELECT doc_id, doc FROM {_quote(name)} "
+                    f"WHERE json_extract(doc, {_json_path(field)}) < ?",
+                    (before,),
+                )
+                for doc_id, doc in rows:
+                    doc = json.loads(doc)
+                    part = partition_of(doc.get(field))
+                    if part != UNDATED and part < before:
+                        months.setdefault(part, {})[str(doc_id)] = doc
+                for part, docs in sorted(months.items()):
+                    write_archive(self.archive_dir, name, part, docs)
+                    conn.executemany(
+                        f"DELETE FROM {_quote(name)} WHERE doc_id = ?",
+                        [(int(doc_id),) for doc_id in docs],
+                    )
+                    moved.append((name, part))
+                    logger.info(f"Archived {len(docs)} documents of '{name}' {part}")
+                if months:
+                    self.touch(conn, name)
+        return moved
+
+    def archived_partitions(self: "SQLiteStorage", name: str) -> List[str]:
+        """Return the months of a table held in cold storage."""
+        return archived_partitions(self.archive_dir, name)
+
+    def read_archive(self: "SQLiteStorage", name: str, part: str) -> Dict[str, dict]:
+        """Return the documents of an archived partition."""
+        return read_archive(self.archive_dir, name, part)
+
+
+class SQLiteTable:
+    """
+    The parts of TinyDB's ``Table`` API the app uses, on top of SQLite.
+
+    Documents come back as TinyDB ``Document`` objects, so calling code works
+    the same with either backend.
+    """
+
+    def __init__(self: "SQLiteTable", storage: SQLiteStorage, name: str) -> None:
+        self._storage = storage
+        self._name = name
+
+    @property
+    def name(self: "SQLiteTable") -> str:
+        return self._name
+
+    def __repr__(self: "SQLiteTable") -> str:
+        return f"<SQLiteTable name={self._name!r}, total={len(self)}>"
+
+    def insert(self: "SQLiteTable", document: Mapping) -> int:
+        return self.insert_multiple([document])[0]
+
+    def insert_multiple(self: "SQLiteTable", documents: Iterable[Mapping]) -> List[int]:
+        doc_ids = []
+        with self._storage.transaction() as conn:
+            self._storage.ensure_table(conn, self._name)
+            for document in documents:
+                if not isinstance(document, Mapping):
+                    raise ValueError("Document is not a Mapping")
+                doc_id = getattr(document, "doc_id", None)
+                doc_ids.append(self._storage.insert(conn, self._name, document, doc_id))
+            self._storage.touch(conn, self._name)
+        return doc_ids
+
+    def all(self: "SQLiteTable") -> List[Document]:
+        return list(iter(self))
+
+    def __iter__(self: "SQLiteTable") -> Iterator[Document]:
+        for doc_id, doc in self._storage.select(self._name):
+            yield Document(doc, doc_id)
+
+    def __len__(self: "SQLiteTable") -> int:
+        if not self._storage.exists(self._name):
+            return 0
+        row = (
+            self._storage.connection()
+            .execute(f"SELECT COUNT(*) FROM {_quote(self._name)}")
+            .fetchone()
+        )
+        return row[0]
+
+    def search(self: "SQLiteTable", cond: QueryLike) -> List[Document]:
+        return [
+            Document(doc, doc_id)
+            for doc_id, doc in self._storage.select(self._name, cond)
+            if cond(doc)
+        ]
+
+    def get(
+        self: "SQLiteTable",
+        cond: Optional[QueryLike] = None,
+        doc_id: Optional[int] = None,
+        doc_ids: Optional[List] = None,
+    ) -> Optional[Union[Document, List[Document]]]:
+        if doc_id is not None:
+            found = self._by_ids([doc_id])
+            return found[0] if found else None
+        if doc_ids is not None:
+            return self._by_ids(doc_ids)
+        if cond is None:
+            raise RuntimeError("You have to pass either cond or doc_id or doc_ids")
+        for doc_id_, doc in self._storage.select(self._name, cond):
+            if cond(doc):
+                return Document(doc, doc_id_)
+        return None
+
+    def _by_ids(self: "SQLiteTable", doc_ids: Iterable[int]) -> List[Document]:
+        doc_ids = [int(doc_id) for doc_id in doc_ids]
+        if not doc_ids or not self._storage.exists(self._name):
+            return []
+        marks = ",".join("?" * len(doc_ids))
+        rows = self._storage.connection().execute(
+            f"SELECT doc_id, doc FROM {_quote(self._name)} "
+            f"WHERE doc_id IN ({marks}) ORDER BY doc_id",
+            doc_ids,
+        )
+        return [Document(json.loads(doc), doc_id) for doc_id, doc in rows]
+
+    def contains(
+        self: "SQLiteTable",
+        cond: Optional[QueryLike] = None,
+        doc_id: Optional[int] = None,
+    ) -> bool:
+        if doc_id is not None:
+            return bool(self._by_ids([doc_id]))
+        return self.get(cond) is not None
+
+    def count(self: "SQLiteTable", cond: QueryLike) -> int:
+        return len(self.search(cond))
+
+    def update(
+        self: "SQLiteTable",
+        fields: Union[Mapping, Callable[[Mapping], None]],
+        cond: Optional[QueryLike] = None,
+        doc_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """Update matching documents (all of them without a filter)."""
+        updated = []
+        with self._storage.transaction() as conn:
+            if doc_ids is not None:
+                rows = [(doc.doc_id, dict(doc)) for doc in self._by_ids(doc_ids)]
+            else:
+                rows = [
+                    (doc_id, doc)
+                    for doc_id, doc in self._storage.select(self._name, cond)
+                    if cond is None or cond(doc)
+                ]
+            for doc_id, doc in rows:
+                if callable(fields):
+                    fields(doc)
+                else:
+                    doc.update(fields)
+                conn.execute(
+                    f"UPDATE {_quote(self._name)} SET doc = ? WHERE doc_id = ?",
+                    (_dumps(doc), doc_id),
+                )
+                updated.append(doc_id)
+            if updated:
+                self._storage.touch(conn, self._name)
+        return updated
+
+    def remove(
+        self: "SQLiteTable",
+        cond: Optional[QueryLike] = None,
+        doc_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """Remove matching documents."""
+        if cond is None and doc_ids is None:
+            raise RuntimeError("Use truncate() to remove all documents")
+        with self._storage.transaction() as conn:
+            if doc_ids is not None:
+                removed = [doc.doc_id for doc in self._by_ids(doc_ids)]
+            else:
+                removed = [
+                    doc_id
+                    for doc_id, doc in self._storage.select(self._name, cond)
+                    if cond(doc)
+                ]
+            conn.executemany(
+                f"DELETE FROM {_quote(self._name)} WHERE doc_id = ?",
+                [(doc_id,) for doc_id in removed],
+            )
+            if removed:
+                self._storage.touch(conn, self._name)
+        return removed
+
+    def truncate(self: "SQLiteTable") -> None:
+        if not self._storage.exists(self._name):
+            return
+        with self._storage.transaction() as conn:
+            self._storage.ensure_table(conn, self._name)
+            self._storage.clear(conn, self._name)
+            self._storage.touch(conn, self._name)
+
+    def clear_cache(self: "SQLiteTable") -> None:
+        """Nothing to clear: queries always go to SQLite."""
+
+
+class SQLiteDB:
+    """
+    Drop-in replacement for :class:`db.storage.LogTinyDB` backed by SQLite.
+
+    Offers the same table API, ``insert_many`` and ``replace_table``, so the
+    helpers in :mod:`db.db` work unchanged with either backend.
+    """
+
+    table_class = SQLiteTable
+
+    def __init__(
+        self: "SQLiteDB",
+        path: Union[str, Path],
+        indexes: Optional[Mapping[str, Iterable[str]]] = None,
+        partitions: Optional[Mapping[str, str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self.storage = SQLiteStorage(path, indexes, partitions, **kwargs)
+        self._tables: Dict[str, SQLiteTable] = {}
+
+    def __repr__(self: "SQLiteDB") -> str:
+        return f"<SQLiteDB path={str(self.storage.path)!r}>"
+
+    def table(self: "SQLiteDB", name: str) -> SQLiteTable:
+        if name not in self._tables:
+            self._tables[name] = self.table_class(self.storage, name)
+        return self._tables[name]
+
+    def tables(self: "SQLiteDB") -> Set[str]:
+        return self.storage.table_names()
+
+    def drop_table(self: "SQLiteDB", name: str) -> None:
+        self.storage.drop(name)
+        self._tables.pop(name, None)
+
+    def drop_tables(self: "SQLiteDB") -> None:
+        for name in self.tables():
+            self.drop_table(name)
+
+    def close(self: "SQLiteDB") -> None:
+        self.storage.close()
+
+    def insert_many(
+        self: "SQLiteDB",
+        records: Iterable[Tuple[str, Mapping]],
+        increments: Iterable[Tuple[str, str, Any, Mapping]] = (),
+    ) -> List[int]:
+        """Insert documents and bump counters in one transaction, see ``LogTinyDB``."""
+        records = list(records)
+        for _, document in records:
+            if not isinstance(document, Mapping):
+                raise ValueError("Document is not a Mapping")
+        storage = self.storage
+        doc_ids = []
+        with storage.transaction() as conn:
+            touched = set()
+            for table_name, document in records:
+                storage.ensure_table(conn, table_name)
+                doc_ids.append(storage.insert(conn, table_name, document))
+                touched.add(table_name)
+
+            for table_name, key_field, key, deltas in increments:
+                storage.ensure_table(conn, table_name)
+                cond = Query()[key_field] == key
+                for doc_id, doc in storage.select(table_name, cond):
+                    if cond(doc):
+                        add_counts(doc, deltas)
+                        conn.execute(
+                            f"UPDATE {_quote(table_name)} SET doc = ? "
+                            "WHERE doc_id = ?",
+                            (_dumps(doc), doc_id),
+                        )
+                        break
+                else:
+                    doc = {key_field: key}
+                    add_counts(doc, deltas)
+                    storage.insert(conn, table_name, doc)
+                touched.add(table_name)
+            for table_name in touched:
+                storage.touch(conn, table_name)
+        return doc_ids
+
+    def replace_table(
+        self: "SQLiteDB", table_name: str, documents: Iterable[Mapping]
+    ) -> None:
+        """Atomically replace a table's contents with ``documents``."""
+        with self.storage.transaction() as conn:
+            self.storage.ensure_table(conn, table_name)
+            self.storage.clear(conn, table_name)
+            for doc_id, document in enumerate(documents, start=1):
+                self.storage.insert(conn, table_name, document, doc_id)
+            self.storage.touch(conn, table_name)
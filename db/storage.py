@@ -0,0 +1,1083 @@
+import copy
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from tinydb import Query, TinyDB
+from tinydb.queries import QueryLike
+from tinydb.storages import Storage
+from tinydb.table import Document, Table
+
+from db.index import TableIndexes
+from db.partition import (
+    ARCHIVE_DIR_NAME,
+    UNDATED,
+    archived_partitions,
+    partition_of,
+    plan_partitions,
+    read_archive,
+    write_archive,
+)
+from db.watch import ChangeWatcher
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Fold the write-ahead log back into the table files once it grows past this size
+DEFAULT_COMPACT_BYTES = 4 * 1024 * 1024
+
+# Marker for documents removed inside a pending change set
+_DELETED = object()
+
+MANIFEST_NAME = "manifest.json"
+
+
+class LogStructuredStorage(Storage):
+    """
+    TinyDB storage that appends every commit to a write-ahead log.
+
+    Each table lives in its own JSON file under ``<file stem>/``, using
+    TinyDB's document layout. Tables listed in ``partitions`` as
+    ``{table: field}`` are further split into one file per month of that
+    field (``<table>/<YYYY-MM>.json``). A ``manifest.json`` records the
+    partitions, their sizes and each table's last document ID, so files are
+    only read when a query needs them: a query filtering on the partition
+    field loads just the months it covers.
+
+    Each commit is appended to ``<file>.wal`` as one JSON line holding a list
+    of change records, and a background thread writes the changed partitions
+    back once the log grows past ``compact_bytes``. On start-up the log is
+    replayed; a torn final line left by a crash is ignored, so a commit is
+    either fully visible or not at all. A database still in the single-file
+    snapshot layout is loaded as-is and split up by its first compaction.
+
+    Every compaction starts a new log whose first line records its
+    generation, one more than the log it replaces; the manifest records the
+    generation too. Processes sharing the files coordinate through an
+    advisory ``flock`` on ``<file>.lock``: commits and compaction hold it
+    exclusively, and a process reloading after another one compacted holds
+    it shared. Reads only check the log's generation and length, and replay
+    what other processes appended since; a log of another generation means
+    it was compacted elsewhere, so the state is reloaded.
+
+    ``indexes`` declares secondary indexes as ``{table: [field, ...]}``; they
+    are maintained on every applied change and used by :class:`LogTable` to
+    answer equality and range queries without scanning the table.
+    """
+
+    def __init__(
+        self: "LogStructuredStorage",
+        path: Union[str, Path],
+        compact_bytes: int = DEFAULT_COMPACT_BYTES,
+        fsync: bool = True,
+        indexes: Optional[Mapping[str, Iterable[str]]] = None,
+        partitions: Optional[Mapping[str, str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self.path = Path(path)
+        self.wal_path = self.path.with_name(self.path.name + ".wal")
+        self.compacting_path = self.path.with_name(self.path.name + ".wal.compacting")
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.data_dir = self.path.with_suffix("")
+        self.manifest_path = self.data_dir / MANIFEST_NAME
+        self.archive_dir = self.data_dir / ARCHIVE_DIR_NAME
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        self.partitions = dict(partitions or {})
+        self.lock = threading.RLock()
+        # Cross-process lock file, held while ``_flock_depth`` is non-zero
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+        self._flock_depth = 0
+        self._watcher: Optional[ChangeWatcher] = None
+
+        # Loaded documents of each table
+        self._tables: Dict[str, Dict[str, dict]] = {}
+        # Partitions of each table: loaded document IDs, or None if not read yet
+        self._parts: Dict[str, Dict[str, Optional[Set[str]]]] = {}
+        # Document counts of partitions that haven't been read yet
+        self._disk_counts: Dict[str, Dict[str, int]] = {}
+        # Partitions changed since they were last written
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._last_ids: Dict[str, int] = {}
+        # Bumped on every change to a table, including other processes' writes
+        self._versions: Dict[str, int] = {}
+        self._indexes = {
+            name: TableIndexes(fields) for name, fields in (indexes or {}).items()
+        }
+        # Set while the old single-file snapshot still needs splitting up
+        self._migrating = False
+        # Generation of the log we follow, where its entries start and how
+        # far we replayed it. File identities can't tell logs apart: a new
+        # log may get the inode number of the one it replaced.
+        self._generation = 0
+        self._wal_start = 0
+        self._wal_offset = 0
+
+        self._compaction_lock = threading.Lock()
+        self._compact_requested = threading.Event()
+        self._closed = False
+
+        with self.lock:
+            self._reload()
+        self._compactor = threading.Thread(
+            target=self._compaction_loop, name="db-compactor", daemon=True
+        )
+        self._compactor.start()
+        if self._migrating or self._wal_offset > self.compact_bytes:
+            self._compact_requested.set()
+
+    # --- TinyDB storage interface ---
+
+    def read(self: "LogStructuredStorage") -> Optional[Dict[str, Dict[str, Any]]]:
+        """Return a copy of the whole database, reading every partition."""
+        with self._reading():
+            if not self._parts:
+                return None
+            for name in self._parts:
+                self._ensure_loaded(name)
+            return {name: dict(self._tables.get(name, {})) for name in self._parts}
+
+    def write(self: "LogStructuredStorage", data: Dict[str, Dict[str, Any]]) -> None:
+        """Replace the whole database, e.g. for ``drop_table``."""
+        with self.locked():
+            records: List[list] = [["drop", name] for name in list(self._parts)]
+            for name, table in data.items():
+                records.append(["clear", name])
+                records.extend(
+                    ["put", name, str(doc_id), doc] for doc_id, doc in table.items()
+                )
+            self.commit(records)
+
+    def close(self: "LogStructuredStorage") -> None:
+        """Stop the compactor and fold the log into the table files."""
+        self._closed = True
+        self._compact_requested.set()
+        self._compactor.join(timeout=5)
+        if self._watcher is not None:
+            self._watcher.stop()
+        self.compact()
+        os.close(self._lock_fd)
+
+    # --- Table-level access used by LogTable ---
+
+    @contextmanager
+    def locked(self: "LogStructuredStorage") -> Iterator["LogStructuredStorage"]:
+        """
+        Hold the storage lock and the cross-process file lock, with the
+        in-memory state caught up to disk. Nested blocks share the file lock.
+        """
+        with self.lock:
+            if not self._flock_depth:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._flock_depth += 1
+            try:
+                self._catch_up()
+                yield self
+            finally:
+                self._flock_depth -= 1
+                if not self._flock_depth:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _reading(self: "LogStructuredStorage") -> Iterator["LogStructuredStorage"]:
+        """Hold the storage lock for a read, caught up to disk."""
+        with self.lock:
+            self._catch_up()
+            yield self
+
+    def table_names(self: "LogStructuredStorage") -> Set[str]:
+        """Return the names of all tables without reading any of them."""
+        with self._reading():
+            return set(self._parts)
+
+    def live_table(
+        self: "LogStructuredStorage", name: str, parts: Optional[Iterable[str]] = None
+    ) -> Dict[str, dict]:
+        """
+        Return the stored table itself with the given partitions loaded (all
+        of them by default); only valid while holding the lock.
+        """
+        self._ensure_loaded(name, parts)
+        return self._tables.get(name, {})
+
+    def query_partitions(
+        self: "LogStructuredStorage", name: str, cond: Any
+    ) -> Optional[Set[str]]:
+        """
+        Return the partitions of a table that documents matching ``cond`` may
+        be in, or None if they can be anywhere; call while holding the lock.
+        """
+        field = self.partitions.get(name)
+        if not field:
+            return None
+        return plan_partitions(cond, field, self._parts.get(name, {}))
+
+    def read_table(self: "LogStructuredStorage", name: str) -> Dict[str, dict]:
+        """
+        Return a shallow copy of a table in document ID order, as TinyDB
+        keeps it, safe to iterate without the lock.
+        """
+        with self._reading():
+            table = self.live_table(name)
+            return {doc_id: table[doc_id] for doc_id in sorted(table, key=int)}
+
+    def table_size(self: "LogStructuredStorage", name: str) -> int:
+        """Return the number of documents in a table."""
+        with self._reading():
+            size = 0
+            for part, doc_ids in self._parts.get(name, {}).items():
+                if doc_ids is None:
+                    count = self._disk_counts.get(name, {}).get(part)
+                    if count is not None:
+                        size += count
+                        continue
+                    self._ensure_loaded(name, [part])
+                    doc_ids = self._parts[name][part]
+                size += len(doc_ids)
+            return size
+
+    def candidates(
+        self: "LogStructuredStorage", name: str, cond: Any
+    ) -> Dict[str, dict]:
+        """
+        Return the documents a query needs to look at, in document ID order.
+
+        Only the partitions the query can match are read. Within them the
+        table's secondary indexes are used when the query allows it, falling
+        back to every document of those partitions otherwise.
+        """
+        with self._reading():
+            parts = self.query_partitions(name, cond)
+            self._ensure_loaded(name, parts)
+            table = self._tables.get(name, {})
+            indexes = self._indexes.get(name)
+            doc_ids = indexes.plan(cond) if indexes else None
+            if doc_ids is None and parts is None:
+                # Loaded partitions are merged in load order, not by ID
+                doc_ids = set(table)
+            elif doc_ids is None:
+                doc_ids = set()
+                for part in parts:
+                    doc_ids |= self._parts.get(name, {}).get(part) or set()
+            return {
+                doc_id: table[doc_id]
+                for doc_id in sorted(doc_ids, key=int)
+                if doc_id in table
+            }
+
+    def table_version(self: "LogStructuredStorage", name: str) -> int:
+        """
+        Return a counter that changes whenever the table changes.
+
+        Checking it only reads the log's header unless another process has
+        written, so callers can cache derived data and poll this cheaply.
+        """
+        with self._reading():
+            return self._versions.get(name, 0)
+
+    def versions(self: "LogStructuredStorage") -> Dict[str, int]:
+        """Return every table's change counter, see :meth:`table_version`."""
+        with self._reading():
+            return dict(self._versions)
+
+    def subscribe(
+        self: "LogStructuredStorage", callback: Callable[[Set[str]], None]
+    ) -> None:
+        """Call ``callback(changed_tables)`` from a watcher thread on changes."""
+        with self.lock:
+            if self._watcher is None:
+                self._watcher = ChangeWatcher(self.versions)
+        self._watcher.subscribe(callback)
+
+    def next_id(self: "LogStructuredStorage", name: str) -> int:
+        """Allocate the next document ID for a table."""
+        with self.lock:
+            next_id = self._last_ids.get(name, 0) + 1
+            self._last_ids[name] = next_id
+            return next_id
+
+    def commit(self: "LogStructuredStorage", records: List[list]) -> None:
+        """
+        Durably append change records as one log entry and apply them.
+
+        Records are ``["put", table, doc_id, doc]``, ``["del", table, doc_id]``,
+        ``["clear", table]``, ``["drop", table]`` or ``["archive", table,
+        partition]``. Serialization happens before anything touches the disk,
+        so a record that can't be encoded leaves both the log and the in-memory
+        state untouched.
+        """
+        if not records:
+            return
+        with self.locked():
+            records = [self._locate(record) for record in records]
+            payload = json.dumps(records, ensure_ascii=False, separators=(",", ":"))
+            # Round-trip so memory holds exactly what a replay would rebuild
+            records = json.loads(payload)
+            self._append(("\n" + payload + "\n").encode("utf-8"))
+            for record in records:
+                self._apply(record)
+        if self._wal_offset > self.compact_bytes:
+            self._compact_requested.set()
+
+    # --- Partitions ---
+
+    def _partition_of(self: "LogStructuredStorage", name: str, doc: Mapping) -> str:
+        """Return the partition a document of table ``name`` belongs in."""
+        field = self.partitions.get(name)
+        if field is None:
+            return ""
+        return partition_of(doc.get(field))
+
+    def _part_path(self: "LogStructuredStorage", name: str, part: str) -> Path:
+        if not part:
+            return self.data_dir / f"{name}.json"
+        return self.data_dir / name / f"{part}.json"
+
+    def _locate(self: "LogStructuredStorage", record: list) -> list:
+        """
+        Add the partition a record's current document lives in when a replay
+        can't tell: a delete, or a put that moves it to another month.
+        """
+        op, name = record[0], record[1]
+        if name not in self.partitions or op not in ("put", "del"):
+            return record
+        old = self._tables.get(name, {}).get(record[2])
+        if old is None:
+            return record
+        old_part = self._partition_of(name, old)
+        if op == "del":
+            return record[:3] + [old_part]
+        if old_part != self._partition_of(name, record[3]):
+            return record[:4] + [old_part]
+        return record
+
+    def _ensure_loaded(
+        self: "LogStructuredStorage", name: str, parts: Optional[Iterable[str]] = None
+    ) -> None:
+        """Read the given partitions of a table (all of them by default)."""
+        table_parts = self._parts.get(name)
+        if not table_parts:
+            return
+        for part in list(table_parts if parts is None else parts):
+            # Missing means the partition has no file yet, so nothing to read
+            if table_parts.get(part, ()) is not None:
+                continue
+            table_parts[part] = set()
+            try:
+                with open(self._part_path(name, part), encoding="utf-8") as f:
+                    docs = json.load(f)
+            except FileNotFoundError:
+                docs = {}
+            for doc_id, doc in docs.items():
+                self._place(name, part, doc_id, doc)
+            self._disk_counts.get(name, {}).pop(part, None)
+
+    def _place(
+        self: "LogStructuredStorage", name: str, part: str, doc_id: str, doc: dict
+    ) -> None:
+        """Add a document to the in-memory table, its partition and indexes."""
+        self._tables.setdefault(name, {})[doc_id] = doc
+        table_parts = self._parts.setdefault(name, {})
+        if table_parts.get(part) is None:
+            table_parts[part] = set()
+        table_parts[part].add(doc_id)
+        if name in self._indexes:
+            self._indexes[name].add(doc_id, doc)
+
+    def _unplace(self: "LogStructuredStorage", name: str, doc_id: str) -> None:
+        """Remove a loaded document from memory, marking its partition changed."""
+        doc = self._tables.get(name, {}).pop(doc_id, None)
+        if doc is None:
+            return
+        part = self._partition_of(name, doc)
+        doc_ids = self._parts.get(name, {}).get(part)
+        if doc_ids:
+            doc_ids.discard(doc_id)
+        self._dirty.add((name, part))
+        if name in self._indexes:
+            self._indexes[name].remove(doc_id, doc)
+
+    # --- Log replay ---
+
+    def _load(self: "LogStructuredStorage") -> None:
+        """Rebuild the in-memory state from the table files and the logs."""
+        previous = set(self._parts)
+        self._tables = {}
+        self._parts = {}
+        self._disk_counts = {}
+        self._dirty = set()
+        self._last_ids = {}
+        self._migrating = False
+        for indexes in self._indexes.values():
+            indexes.clear()
+        if not self.manifest_path.exists() and self.path.exists():
+            self._load_snapshot()
+            generation = 0
+        else:
+            generation = self._load_manifest()
+        try:
+            with open(self.compacting_path, "rb") as f:
+                self._replay(f, 0)
+        except FileNotFoundError:
+            pass
+        # Without a log, the next one started continues from the manifest's
+        self._generation = generation
+        self._wal_start = 0
+        self._wal_offset = 0
+        self._catch_up(adopt=True)
+        for name in previous | set(self._parts):
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def _load_manifest(self: "LogStructuredStorage") -> int:
+        """
+        Find the table files, leaving their contents to be read on demand.
+        Returns the generation of the last compaction.
+        """
+        manifest: Dict[str, Any] = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        for name, meta in manifest.get("tables", {}).items():
+            self._parts[name] = {}
+            self._last_ids[name] = meta.get("last_id", 0)
+            self._disk_counts[name] = dict(meta.get("partitions", {}))
+        # The files themselves say which partitions exist
+        if self.data_dir.is_dir():
+            for entry in self.data_dir.iterdir():
+                if entry.name in (MANIFEST_NAME, ARCHIVE_DIR_NAME):
+                    continue
+                if entry.is_dir():
+                    for part_file in entry.glob("*.json"):
+                        self._parts.setdefault(entry.name, {})[part_file.stem] = None
+                elif entry.suffix == ".json":
+                    self._parts.setdefault(entry.stem, {})[""] = None
+        for name in self._parts:
+            if name not in self._last_ids:
+                # Written after the manifest: read it to learn its last ID
+                self._ensure_loaded(name)
+                self._last_ids[name] = max(
+                    (int(i) for i in self._tables.get(name, {})), default=0
+                )
+        return manifest.get("generation", 0)
+
+    def _load_snapshot(self: "LogStructuredStorage") -> None:
+        """Load a database in the old single-file layout, to be split up."""
+        with open(self.path, encoding="utf-8") as f:
+            content = f.read()
+        data = json.loads(content) if content.strip() else {}
+        for name, table in data.items():
+            self._parts[name] = {}
+            self._last_ids[name] = max((int(i) for i in table), default=0)
+            for doc_id, doc in table.items():
+                part = self._partition_of(name, doc)
+                self._place(name, part, doc_id, doc)
+                self._dirty.add((name, part))
+        self._migrating = True
+        logger.info(f"Loaded single-file database {self.path}, splitting it by table")
+
+    def _reload(self: "LogStructuredStorage") -> None:
+        """Rebuild the state, holding the file lock at least shared meanwhile."""
+        if self._flock_depth:
+            self._load()
+            return
+        # Shared: waits for a compaction in another process to finish
+        fcntl.flock(self._lock_fd, fcntl.LOCK_SH)
+        try:
+            self._load()
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _catch_up(self: "LogStructuredStorage", adopt: bool = False) -> None:
+        """
+        Apply log entries appended since we last looked, e.g. by another process.
+
+        With ``adopt`` the current log is replayed from its start whatever its
+        generation, as when loading.
+        """
+        try:
+            f = open(self.wal_path, "rb")
+        except FileNotFoundError:
+            if self._wal_offset:
+                logger.info("Write-ahead log was removed elsewhere, reloading")
+                self._reload()
+            return
+        with f:
+            generation, start = _log_header(f.fileno())
+            size = os.fstat(f.fileno()).st_size
+            if adopt:
+                self._generation = generation
+                self._wal_start = self._wal_offset = start
+            elif generation != self._generation or size < self._wal_offset:
+                logger.info("Write-ahead log was compacted elsewhere, reloading")
+                self._reload()
+                return
+            if size > self._wal_offset:
+                self._wal_offset = self._replay(f, self._wal_offset)
+
+    def _replay(self: "LogStructuredStorage", f: BinaryIO, offset: int) -> int:
+        """Apply complete log lines from ``offset``; return the new offset."""
+        f.seek(offset)
+        data = f.read()
+        # Only consume up to the last newline; the rest may still be in flight
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping torn write-ahead log entry in {f.name}")
+                continue
+            # The header line, also found inside an interrupted compaction's log
+            if not isinstance(records, list):
+                continue
+            for record in records:
+                self._apply(record)
+        return offset + end
+
+    def _apply(self: "LogStructuredStorage", record: list) -> None:
+        """Apply a single change record to the in-memory state."""
+        op, name = record[0], record[1]
+        self._versions[name] = self._versions.get(name, 0) + 1
+        if op == "put":
+            doc_id, doc = record[2], record[3]
+            part = self._partition_of(name, doc)
+            # The previous version may sit in another, unread partition
+            self._ensure_loaded(name, [part] + record[4:5])
+            self._unplace(name, doc_id)
+            self._place(name, part, doc_id, doc)
+            self._dirty.add((name, part))
+            if int(doc_id) > self._last_ids.get(name, 0):
+                self._last_ids[name] = int(doc_id)
+        elif op == "del":
+            self._ensure_loaded(name, record[3:4] or None)
+            self._unplace(name, record[2])
+        elif op in ("clear", "drop"):
+            # Emptied partitions are dirty so compaction removes their files
+            for part in self._parts.get(name, {}):
+                self._dirty.add((name, part))
+            self._tables.pop(name, None)
+            self._disk_counts.pop(name, None)
+            if name in self._indexes:
+                self._indexes[name].clear()
+            if op == "clear":
+                self._parts[name] = {}
+                self._last_ids[name] = 0
+            else:
+                self._parts.pop(name, None)
+                self._last_ids.pop(name, None)
+        elif op == "archive":
+            part = record[2]
+            doc_ids = self._parts.get(name, {}).pop(part, None)
+            table = self._tables.get(name, {})
+            for doc_id in doc_ids or ():
+                doc = table.pop(doc_id, None)
+                if doc is not None and name in self._indexes:
+                    self._indexes[name].remove(doc_id, doc)
+            self._disk_counts.get(name, {}).pop(part, None)
+            self._dirty.add((name, part))
+        else:
+            logger.warning(f"Ignoring unknown write-ahead log record: {op}")
+
+    def _append(self: "LogStructuredStorage", data: bytes) -> None:
+        """Append one entry to the log, fsync it and advance our offset."""
+        # Each entry starts with a newline so a torn write never merges with
+        # the next entry; the file is reopened per commit to follow renames.
+        if not self.wal_path.exists():
+            self._start_log(self._generation + 1)
+        fd = os.open(self.wal_path, os.O_RDWR | os.O_APPEND)
+        try:
+            generation, _ = _log_header(fd)
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            if self.fsync:
+                os.fsync(fd)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        if generation == self._generation and end - len(data) == self._wal_offset:
+            self._wal_offset = end
+        # Otherwise the log changed without the file lock; the next catch-up
+        # reloads or replays our entry again, which is idempotent.
+
+    def _start_log(self: "LogStructuredStorage", generation: int) -> None:
+        """Atomically replace the log with an empty one of ``generation``."""
+        header = (json.dumps({"generation": generation}) + "\n").encode("utf-8")
+        tmp_path = self.wal_path.with_name(self.wal_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.wal_path)
+        self._generation = generation
+        self._wal_start = self._wal_offset = len(header)
+
+    # --- Compaction ---
+
+    def compact(self: "LogStructuredStorage") -> None:
+        """
+        Write the partitions changed in the write-ahead log and drop the log.
+
+        Runs under the file lock throughout, so other processes never reload
+        from a half-written set of table files.
+        """
+        with self._compaction_lock, self.locked():
+            if self._wal_offset <= self._wal_start and not (
+                self.compacting_path.exists() or self._dirty or self._migrating
+            ):
+                return
+            if self.wal_path.exists():
+                if not self.compacting_path.exists():
+                    os.link(self.wal_path, self.compacting_path)
+                elif not os.path.samefile(self.wal_path, self.compacting_path):
+                    # An earlier compaction was interrupted: keep its log
+                    # until the new table files have landed
+                    with open(self.wal_path, "rb") as src:
+                        with open(self.compacting_path, "ab") as dst:
+                            dst.write(src.read())
+                            dst.flush()
+                            os.fsync(dst.fileno())
+            # The log is swapped in one step, so there is always one to follow
+            self._start_log(self._generation + 1)
+
+            writes: Dict[Tuple[str, str], Dict[str, dict]] = {}
+            for name, part in self._dirty:
+                doc_ids = self._parts.get(name, {}).get(part, set())
+                if doc_ids is None:
+                    continue
+                table = self._tables.get(name, {})
+                writes[(name, part)] = {
+                    doc_id: table[doc_id] for doc_id in sorted(doc_ids, key=int)
+                }
+            for (name, part), docs in writes.items():
+                path = self._part_path(name, part)
+                if docs:
+                    self._write_json(path, docs)
+                elif path.exists():
+                    os.remove(path)
+                    if part and not any(path.parent.iterdir()):
+                        path.parent.rmdir()
+            self._write_json(self.manifest_path, self._manifest())
+            # Only forget the changes once every file has landed, so a failed
+            # compaction is retried in full
+            self._dirty = set()
+            if self._migrating and self.path.exists():
+                os.replace(self.path, self.path.with_name(self.path.name + ".migrated"))
+            self._migrating = False
+            if self.compacting_path.exists():
+                os.remove(self.compacting_path)
+            logger.info(f"Compacted write-ahead log into {len(writes)} table files")
+
+    def _manifest(self: "LogStructuredStorage") -> Dict[str, Any]:
+        """Describe every table's partitions, sizes and last document ID."""
+        tables = {}
+        for name, table_parts in self._parts.items():
+            counts = {}
+            for part, doc_ids in table_parts.items():
+                if doc_ids is None:
+                    counts[part] = self._disk_counts.get(name, {}).get(part, 0)
+                elif doc_ids:
+                    counts[part] = len(doc_ids)
+            tables[name] = {
+                "last_id": self._last_ids.get(name, 0),
+                "partitions": dict(sorted(counts.items())),
+            }
+        return {"version": 1, "generation": self._generation, "tables": tables}
+
+    def _write_json(self: "LogStructuredStorage", path: Path, data: Any) -> None:
+        """Atomically replace ``path`` with ``data`` as JSON."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _compaction_loop(self: "LogStructuredStorage") -> None:
+        """Background worker that compacts whenever a commit asks for it."""
+        while True:
+            self._compact_requested.wait()
+            self._compact_requested.clear()
+            if self._closed:
+                return
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Write-ahead log compaction failed: {e}")
+
+    # --- Cold storage ---
+
+    def archive(self: "LogStructuredStorage", before: str) -> List[Tuple[str, str]]:
+        """
+        Move month partitions older than ``before`` (``"YYYY-MM"``) to cold
+        storage under ``archive/<table>/<YYYY-MM>.json.gz``.
+
+        Each partition is written to the archive before its removal is
+        committed, so a crash in between leaves the data in both places rather
+        than neither. Returns the ``(table, partition)`` pairs moved.
+        """
+        moved = []
+        with self.locked():
+            for name in sorted(self.partitions):
+                for part in sorted(self._parts.get(name, {})):
+                    if part == UNDATED or part >= before:
+                        continue
+                    self._ensure_loaded(name, [part])
+                    table = self._tables.get(name, {})
+                    docs = {
+                        doc_id: table[doc_id]
+                        for doc_id in sorted(self._parts[name][part], key=int)
+                    }
+                    write_archive(self.archive_dir, name, part, docs)
+                    self.commit([["archive", name, part]])
+                    moved.append((name, part))
+                    logger.info(f"Archived {len(docs)} documents of '{name}' {part}")
+        if moved:
+            self.compact()
+        return moved
+
+    def archived_partitions(self: "LogStructuredStorage", name: str) -> List[str]:
+        """Return the months of a table held in cold storage."""
+        return archived_partitions(self.archive_dir, name)
+
+    def read_archive(
+        self: "LogStructuredStorage", name: str, part: str
+    ) -> Dict[str, dict]:
+        """Return the documents of an archived partition."""
+        return read_archive(self.archive_dir, name, part)
+
+
+def _log_header(fd: int) -> Tuple[int, int]:
+    """Return a log's generation and the length of its header line."""
+    head = os.pread(fd, 128, 0)
+    end = head.find(b"\n") + 1
+    try:
+        header = json.loads(head[:end]) if end else None
+    except ValueError:
+        header = None
+    if isinstance(header, dict) and "generation" in header:
+        return int(header["generation"]), end
+    # Logs written before generations were recorded start with an entry
+    return 0, 0
+
+
+class _TableChanges(MutableMapping):
+    """Copy-on-access view of a stored table that records an updater's changes."""
+
+    def __init__(
+        self: "_TableChanges", base: Dict[str, dict], id_class: Callable
+    ) -> None:
+        self._base = base
+        self._id_class = id_class
+        self._cleared = False
+        self._changes: Dict[str, Any] = {}
+
+    def _lookup(self: "_TableChanges", key: str) -> Any:
+        if key in self._changes:
+            return self._changes[key]
+        if self._cleared:
+            return _DELETED
+        return self._base.get(key, _DELETED)
+
+    def __getitem__(self: "_TableChanges", doc_id: Any) -> dict:
+        key = str(doc_id)
+        doc = self._lookup(key)
+        if doc is _DELETED:
+            raise KeyError(doc_id)
+        if key not in self._changes:
+            # Updates mutate documents in place, so hand out a private copy
+            doc = self._changes[key] = copy.deepcopy(doc)
+        return doc
+
+    def __setitem__(self: "_TableChanges", doc_id: Any, doc: dict) -> None:
+        self._changes[str(doc_id)] = doc
+
+    def __delitem__(self: "_TableChanges", doc_id: Any) -> None:
+        key = str(doc_id)
+        if self._lookup(key) is _DELETED:
+            raise KeyError(doc_id)
+        self._changes[key] = _DELETED
+
+    def __contains__(self: "_TableChanges", doc_id: Any) -> bool:
+        return self._lookup(str(doc_id)) is not _DELETED
+
+    def __iter__(self: "_TableChanges") -> Iterator:
+        keys = [] if self._cleared else list(self._base)
+        keys.extend(key for key in self._changes if key not in self._base)
+        # In document ID order, as TinyDB keeps a table
+        for key in sorted(keys, key=int):
+            if self._lookup(key) is not _DELETED:
+                yield self._id_class(key)
+
+    def __len__(self: "_TableChanges") -> int:
+        return sum(1 for _ in self)
+
+    def clear(self: "_TableChanges") -> None:
+        self._cleared = True
+        self._changes = {}
+
+    def records(self: "_TableChanges", name: str) -> List[list]:
+        """Return the change records needed to persist this change set."""
+        records: List[list] = [["clear", name]] if self._cleared else []
+        for key, doc in self._changes.items():
+            if doc is _DELETED:
+                if not self._cleared and key in self._base:
+                    records.append(["del", name, key])
+            elif self._cleared or self._base.get(key) != doc:
+                records.append(["put", name, key, doc])
+        return records
+
+
+class LogTable(Table):
+    """
+    TinyDB table that commits only the documents it changed.
+
+    Queries go through the storage's secondary indexes where possible. The
+    per-table query cache is bypassed: other processes write to the same log,
+    and an index lookup is already cheap. Writes only read the partitions of a
+    partitioned table that their query may match.
+    """
+
+    def insert(self: "LogTable", document: Mapping) -> int:
+        return self.insert_multiple([document])[0]
+
+    def insert_multiple(self: "LogTable", documents: Iterable[Mapping]) -> List[int]:
+        documents = list(documents)
+        doc_ids: List[int] = []
+
+        def updater(table: MutableMapping) -> None:
+            for document in documents:
+                if not isinstance(document, Mapping):
+                    raise ValueError("Document is not a Mapping")
+                if isinstance(document, self.document_class):
+                    doc_id = document.doc_id
+                    if doc_id in table:
+                        raise ValueError(f"Document with ID {doc_id} already exists")
+                else:
+                    doc_id = self._get_next_id()
+                doc_ids.append(doc_id)
+                table[doc_id] = dict(document)
+
+        # IDs are allocated inside the update so they are taken under the lock.
+        # New documents need no partition read, unless an ID must be checked.
+        if any(isinstance(document, self.document_class) for document in documents):
+            self._update_table(updater)
+        else:
+            self._update_table(updater, parts=())
+        return doc_ids
+
+    def update(
+        self: "LogTable",
+        fields: Union[Mapping, Callable[[Mapping], None]],
+        cond: Optional[QueryLike] = None,
+        doc_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        if doc_ids is not None or cond is None:
+            return super().update(fields, cond, doc_ids)
+        return self.update_multiple([(fields, cond)])
+
+    def update_multiple(
+        self: "LogTable",
+        updates: Iterable[Tuple[Union[Mapping, Callable[[Mapping], None]], QueryLike]],
+    ) -> List[int]:
+        updates = list(updates)
+        updated_ids: List[int] = []
+
+        def updater(table: MutableMapping) -> None:
+            for doc_id in list(table.keys()):
+                for fields, cond in updates:
+                    if cond(table[doc_id]):
+                        updated_ids.append(doc_id)
+                        if callable(fields):
+                            fields(table[doc_id])
+                        else:
+                            table[doc_id].update(fields)
+
+        self._update_table(updater, conds=[cond for _, cond in updates])
+        return updated_ids
+
+    def remove(
+        self: "LogTable",
+        cond: Optional[QueryLike] = None,
+        doc_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        if doc_ids is not None or cond is None:
+            return super().remove(cond, doc_ids)
+        removed_ids: List[int] = []
+
+        def updater(table: MutableMapping) -> None:
+            for doc_id in list(table.keys()):
+                if cond(table[doc_id]):
+                    removed_ids.append(doc_id)
+                    del table[doc_id]
+
+        self._update_table(updater, conds=[cond])
+        return removed_ids
+
+    def truncate(self: "LogTable") -> None:
+        self._update_table(lambda table: table.clear(), parts=())
+        self._next_id = None
+
+    def search(self: "LogTable", cond: QueryLike) -> List[Document]:
+        return [
+            self.document_class(doc, self.document_id_class(doc_id))
+            for doc_id, doc in self._storage.candidates(self.name, cond).items()
+            if cond(doc)
+        ]
+
+    def get(
+        self: "LogTable",
+        cond: Optional[QueryLike] = None,
+        doc_id: Optional[int] = None,
+        doc_ids: Optional[List] = None,
+    ) -> Optional[Union[Document, List[Document]]]:
+        if cond is None or doc_id is not None or doc_ids is not None:
+            return super().get(cond, doc_id, doc_ids)
+        for doc_id_, doc in self._storage.candidates(self.name, cond).items():
+            if cond(doc):
+                return self.document_class(doc, self.document_id_class(doc_id_))
+        return None
+
+    def __len__(self: "LogTable") -> int:
+        return self._storage.table_size(self.name)
+
+    def _get_next_id(self: "LogTable") -> int:
+        return self._storage.next_id(self.name)
+
+    def _read_table(self: "LogTable") -> Dict[str, Mapping]:
+        return self._storage.read_table(self.name)
+
+    def _update_table(
+        self: "LogTable",
+        updater: Callable,
+        conds: Optional[List[QueryLike]] = None,
+        parts: Optional[Iterable[str]] = None,
+    ) -> None:
+        """
+        Apply ``updater`` to the table and commit what it changed. Only the
+        partitions ``conds`` may match are read, or else ``parts`` (all of
+        them by default).
+        """
+        with self._storage.locked() as storage:
+            if conds is not None:
+                planned = [storage.query_partitions(self.name, c) for c in conds]
+                if any(plan is None for plan in planned):
+                    parts = None
+                else:
+                    parts = set().union(*planned)
+            changes = _TableChanges(
+                storage.live_table(self.name, parts), self.document_id_class
+            )
+            updater(changes)
+            storage.commit(changes.records(self.name))
+        self.clear_cache()
+
+
+class LogTinyDB(TinyDB):
+    """TinyDB backed by :class:`LogStructuredStorage`."""
+
+    table_class = LogTable
+    default_storage_class = LogStructuredStorage
+
+    def tables(self: "LogTinyDB") -> Set[str]:
+        # Listing tables must not read every partition file
+        return self.storage.table_names()
+
+    def insert_many(
+        self: "LogTinyDB",
+        records: Iterable[Tuple[str, Mapping]],
+        increments: Iterable[Tuple[str, str, Any, Mapping]] = (),
+    ) -> List[int]:
+        """
+        Insert documents into one or more tables as a single atomic commit.
+
+        ``records`` is a sequence of ``(table_name, document)`` pairs; the
+        returned document IDs follow the same order. ``increments`` holds
+        ``(table_name, key_field, key, deltas)`` counters to bump in the same
+        commit: ``deltas`` is added to the document whose ``key_field`` equals
+        ``key`` (nested dicts are added field by field), creating it if needed.
+        Either everything is written in one log entry or, if any part is
+        invalid, nothing is.
+        """
+        records = list(records)
+        for _, document in records:
+            if not isinstance(document, Mapping):
+                raise ValueError("Document is not a Mapping")
+        doc_ids: List[int] = []
+        touched = {table_name for table_name, _ in records}
+        with self.storage.locked() as storage:
+            changes = []
+            for table_name, document in records:
+                doc_id = storage.next_id(table_name)
+                doc_ids.append(doc_id)
+                changes.append(["put", table_name, str(doc_id), dict(document)])
+
+            counters: Dict[Tuple[str, Any], list] = {}
+            for table_name, key_field, key, deltas in increments:
+                touched.add(table_name)
+                change = counters.get((table_name, key))
+                if change is None:
+                    doc_id, doc = self._find(storage, table_name, key_field, key)
+                    change = ["put", table_name, doc_id, doc]
+                    counters[(table_name, key)] = change
+                    changes.append(change)
+                add_counts(change[3], deltas)
+            storage.commit(changes)
+        for table_name in touched:
+            self.table(table_name).clear_cache()
+        return doc_ids
+
+    def replace_table(
+        self: "LogTinyDB", table_name: str, documents: Iterable[Mapping]
+    ) -> None:
+        """Atomically replace a table's contents with ``documents`` in one commit."""
+        with self.storage.locked() as storage:
+            changes: List[list] = [["clear", table_name]]
+            changes.extend(
+                ["put", table_name, str(doc_id), dict(document)]
+                for doc_id, document in enumerate(documents, start=1)
+            )
+            storage.commit(changes)
+        self.table(table_name).clear_cache()
+
+    @staticmethod
+    def _find(
+        storage: LogStructuredStorage, table_name: str, key_field: str, key: Any
+    ) -> Tuple[str, dict]:
+        """Return a private copy of the counter document for ``key``, or a new one."""
+        cond = Query()[key_field] == key
+        for doc_id, doc in storage.candidates(table_name, cond).items():
+            if cond(doc):
+                return doc_id, copy.deepcopy(doc)
+        return str(storage.next_id(table_name)), {key_field: key}
+
+
+def add_counts(doc: dict, deltas: Mapping) -> None:
+    """Add numeric ``deltas`` into ``doc``, recursing into nested dicts."""
+    for field, delta in deltas.items():
+        if isinstance(delta, Mapping):
+            add_counts(doc.setdefault(field, {}), delta)
+        else:
+            doc[field] = doc.get(field, 0) + delta
@@ -0,0 +1,69 @@
+import threading
+from typing import Callable, Dict, List, Set
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# How often the watcher looks for changes, in seconds
+DEFAULT_WATCH_INTERVAL = 1.0
+
+
+class ChangeWatcher:
+    """
+    Report which tables changed, in this process or another one.
+
+    A daemon thread polls ``versions()`` (table name -> change counter) and
+    calls every subscriber with the set of tables whose counter moved. Both
+    storage backends keep these counters cheap to read, so polling costs a
+    peek at the log's header or one small query per interval.
+    """
+
+    def __init__(
+        self: "ChangeWatcher",
+        versions: Callable[[], Dict[str, int]],
+        interval: float = DEFAULT_WATCH_INTERVAL,
+    ) -> None:
+        self._versions = versions
+        self.interval = interval
+        self._callbacks: List[Callable[[Set[str]], None]] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def subscribe(self: "ChangeWatcher", callback: Callable[[Set[str]], None]) -> None:
+        """Call ``callback(changed_tables)`` from the watcher thread on changes."""
+        with self._lock:
+            self._callbacks.append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="db-watcher", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self: "ChangeWatcher") -> None:
+        self._stopped.set()
+
+    def _run(self: "ChangeWatcher") -> None:
+        seen = self._versions()
+        while not self._stopped.wait(self.interval):
+            try:
+                current = self._versions()
+            except Exception as e:
+                logger.error(f"Change watcher failed to read table versions: {e}")
+                continue
+            changed = {
+                name
+                for name in seen.keys() | current.keys()
+                if seen.get(name) != current.get(name)
+            }
+            seen = current
+            if not changed:
+                continue
+            with self._lock:
+                callbacks = list(self._callbacks)
+            for callback in callbacks:
+                try:
+                    callback(changed)
+                except Exception as e:
+                    logger.error(f"Change callback failed for {sorted(changed)}: {e}")
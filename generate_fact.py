@@ -7,16 +7,26 @@ from dotenv import load_dotenv
 from openai import OpenAI
 from tinydb import Query
 
-from db.db import get_db, get_with_logging, insert_with_logging, search_with_logging
+from db.db import (
+    USAGE_DAILY_TABLE,
+    UnitOfWork,
+    get_db,
+    get_with_logging,
+    insert_with_logging,
+    search_with_logging,
+    stage_usage_entry,
+)
 from models.schemas import FunFactModel
 from utils.logger import get_logger
+from utils.singleflight import FileSingleFlight
 
 logger = get_logger(__name__)
 # Load environment variables
 load_dotenv()
 
 # Connect to OpenAI API
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=OPENAI_BASE_URL)
 
 # TinyDB setup
 DB_DIR = Path(os.getenv("DB_DIR", "db_files"))
@@ -25,6 +35,9 @@ DB_FILE = DB_DIR / "muse_observatory.json"
 # --- OpenAI Token Quota Config ---
 DAILY_TOKEN_QUOTA = 100_000  # Set your daily quota here
 
+# Overlapping scheduler runs share one fun fact call per day and muse
+fact_flights = FileSingleFlight(DB_DIR, "generate_fun_fact")
+
 MUSES = {
     0: {
         "muse": "Lunes",
@@ -124,8 +137,10 @@ def log_openai_usage(
             "error": error,
         }
 
-        # Use the helper function to insert with logging
-        insert_with_logging("openai_usage_log", usage_data)
+        # Commit the entry and its daily total update in one durable write
+        work = UnitOfWork()
+        stage_usage_entry(work, usage_data)
+        work.commit()
 
         logger.info(
             f"Logged OpenAI API usage: {endpoint}, {tokens_used} tokens, status: {status}"
@@ -136,20 +151,17 @@ def log_openai_usage(
 
 def get_current_token_usage() -> int:
     """
-    Get the current total tokens used today from the usage log.
-    This replaces the need for a separate token_usage table.
+    Get the current total tokens used today.
+    Reads the per-day total maintained alongside the usage log, so the cost
+    doesn't grow with the log.
     """
     try:
         today = datetime.now().strftime("%Y-%m-%d")
 
-        # Use the search helper to find all logs for today
-        Usage = Query()
-        logs = search_with_logging("openai_usage_log", Usage.date == today)
-
-        # Sum tokens from successful calls
-        total = sum(
-            log.get("tokens_used", 0) for log in logs if log.get("status") == "success"
-        )
+        # Successful calls are summed into today's record as they are logged
+        Daily = Query()
+        day = get_with_logging(USAGE_DAILY_TABLE, Daily.date == today)
+        total = day.get("tokens_used", 0) if day else 0
 
         logger.info(f"Current token usage for today ({today}): {total}")
         return total
@@ -179,7 +191,18 @@ def check_fact_exists(date: datetime) -> bool:
 
 
 def generate_fun_fact(day_info: dict, used_kingdom_life: list) -> FunFactModel:
-    """Generate a fun fact using OpenAI API"""
+    """Generate a fun fact using OpenAI API, once for concurrent runs"""
+    key = f"{datetime.now().strftime('%Y-%m-%d')}-{day_info['muse']}"
+    return fact_flights.do(
+        key,
+        lambda: _ask_for_fun_fact(day_info, used_kingdom_life),
+        encode=lambda fact: fact.model_dump(),
+        decode=lambda data: FunFactModel(**data),
+    )
+
+
+def _ask_for_fun_fact(day_info: dict, used_kingdom_life: list) -> FunFactModel:
+    """Ask gpt-4o for the fun fact and log the usage"""
     prompt = f"""Generate a fascinating and scientifically accurate fun fact about an organism in the five kingdom's of life that relates to {day_info['cause']}.
 
     'fun_fact':
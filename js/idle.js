@@ -0,0 +1,85 @@
+// Idle timeout of the observatory page: after 5 minutes without activity a
+// warning is shown, and 30 seconds later the page reloads.
+(function () {
+  "use strict";
+
+  const idleTime = 300000; // 5 minutes in milliseconds
+  const warningTime = 30000; // 30 seconds warning
+  const reportInterval = 30000;
+
+  let idleTimer = null;
+  let warningShown = false;
+  let warningElement = null;
+  let lastActivityReport = 0;
+
+  // Tell the server the visitor is still here, at most every 30 seconds
+  function reportActivity() {
+    const now = Date.now();
+    if (now - lastActivityReport > reportInterval && typeof emitEvent === "function") {
+      lastActivityReport = now;
+      emitEvent("activity");
+    }
+  }
+
+  // Reset the timer when user interacts
+  function resetIdleTimer() {
+    reportActivity();
+    clearTimeout(idleTimer);
+    if (warningShown) {
+      hideWarning();
+    }
+    idleTimer = setTimeout(showWarning, idleTime);
+  }
+
+  // Show warning before timeout
+  function showWarning() {
+    warningShown = true;
+
+    if (!warningElement) {
+      warningElement = document.createElement("div");
+      warningElement.style.position = "fixed";
+      warningElement.style.bottom = "10px";
+      warningElement.style.left = "10px";
+      warningElement.style.backgroundColor = "rgba(0,0,0,0.8)";
+      warningElement.style.color = "white";
+      warningElement.style.padding = "10px";
+      warningElement.style.borderRadius = "5px";
+      warningElement.style.zIndex = "10000";
+      warningElement.style.fontSize = "14px";
+      warningElement.style.boxShadow = "0 0 10px rgba(255,255,255,0.2)";
+      warningElement.textContent =
+        "Your session is about to expire. Tap anywhere to continue.";
+      document.body.appendChild(warningElement);
+    } else {
+      warningElement.style.display = "block";
+    }
+
+    // Reload if no action is taken
+    idleTimer = setTimeout(handleIdleTimeout, warningTime);
+  }
+
+  function hideWarning() {
+    warningShown = false;
+    if (warningElement) {
+      warningElement.style.display = "none";
+    }
+  }
+
+  // Reload the page, which will trigger the server-side timeout
+  function handleIdleTimeout() {
+    window.location.reload();
+  }
+
+  // User activity, more comprehensive for mobile
+  ["mousedown", "mousemove", "keypress", "scroll", "touchstart", "touchmove", "click", "focus"].forEach(
+    function (evt) {
+      document.addEventListener(evt, resetIdleTimer, false);
+    }
+  );
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", resetIdleTimer, false);
+  } else {
+    resetIdleTimer();
+  }
+})();
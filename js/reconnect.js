@@ -0,0 +1,61 @@
+// Websocket reconnection settings of NiceGUI, tuned for mobile connections,
+// with a notice while the socket reconnects.
+window.addEventListener('DOMContentLoaded', function() {
+    // Override the default NiceGUI reconnection behavior
+    if (window._nicegui && window._nicegui.connectSocket) {
+        const originalConnect = window._nicegui.connectSocket;
+        window._nicegui.connectSocket = function() {
+            // Add custom connection settings
+            if (window._nicegui.socket && window._nicegui.socket.io) {
+                window._nicegui.socket.io.reconnectionDelay = 1000; // Start with 1s delay
+                window._nicegui.socket.io.reconnectionDelayMax = 10000; // Max 10s delay
+                window._nicegui.socket.io.timeout = 10000; // 10s timeout
+                window._nicegui.socket.io.reconnectionAttempts = 10; // More attempts
+            }
+            return originalConnect.apply(this, arguments);
+        };
+    }
+
+    // Custom handler for reconnection notification
+    const showReconnecting = function(isReconnecting) {
+        let notificationEl = document.getElementById('reconnection-notification');
+        if (!notificationEl && isReconnecting) {
+            notificationEl = document.createElement('div');
+            notificationEl.id = 'reconnection-notification';
+            notificationEl.style.position = 'fixed';
+            notificationEl.style.bottom = '10px';
+            notificationEl.style.left = '10px';
+            notificationEl.style.backgroundColor = 'rgba(0,0,0,0.8)';
+            notificationEl.style.color = 'white';
+            notificationEl.style.padding = '10px';
+            notificationEl.style.borderRadius = '5px';
+            notificationEl.style.zIndex = '10000';
+            notificationEl.style.fontSize = '14px';
+            notificationEl.style.transition = 'opacity 0.3s';
+            notificationEl.innerHTML = 'Reconnecting to server...';
+            document.body.appendChild(notificationEl);
+        } else if (notificationEl) {
+            if (isReconnecting) {
+                notificationEl.style.display = 'block';
+                notificationEl.style.opacity = '1';
+            } else {
+                notificationEl.style.opacity = '0';
+                setTimeout(function() {
+                    notificationEl.style.display = 'none';
+                }, 300);
+            }
+        }
+    };
+
+    // Listen for socket events if available
+    setTimeout(function() {
+        if (window._nicegui && window._nicegui.socket) {
+            window._nicegui.socket.on('reconnect_attempt', function() {
+                showReconnecting(true);
+            });
+            window._nicegui.socket.on('connect', function() {
+                showReconnecting(false);
+            });
+        }
+    }, 1000);
+});
@@ -0,0 +1,113 @@
+// Share form of the pre-rendered observatory page.
+// Posts the inspiration to the share endpoint and shows the projects found,
+// without a NiceGUI websocket.
+(function () {
+  "use strict";
+
+  function byId(id) {
+    return document.getElementById(id);
+  }
+
+  function element(tag, className, text) {
+    const el = document.createElement(tag);
+    if (className) el.className = className;
+    if (text) el.textContent = text;
+    return el;
+  }
+
+  function safeUrl(url) {
+    return /^https?:\/\//i.test(url || "") ? url : "#";
+  }
+
+  function showLoader() {
+    const loader = element("div", "cosmic-loader");
+    loader.appendChild(byId("share-loader").content.cloneNode(true));
+    document.body.appendChild(loader);
+    return loader;
+  }
+
+  function showProjects(projects, museName) {
+    const dialog = byId("projects-dialog");
+    const list = dialog.querySelector(".projects-list");
+    list.replaceChildren();
+    for (const project of projects) {
+      const card = element("div", "project-card");
+      card.appendChild(element("strong", "", project.project_name));
+      card.appendChild(element("div", "", "by " + project.organization));
+      const row = element("div", "");
+      row.appendChild(element("span", "", project.geographic_level + " · "));
+      const link = element("a", "source-link", "Visit");
+      link.href = safeUrl(project.link_to_organization);
+      link.target = "_blank";
+      link.rel = "noopener noreferrer";
+      row.appendChild(link);
+      card.appendChild(row);
+      list.appendChild(card);
+    }
+    dialog.querySelector(".projects-muse").textContent = museName;
+    dialog.showModal();
+  }
+
+  function start() {
+    const form = byId("share-form");
+    const status = byId("share-status");
+    const museName = form.dataset.muse;
+
+    form.addEventListener("submit", async function (event) {
+      event.preventDefault();
+      const userInput = form.elements.inspiration.value.trim();
+      if (!userInput || userInput.length > 500) {
+        status.textContent = "Please inspire " + museName + "!";
+        return;
+      }
+      status.textContent = "";
+      const loader = showLoader();
+      try {
+        const response = await fetch(form.action, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ user_input: userInput }),
+        });
+        const data = await response.json().catch(function () {
+          return {};
+        });
+        if (response.status === 429) {
+          status.textContent = "The Muse needs rest. Please try again tomorrow.";
+        } else if (!response.ok) {
+          status.textContent = data.error || "Sandstorm turbulences!";
+        } else {
+          // Like the live page, one share per visit
+          form.remove();
+          if (!data.projects || !data.projects.length) {
+            status.textContent = "No cosmic connections found today";
+          } else {
+            status.textContent = "Shared with " + museName + "!";
+          }
+          showProjects(data.projects || [], museName);
+        }
+      } catch (error) {
+        status.textContent = "Sandstorm turbulences!";
+      } finally {
+        loader.remove();
+      }
+    });
+
+    document.querySelectorAll("dialog [data-close]").forEach(function (button) {
+      button.addEventListener("click", function () {
+        button.closest("dialog").close();
+      });
+    });
+    byId("help-button").addEventListener("click", function () {
+      byId("help-dialog").showModal();
+    });
+    setTimeout(function () {
+      byId("help-dialog").showModal();
+    }, 500);
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", start);
+  } else {
+    start();
+  }
+})();
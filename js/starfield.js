@@ -0,0 +1,141 @@
+// Star fields of the observatory, drawn in the browser from a seed.
+// The server only sends <div data-star-field="cosmic|loader" data-seed=...>
+// placeholders; the same seed always gives the same sky.
+(function () {
+  "use strict";
+
+  // mulberry32: small, fast and good enough to scatter stars
+  function generator(seed) {
+    let state = seed >>> 0;
+    return function () {
+      state = (state + 0x6d2b79f5) >>> 0;
+      let t = state;
+      t = Math.imul(t ^ (t >>> 15), t | 1);
+      t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+      return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+  }
+
+  function uniform(random, low, high) {
+    return low + (high - low) * random();
+  }
+
+  function dot(className, style) {
+    const el = document.createElement("div");
+    el.className = className;
+    for (const [name, value] of Object.entries(style)) {
+      el.style.setProperty(name, value);
+    }
+    return el;
+  }
+
+  // Star classes of the observatory background and their weights
+  const STAR_TYPES = [
+    ["star", 0.5],
+    ["star bright", 0.3],
+    ["star colored", 0.2],
+  ];
+
+  function starType(random) {
+    let pick = random();
+    for (const [className, weight] of STAR_TYPES) {
+      if ((pick -= weight) < 0) return className;
+    }
+    return STAR_TYPES[STAR_TYPES.length - 1][0];
+  }
+
+  const LAYOUTS = {
+    cosmic(random, stars, pulsars, out) {
+      out.push(dot("bottom-accent", {}));
+      for (let i = 0; i < stars; i++) {
+        const className = starType(random);
+        const top = uniform(random, 0, 100);
+        const left = uniform(random, 0, 100);
+        const delay = uniform(random, 0, 4);
+        const duration = uniform(random, 3, 8);
+        const size = className === "star bright"
+          ? uniform(random, 2, 4)
+          : uniform(random, 1, 3);
+        out.push(dot(className, {
+          top: top + "%",
+          left: left + "%",
+          "animation-delay": delay + "s",
+          "animation-duration": duration + "s",
+          width: size + "px",
+          height: size + "px",
+        }));
+      }
+      for (let i = 0; i < pulsars; i++) {
+        const top = uniform(random, 20, 80);
+        const left = uniform(random, 20, 80);
+        const delay = uniform(random, 0, 2);
+        const size = uniform(random, 3, 4);
+        out.push(dot("pulsar", {
+          top: top + "%",
+          left: left + "%",
+          "animation-delay": delay + "s",
+          width: size + "px",
+          height: size + "px",
+        }));
+      }
+    },
+    loader(random, stars, pulsars, out) {
+      for (let i = 0; i < stars; i++) {
+        const top = uniform(random, 0, 100);
+        const left = uniform(random, 0, 100);
+        const delay = uniform(random, 0, 3);
+        const duration = uniform(random, 1, 3);
+        const size = uniform(random, 2, 4);
+        out.push(dot("star", {
+          top: top + "%",
+          left: left + "%",
+          "animation-delay": delay + "s",
+          "animation-duration": duration + "s",
+          width: size + "px",
+          height: size + "px",
+        }));
+      }
+    },
+  };
+
+  function render(el) {
+    if (el.dataset.starFieldDrawn) return;
+    const layout = LAYOUTS[el.dataset.starField];
+    if (!layout) return;
+    el.dataset.starFieldDrawn = "1";
+    const random = generator(Number(el.dataset.seed) || 0);
+    const out = [];
+    layout(
+      random,
+      Number(el.dataset.stars) || 0,
+      Number(el.dataset.pulsars) || 0,
+      out
+    );
+    el.append(...out);
+  }
+
+  function renderAll(root) {
+    if (root.matches && root.matches("[data-star-field]")) render(root);
+    if (root.querySelectorAll) {
+      root.querySelectorAll("[data-star-field]").forEach(render);
+    }
+  }
+
+  window.museStarField = { render: render, generator: generator };
+
+  // Fields also arrive later over the websocket, e.g. with the share loader
+  function start() {
+    renderAll(document);
+    new MutationObserver(function (mutations) {
+      for (const mutation of mutations) {
+        mutation.addedNodes.forEach(renderAll);
+      }
+    }).observe(document.body, { childList: true, subtree: true });
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", start);
+  } else {
+    start();
+  }
+})();
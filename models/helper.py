@@ -1,16 +1,94 @@
+from typing import Callable, Optional
+
 from nicegui import ui
 
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Observatory instructions, shared with the pre-rendered page
+INSTRUCTIONS_HTML = """
+                    <div style="
+                        line-height: 1.4;
+                        color: rgba(255,255,255,0.9);
+                        text-align: left;
+                        font-size: 0.95rem;
+                        font-style: normal;
+                        margin-top: 0;
+                        padding-top: 0;
+                    ">
+                        <p style="margin-top: 0; margin-bottom: 0.75rem;">
+                            Welcome to Muse Observatory! Each day introduces a new <strong>Muse</strong> with its own unique energy and theme. These Muses are narratives built on top of the <a href="https://cocoex.xyz" target="_blank" rel="noopener noreferrer" class="muse-link">cocoex</a> comet-collab. Each Muse is connected to a specific <a href="https://sdgs.un.org/goals" target="_blank" rel="noopener noreferrer" class="muse-link">Sustainable Development Goal (SDG)</a> and a related social cause.
+                        </p>
+                        <p style="margin-bottom: 0.75rem; font-style: normal;">
+                            <strong>🌌 How it works:</strong><br>
+                            • Get inspired by a fun fact about an organism from the kingdoms of life, showing how nature can spark ideas and synergies for real-world human applications.<br>
+                            • Share your thoughts and reflections about what the Muse of the day inspired in you.<br>
+                            • Once inspired, the Muse will connect you with real-world projects or NGOs aligned with your vision — because we're never alone in this journey!
+                        </p>
+                        <p style="margin-bottom: 0.75rem; font-style: normal;">
+                            <strong>🌟 Building together:</strong><br>
+                            Finally, every inspiration and project discovered will be added to the <a href="https://cocoex.xyz" target="_blank" rel="noopener noreferrer" class="muse-link">cocoex</a> register, helping us build a collective database of initiatives and ideas — from the people, for the people. :)
+                        </p>
+                    </div>
+                """
+
+
+def log_element_count(label: str) -> int:
+    """Log how many elements the current client holds (and syncs) right now"""
+    count = len(ui.context.client.elements)
+    logger.info(f"🧮 {label}: {count} elements on the page")
+    return count
+
+
+class LazyDialog:
+    """
+    A dialog whose elements are built when it opens and deleted when it closes.
+
+    Until then only an empty anchor sits in the page, so a dialog that is never
+    opened costs the client (and the websocket) nothing. Whatever ``build``
+    returns is kept as ``content`` while the dialog is open.
+    """
+
+    def __init__(
+        self: "LazyDialog", build: Callable[[ui.dialog], None], classes: str = ""
+    ):
+        self._build = build
+        self._classes = classes
+        self._anchor = ui.element("div").style("display: contents")
+        self.dialog: Optional[ui.dialog] = None
+        self.content = None
+
+    def open(self: "LazyDialog"):
+        if self.dialog is None:
+            with self._anchor:
+                self.dialog = ui.dialog().classes(self._classes)
+            # Quasar emits "hide" once the closing transition is over
+            self.dialog.on("hide", self._free)
+            self.content = self._build(self.dialog)
+            log_element_count("Dialog opened")
+        self.dialog.open()
+
+    def close(self: "LazyDialog"):
+        if self.dialog is not None:
+            self.dialog.close()
+
+    def _free(self: "LazyDialog"):
+        if self.dialog is not None:
+            self.dialog.delete()
+            self.dialog = None
+            self.content = None
+
 
 class HelpButton:
     def __init__(self: "HelpButton", color: str = "black", auto_open: bool = False):
         self.color = color
         self.auto_open = auto_open
         self.instructions_dialog = None
-        self.create_dialog()
 
-    def create_dialog(self: "HelpButton"):
-        self.instructions_dialog = ui.dialog()
-        with self.instructions_dialog:
+    def create_dialog(self: "HelpButton", instructions_dialog: ui.dialog):
+        """Build the instructions, each time the dialog is opened"""
+        with instructions_dialog:
             with ui.card().classes("max-w-sm p-3").style(  # Smaller card, less padding
                 "background: linear-gradient(135deg, rgba(0,0,0,0.9), rgba(20,20,40,0.9)); "
                 "color: white; "
@@ -37,36 +115,10 @@ class HelpButton:
                 )
 
                 # Condensed instructions
-                ui.html(
-                    """
-                    <div style="
-                        line-height: 1.4;
-                        color: rgba(255,255,255,0.9);
-                        text-align: left;
-                        font-size: 0.95rem;
-                        font-style: normal;
-                        margin-top: 0;
-                        padding-top: 0;
-                    ">
-                        <p style="margin-top: 0; margin-bottom: 0.75rem;">
-                            Welcome to Muse Observatory! Each day introduces a new <strong>Muse</strong> with its own unique energy and theme. These Muses are narratives built on top of the <a href="https://cocoex.xyz" target="_blank" rel="noopener noreferrer" class="muse-link">cocoex</a> comet-collab. Each Muse is connected to a specific <a href="https://sdgs.un.org/goals" target="_blank" rel="noopener noreferrer" class="muse-link">Sustainable Development Goal (SDG)</a> and a related social cause.
-                        </p>
-                        <p style="margin-bottom: 0.75rem; font-style: normal;">
-                            <strong>🌌 How it works:</strong><br>
-                            • Get inspired by a fun fact about an organism from the kingdoms of life, showing how nature can spark ideas and synergies for real-world human applications.<br>
-                            • Share your thoughts and reflections about what the Muse of the day inspired in you.<br>
-                            • Once inspired, the Muse will connect you with real-world projects or NGOs aligned with your vision — because we're never alone in this journey!
-                        </p>
-                        <p style="margin-bottom: 0.75rem; font-style: normal;">
-                            <strong>🌟 Building together:</strong><br>
-                            Finally, every inspiration and project discovered will be added to the <a href="https://cocoex.xyz" target="_blank" rel="noopener noreferrer" class="muse-link">cocoex</a> register, helping us build a collective database of initiatives and ideas — from the people, for the people. :)
-                        </p>
-                    </div>
-                """
-                )
+                ui.html(INSTRUCTIONS_HTML)
 
                 # Compact close button
-                ui.button("Got it!", on_click=self.instructions_dialog.close).classes(
+                ui.button("Got it!", on_click=instructions_dialog.close).classes(
                     "muse-button mx-auto mt-2"
                 ).style(
                     "min-width: 100px; "
@@ -84,6 +136,7 @@ class HelpButton:
 
     def render(self: "HelpButton"):
         """Render the help button as a circular button with white question mark"""
+        self.instructions_dialog = LazyDialog(self.create_dialog)
         help_button = (
             ui.button("?", on_click=self.instructions_dialog.open)
             .classes("fixed top-4 left-4 z-50")
@@ -1,10 +1,11 @@
+import threading
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from tinydb import Query
 
-from db.db import get_db, get_with_logging, insert_with_logging, search_with_logging
+from db.db import UnitOfWork, get_with_logging, on_change, search_with_logging
 from models.schemas import InspirationModel, ProjectModel
 from utils.logger import get_logger
 
@@ -63,12 +64,42 @@ CHART = {
 }
 
 
+# Shown when there is no fact for today, or the database couldn't be read
+FALLBACK_FACT = {
+    "muse": "cocoex",
+    "social_cause": "cocoex",
+    "fun_fact": "The oracle didn't answer today!",
+    "question_asked": "What is the meaning of life?",
+    "fact_check_link": "#",
+}
+
+
 class Oracle:
+    """
+    Today's muse, fact and colors.
+
+    Instances are read-only snapshots; use :meth:`Oracle.today` to get the
+    one shared by every page render of the day.
+    """
+
+    _today: Optional["Oracle"] = None
+    _today_date: Optional[str] = None
+    _today_stale = False
+    _watching = False
+    _today_lock = threading.Lock()
+
     def __init__(self: "Oracle"):
         logger.info(
             "🌌 Initiating the Oracle of the day — tuning into the cosmic frequencies..."
         )
-        fact = Oracle.get_todays_fact()
+        # Not answered when the fallback stands in for a database error
+        try:
+            fact = Oracle._read_todays_fact()
+            self.answered = True
+        except Exception as e:
+            logger.error(f"☄️ Database error in the cosmic archives: {e}")
+            fact = dict(FALLBACK_FACT)
+            self.answered = False
 
         logger.info("✨ Seeking which Muse is guiding us through the universe today...")
         logger.info(f"fact: {fact}, muse: {fact.get('muse')}")
@@ -88,84 +119,135 @@ class Oracle:
         logger.info(
             f"🎨 Muse colors: {self.color}, {self.support_color}, {self.astro_color}"
         )
+        self._frozen = True
+
+    def __setattr__(self: "Oracle", name: str, value: Any) -> None:
+        if getattr(self, "_frozen", False):
+            raise AttributeError("The Oracle of the day is read-only")
+        super().__setattr__(name, value)
+
+    @classmethod
+    def today(cls: "type[Oracle]") -> "Oracle":
+        """
+        Get the Oracle shared by every page render today.
+
+        It is rebuilt when the local date rolls over or when ``daily_facts``
+        changes in any process, e.g. once the scheduler stores the new fact.
+        Changes are reported by the database's watcher thread, so this only
+        compares the date and a flag.
+        """
+        date = datetime.now().strftime("%Y-%m-%d")
+        if cls._today_stale or cls._today_date != date:
+            with cls._today_lock:
+                if cls._today_stale or cls._today_date != date:
+                    if not cls._watching:
+                        on_change("daily_facts", cls._facts_changed)
+                        cls._watching = True
+                    logger.info(f"🔭 Tuning a new Oracle for {date}...")
+                    # Cleared first so a change during the rebuild isn't lost
+                    cls._today_stale = False
+                    cls._today = cls()
+                    cls._today_date = date
+                    if not cls._today.answered:
+                        # Try the archives again next time, not tomorrow
+                        cls._today_stale = True
+        return cls._today
+
+    @classmethod
+    def _facts_changed(cls: "type[Oracle]") -> None:
+        """Mark today's Oracle for a rebuild after ``daily_facts`` changed"""
+        logger.info("🌠 The cosmic archives changed, the Oracle will be retuned")
+        cls._today_stale = True
 
     @staticmethod
     def get_todays_fact() -> Dict[str, Any]:
         """Fetch today's fact from the cosmic database"""
-        logger.info("🔮 Fetching today's fact from the cosmic archives...")
         try:
-            db = get_db()
-            today = datetime.now().strftime("%Y-%m-%d")
-            logger.info(f"Looking for fact for date: {today}")
-
-            Facts = Query()
-            # Use the new logging helper
-            fact = get_with_logging("daily_facts", Facts.date == today)
-
-            if fact:
-                logger.info("🌟 Fact found for today — the universe speaks!")
-                return fact
-            else:
-                logger.warning("🌑 No fact found for today — the stars are silent.")
-                logger.info("Creating a default fact for today")
-                default_fact = {
-                    "muse": "cocoex",
-                    "social_cause": "cocoex",
-                    "fun_fact": "The oracle didn't answer today!",
-                    "question_asked": "What is the meaning of life?",
-                    "fact_check_link": "#",
-                }
-                return default_fact
+            return Oracle._read_todays_fact()
         except Exception as e:
             logger.error(f"☄️ Database error in the cosmic archives: {e}")
-            return {
-                "muse": "cocoex",
-                "social_cause": "cocoex",
-                "fun_fact": "The oracle didn't answer today!",
-                "question_asked": "What is the meaning of life?",
-                "fact_check_link": "#",
-            }
+            return dict(FALLBACK_FACT)
 
-    def save_inspiration(self: "Oracle", user_input: str, projects: List[dict]):
-        """Save user inspiration and projects to the cosmic ledger"""
+    @staticmethod
+    def _read_todays_fact() -> Dict[str, Any]:
+        """Fetch today's fact, raising if the database can't be read"""
+        logger.info("🔮 Fetching today's fact from the cosmic archives...")
+        today = datetime.now().strftime("%Y-%m-%d")
+        logger.info(f"Looking for fact for date: {today}")
+
+        Facts = Query()
+        # Use the new logging helper
+        fact = get_with_logging("daily_facts", Facts.date == today)
+
+        if fact:
+            logger.info("🌟 Fact found for today — the universe speaks!")
+            return fact
+        logger.warning("🌑 No fact found for today — the stars are silent.")
+        logger.info("Creating a default fact for today")
+        return dict(FALLBACK_FACT)
+
+    def _stage_inspiration(
+        self: "Oracle", user_input: str, projects: List[dict]
+    ) -> UnitOfWork:
+        """Validate an inspiration and stage it with its projects for one commit"""
         # Validate input using Pydantic
         inspiration = InspirationModel(
             user_input=user_input,
             projects=[ProjectModel(**p) for p in projects],
         )
+        inspiration_id = str(uuid.uuid4())
+
+        # Inspiration and projects are committed together in one write
+        work = UnitOfWork()
+        logger.info("🌌 Staging inspiration for the database...")
+        inspiration_data = {
+            "date": datetime.now().strftime("%Y-%m-%d"),
+            "id": inspiration_id,
+            "user_inspiration": inspiration.user_input,
+            "created_at": datetime.now().isoformat(),
+        }
+        work.insert("inspirations", inspiration_data)
+
+        logger.info("🌠 Staging related projects for the cosmic registry...")
+        for project in inspiration.projects:
+            logger.info(
+                f"🚀 Staging project: {project.project_name} (by {project.organization})"
+            )
+            project_data = {
+                "id": str(uuid.uuid4()),
+                "project_name": project.project_name,
+                "organisation": project.organization,
+                "geographical_level": project.geographic_level,
+                "link_to_organisation": project.link_to_organization,
+                "sk_inspiration": inspiration_id,
+                "created_at": datetime.now().isoformat(),
+            }
+            work.insert("projects", project_data)
+        return work
+
+    def save_inspiration(self: "Oracle", user_input: str, projects: List[dict]):
+        """Save user inspiration and projects to the cosmic ledger"""
+        work = self._stage_inspiration(user_input, projects)
         logger.info(
             f"📝 Saving inspiration from the observer to the cosmic ledger for muse {self.muse_name}..."
         )
         try:
-            inspiration_id = str(uuid.uuid4())
-
-            # Insert inspiration using logging helper
-            logger.info("🌌 Inserting inspiration into the database...")
-            inspiration_data = {
-                "date": datetime.now().strftime("%Y-%m-%d"),
-                "id": inspiration_id,
-                "user_inspiration": inspiration.user_input,
-                "created_at": datetime.now().isoformat(),
-            }
-            insert_with_logging("inspirations", inspiration_data)
-
-            # Insert projects using logging helper
-            logger.info("🌠 Inserting related projects into the cosmic registry...")
-            for project in inspiration.projects:
-                logger.info(
-                    f"🚀 Inserting project: {project.project_name} (by {project.organization})"
-                )
-                project_data = {
-                    "id": str(uuid.uuid4()),
-                    "project_name": project.project_name,
-                    "organisation": project.organization,
-                    "geographical_level": project.geographic_level,
-                    "link_to_organisation": project.link_to_organization,
-                    "sk_inspiration": inspiration_id,
-                    "created_at": datetime.now().isoformat(),
-                }
-                insert_with_logging("projects", project_data)
+            work.commit()
+            logger.info(
+                f"🌌 Inspiration and projects for muse {self.muse_name} have been committed to the universe!"
+            )
+        except Exception as e:
+            logger.error(f"💥 Save failed in the cosmic ledger: {str(e)}")
+            raise
 
+    async def asave_inspiration(self: "Oracle", user_input: str, projects: List[dict]):
+        """Save user inspiration and projects without blocking the event loop"""
+        work = self._stage_inspiration(user_input, projects)
+        logger.info(
+            f"📝 Saving inspiration from the observer to the cosmic ledger for muse {self.muse_name}..."
+        )
+        try:
+            await work.acommit()
             logger.info(
                 f"🌌 Inspiration and projects for muse {self.muse_name} have been committed to the universe!"
             )
@@ -26,3 +26,7 @@ class AppInfoResponse(BaseModel):
     name: str
     description: str
     environment: str
+
+
+class ShareRequest(BaseModel):
+    user_input: str
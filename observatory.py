@@ -1,17 +1,29 @@
-import base64
 from typing import Dict, List
 
 from fastapi import Request
 from fastapi.responses import RedirectResponse
 from nicegui import ui
 from slowapi.errors import RateLimitExceeded
-
-from css.observatory_css import get_cosmic_css, get_load_cosmic_css, get_text_css
-from models.helper import create_help_button
+from slowapi.util import get_remote_address
+
+from css.observatory_css import get_cosmic_stars, get_load_stars
+from css.stylesheets import (
+    LAYOUT_STYLESHEET,
+    OBSERVATORY_SCRIPT,
+    muse_stylesheets,
+    script_tag,
+    stylesheet_link,
+)
+from models.helper import LazyDialog, create_help_button, log_element_count
 from models.muse import Oracle
-from utils.generate_projects import get_project_response
+from observatory_static import LIVE_OBSERVATORY_PATH
+from utils.clients import track_activity
+from utils.generate_projects import get_project_response, unstreamed_projects
 from utils.limiter import limiter
 from utils.logger import get_logger
+from utils.media import LOGO
+from utils.openai_scheduler import SchedulerBusy
+from utils.profiling import lap, profiled
 from utils.utils import validate_project_input
 
 logger = get_logger(__name__)
@@ -24,22 +36,31 @@ def apply_styles(color: str, support_color: str, astro_color: str):
     logger.info(
         f"🌈 Applying cosmic styles: primary={color}, support={support_color}, astro={astro_color}"
     )
-    # 1. Base cosmic styles from styles.py
-    cosmic_css, stars = get_cosmic_css(color, support_color, astro_color)
-    ui.add_head_html(cosmic_css)
-    ui.add_body_html(stars)
-    text_style = get_text_css(color)
-    ui.add_head_html(text_style)
+    # 1. Base cosmic styles from styles.py, compiled once per muse
+    stylesheets = muse_stylesheets(color, support_color, astro_color)
+    ui.add_head_html(stylesheet_link(stylesheets.cosmic))
+    ui.add_head_html(script_tag(OBSERVATORY_SCRIPT))
+    ui.add_body_html(get_cosmic_stars())
+    ui.add_head_html(stylesheet_link(stylesheets.text))
 
 
-def show_projects_dialog(projects: List[Dict], muse_name: str, muse_color: str) -> bool:
+def show_projects_dialog(
+    projects: List[Dict], muse_name: str, muse_color: str
+) -> LazyDialog:
     """Display projects in a mobile-optimized dialog with muse-themed styling"""
     logger.info(
         f"🌌 Opening projects dialog for muse '{muse_name}' with {len(projects)} cosmic projects."
     )
+    return LazyDialog(
+        lambda dialog: build_projects_dialog(dialog, projects, muse_name, muse_color),
+        classes="w-full h-full flex items-center justify-center p-4",
+    )
 
-    dialog = ui.dialog().classes("w-full h-full flex items-center justify-center p-4")
 
+def build_projects_dialog(
+    dialog: ui.dialog, projects: List[Dict], muse_name: str, muse_color: str
+):
+    """Build the projects dialog content; it is deleted again once closed"""
     with dialog:
         # Main container with margins for background visibility
         with ui.card().classes("w-full max-w-sm mx-4 max-h-[85vh] overflow-hidden"):
@@ -72,56 +93,58 @@ def show_projects_dialog(projects: List[Dict], muse_name: str, muse_color: str)
 
                 # Compact projects container
                 with ui.column().classes("w-full gap-2"):
-                    for project in projects:
-                        logger.info(
-                            f"🚀 Displaying project: {project['project_name']} (by {project['organization']})"
-                        )
-
-                        with ui.card().classes(
-                            "w-full p-2 bg-white bg-opacity-90 border-l-2"
-                        ).style(f"border-left-color: {muse_color}"):
-                            with ui.column().classes("w-full gap-1"):
-                                # Project name - very compact
-                                ui.label(project["project_name"]).classes(
-                                    "text-sm font-semibold text-black leading-tight"
-                                ).style(
-                                    "word-wrap: break-word; max-height: 2.5em; overflow: hidden;"
-                                )
-
-                                # Organization - smaller text
-                                ui.label(f"by {project['organization']}").classes(
-                                    "text-xs text-gray-700"
-                                ).style(
-                                    "word-wrap: break-word; max-height: 1.2em; overflow: hidden;"
-                                )
-
-                                # Compact info row
-                                with ui.row().classes(
-                                    "items-center justify-between gap-2"
-                                ):
-                                    ui.label(f"{project['geographic_level']}").classes(
-                                        "text-xs text-gray-600"
-                                    )
-
-                                    # Compact link
-                                    with ui.row().classes("items-center gap-1"):
-                                        ui.icon("link", size="xs").classes(
-                                            "text-primary"
-                                        )
-                                        ui.link(
-                                            "Visit",
-                                            project["link_to_organization"],
-                                            new_tab=True,
-                                        ).classes("text-primary text-xs")
+                    # Projects still being generated are added here as they come
+                    with ui.column().classes("w-full gap-2") as cards:
+                        for project in projects:
+                            add_project_card(project, muse_color)
 
                     # Close button with muse color
                     ui.button("Close", on_click=dialog.close).classes(
                         "dialog-button w-full mt-2"
                     )
-    return dialog
+    return cards
+
+
+def add_project_card(project: Dict, muse_color: str):
+    """Add one project card to the current container"""
+    logger.info(
+        f"🚀 Displaying project: {project['project_name']} (by {project['organization']})"
+    )
+
+    with ui.card().classes("w-full p-2 bg-white bg-opacity-90 border-l-2").style(
+        f"border-left-color: {muse_color}"
+    ):
+        with ui.column().classes("w-full gap-1"):
+            # Project name - very compact
+            ui.label(project["project_name"]).classes(
+                "text-sm font-semibold text-black leading-tight"
+            ).style("word-wrap: break-word; max-height: 2.5em; overflow: hidden;")
+
+            # Organization - smaller text
+            ui.label(f"by {project['organization']}").classes(
+                "text-xs text-gray-700"
+            ).style("word-wrap: break-word; max-height: 1.2em; overflow: hidden;")
+
+            # Compact info row
+            with ui.row().classes("items-center justify-between gap-2"):
+                ui.label(f"{project['geographic_level']}").classes(
+                    "text-xs text-gray-600"
+                )
+
+                # Compact link
+                with ui.row().classes("items-center gap-1"):
+                    ui.icon("link", size="xs").classes("text-primary")
+                    ui.link(
+                        "Visit",
+                        project["link_to_organization"],
+                        new_tab=True,
+                    ).classes("text-primary text-xs")
 
 
-async def handle_share(oracle_day: Oracle, user_input: str, share_button: ui.button):
+@profiled("share")
+async def handle_share(
+    oracle_day: Oracle, user_input: str, share_button: ui.button, client_key: str
+):
     """Handle the share button click with cosmic starry loader"""
     logger.info(
         f"✨ User is sharing inspiration with muse '{oracle_day.muse_name}'. Input: '{user_input[:60]}...'"
@@ -134,16 +157,15 @@ async def handle_share(oracle_day: Oracle, user_input: str, share_button: ui.but
             "z-index: 9999; position: fixed; top: 0; left: 0; width: 100vw; height: 100vh; display: flex; align-items: center; justify-content: center; background-color: #000000;"
         )
 
-        # Add HTML/CSS for animated cosmic background
-        loader_cosmic_css = get_text_css(oracle_day.color)
-        ui.add_head_html(loader_cosmic_css)
-
         # Container for cosmic elements with proper positioning
         cosmic_container = ui.element("div")
         cosmic_container.classes("cosmic-loader")
-        cosmic_loader_css, stars = get_load_cosmic_css(oracle_day.color)
-        ui.html(cosmic_loader_css)
-        ui.html(stars)
+        # Linked inside the loader so its star styles go away with it
+        stylesheets = muse_stylesheets(
+            oracle_day.color, oracle_day.support_color, oracle_day.astro_color
+        )
+        ui.html(stylesheet_link(stylesheets.loader))
+        ui.html(get_load_stars())
 
         # Loading message with higher z-index than stars - positioned in the absolute center
         # Using black background with no border
@@ -151,29 +173,67 @@ async def handle_share(oracle_day: Oracle, user_input: str, share_button: ui.but
             f"background-color: #000000; border: 0px solid {oracle_day.color}80; position: absolute; top: 50%; left: 50%; transform: translate(-50%, -50%);"
         ):
             ui.label("Capting signals... 📡").classes("text-2xl font-bold text-white")
+            queue_label = ui.label().classes("text-sm text-white")
+
+    def show_queue(ahead: int, wait: float):
+        """Position in line for the cosmic engine, while waiting for a slot"""
+        if ahead:
+            queue_label.set_text(f"{ahead} signals ahead of yours, about {wait:.0f}s")
+        else:
+            queue_label.set_text("Your signal is next in line")
+
+    # Projects shown so far; the dialog opens with the first one
+    shown_projects: List[Dict] = []
+    dialog = show_projects_dialog(
+        shown_projects, oracle_day.muse_name, oracle_day.color
+    )
+
+    def show_project(project: Dict):
+        """Show a project as soon as the cosmic engine has generated it"""
+        shown_projects.append(project)
+        if dialog.content is not None:
+            with dialog.content:
+                add_project_card(project, oracle_day.color)
+        elif len(shown_projects) == 1:
+            # The loader would cover the dialog
+            loader.set_visibility(False)
+            dialog.open()
+
+    lap("loader")
 
     try:
         # Get project recommendations
         logger.info("🔭 Querying cosmic engine for project recommendations...")
-        projects_data = await get_project_response(oracle_day, user_input)
-        if not projects_data or not projects_data.get("projects"):
+        projects_data = await get_project_response(
+            oracle_day,
+            user_input,
+            client_key,
+            show_queue,
+            on_project=lambda project: show_project(project.model_dump()),
+        )
+        lap("projects")
+        # Remove share button
+        share_button.delete()
+        # Show the projects that didn't stream in (cached answers, cut streams);
+        # the ones on screen are what gets saved, whatever the final answer
+        for project in unstreamed_projects(shown_projects, projects_data):
+            show_project(project)
+        if not shown_projects:
             logger.warning("🌑 No cosmic connections found for this inspiration.")
             ui.notify("No cosmic connections found today", type="info")
-            projects_data = {"projects": []}
+            dialog.open()
         else:
-            logger.info(f"🌠 {len(projects_data['projects'])} cosmic projects found!")
-        # Remove share button
-        share_button.delete()
-        # Show projects dialog
-        dialog = show_projects_dialog(
-            projects_data["projects"], oracle_day.muse_name, oracle_day.color
-        )
-        dialog.open()
+            logger.info(f"🌠 {len(shown_projects)} cosmic projects found!")
+        lap("dialog")
         # Save to database
         logger.info("📝 Saving inspiration and cosmic projects to the ledger...")
-        oracle_day.save_inspiration(user_input, projects_data["projects"])
+        await oracle_day.asave_inspiration(user_input, shown_projects)
+        lap("save")
         logger.info(f"🌌 Inspiration shared with {oracle_day.muse_name}!")
         ui.notify(f"Shared with {oracle_day.muse_name}!", type="positive")
+    except SchedulerBusy as e:
+        # The share button stays, so the visitor can try again
+        ui.notify(str(e), type="warning")
     except Exception as e:
         logger.error(f"☄️ Sandstorm turbulence during share: {str(e)}")
         ui.notify(f"Sandstorm turbulences!: {str(e)}", type="negative")
@@ -181,12 +241,19 @@ async def handle_share(oracle_day: Oracle, user_input: str, share_button: ui.but
         loader.delete()
 
 
-@ui.page("/observatory")
+@ui.page(LIVE_OBSERVATORY_PATH)
 @limiter.limit("3/day")
+@profiled("observatory")
 def observatory(request: Request):
     logger.info("🛰️ Rendering the Observatory page — aligning the cosmic interface...")
-    oracle_day = Oracle()
+    oracle_day = Oracle.today()
+    client_key = get_remote_address(request)
+    lap("oracle")
+    track_activity()
     apply_styles(oracle_day.color, oracle_day.support_color, oracle_day.astro_color)
+    lap("styles")
+    logo_html = LOGO.html("logo-img", "cocoex Logo")
+    lap("logo")
 
     # Create and render help button instead of sidebar
     help_button = create_help_button(oracle_day.color, auto_open=True)
@@ -200,17 +267,15 @@ def observatory(request: Request):
         with ui.column().classes("w-full text-center").style("padding-top: 0px;"):
             # Logo and headers - centered alignment with reduced spacing
             with ui.row().classes("w-full justify-center"):
-                with open("img/logo.png", "rb") as img_file:
-                    logo_base64 = base64.b64encode(img_file.read()).decode()
-                    ui.html(
-                        f"""
-                    <div class="logo-container" style="display: flex; justify-content: center; align-items: center;">
-                        <a href="https://cocoex.xyz" target="_blank">
-                            <img src="data:image/png;base64,{logo_base64}" class="logo-img">
-                        </a>
-                    </div>
-                    """
-                    )
+                ui.html(
+                    f"""
+                <div class="logo-container" style="display: flex; justify-content: center; align-items: center;">
+                    <a href="https://cocoex.xyz" target="_blank">
+                        {logo_html}
+                    </a>
+                </div>
+                """
+                )
             help_button.render()
             # Text elements with minimal spacing
             ui.label("Today's Muse is").classes("muse-subtitle text-center").style(
@@ -253,252 +318,22 @@ def observatory(request: Request):
                     ui.notify(f"Please inspire {oracle_day.muse_name}!", type="warning")
                     return
                 # Call the async handle_share function
-                await handle_share(oracle_day, validated_input, share_button)
+                await handle_share(
+                    oracle_day, validated_input, share_button, client_key
+                )
 
             share_button = ui.button(
                 f"SHARE WITH {oracle_day.muse_name.upper()}", on_click=on_share_click
             ).classes("muse-button mx-auto")
+    lap("elements")
 
     # Add mobile-responsive CSS with fixed positioning and height constraints
     ui.add_head_html(
         """
     <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
-    <style>
-    /* Fix body and html to prevent infinite scrolling */
-    html, body {
-        height: 100vh !important;
-        max-height: 100vh !important;
-        overflow-x: hidden !important;
-        overflow-y: auto !important;
-        position: relative !important;
-        margin: 0 !important;
-        padding: 0 !important;
-        width: 100% !important;
-    }
-
-    /* Constrain cosmic background elements */
-    .cosmic-overlay, .dust-overlay {
-        position: fixed !important;
-        top: 0 !important;
-        left: 0 !important;
-        width: 100vw !important;
-        height: 100vh !important;
-        max-height: 100vh !important;
-        overflow: hidden !important;
-        z-index: -1 !important;
-    }
-
-    /* Constrain all cosmic elements */
-    .star, .shooting-star, .cosmic-dust, .nebula-particle, .pulsar {
-        position: fixed !important;
-        max-height: 100vh !important;
-        overflow: hidden !important;
-    }
-
-    /* Logo container alignment - responsive */
-    .logo-container {
-        top: 8px;
-        left: 0;
-        right: 0;
-        display: flex;
-        justify-content: center;
-        z-index: 1000;
-        margin-bottom: 0px;
-    }
-    .logo-img {
-        width: 50px;
-        height: 50px;
-        object-fit: contain;
-    }
-
-    /* Main container with proper height constraints and small margins */
-    .main-container {
-        min-height: 100vh !important;
-        /* max-height: 100vh !important; */
-        /* height: 100vh !important; */
-        width: calc(100% - 1rem) !important;
-        max-width: calc(100% - 1rem) !important;
-        margin: 0 0.5rem !important;
-        padding: 0.5rem !important;
-        padding-top: 0 !important;  /* Remove top padding */
-        overflow-y: auto !important;
-        overflow-x: hidden !important;
-        display: flex !important;
-        flex-direction: column !important;
-        justify-content: flex-start !important;  /* Start from top */
-        box-sizing: border-box !important;
-    }
-
-    @media (max-width: 430px) {
-        .muse-title {
-            font-size: 36px !important;  /* Reduce title size on mobile */
-        }
-
-        .muse-subtitle {
-            font-size: 16px !important;  /* Reduce subtitle size on mobile */
-        }
-
-        .fun-fact, .question-text {
-            font-size: 14px !important;  /* Reduce text size on mobile */
-            line-height: 1.3 !important;
-        }
-        .main-container {
-            justify-content: flex-start !important;
-            width: calc(100% - 0.75rem) !important;
-            max-width: calc(100% - 0.75rem) !important;
-            margin: 0 0.375rem !important;
-            padding: 0.25rem !important;
-            padding-top: 0 !important;  /* Start from very top */
-            padding-bottom: 10px !important;
-        }
-
-        /* Adjust logo position to account for no top padding */
-        .logo-container {
-            top: 5px !important;  /* Reduced from 8px */
-            margin-bottom: 5px !important;
-        }
-    }
-
-    @media (max-width: 375px) {
-        /* iPhone 13 mini specific */
-        .main-container {
-            justify-content: flex-start !important;
-            width: calc(100% - 0.5rem) !important;
-            max-width: calc(100% - 0.5rem) !important;
-            margin: 0 0.25rem !important;
-            padding: 0.25rem !important;
-            padding-top: 0 !important;  /* Start from very top */
-            padding-bottom: 8px !important;
-        }
-
-        /* Adjust logo position */
-        .logo-container {
-            top: 3px !important;  /* Very close to top */
-            margin-bottom: 3px !important;
-        }
-    }
-
-    /* Ensure all text elements are properly centered with minimal spacing */
-    .muse-subtitle, .muse-title, .fun-fact, .source-link, .question-text {
-        text-align: center !important;
-        display: block !important;
-        width: 100% !important;
-        margin-top: 0px !important;
-        margin-bottom: 0px !important;
-        padding-top: 0px !important;
-        padding-bottom: 0px !important;
-    }
-
-    /* Minimize spacing between UI elements */
-    .main-container > * {
-        margin-top: 0px !important;
-        margin-bottom: 0px !important;
-    }
-
-    /* Ensure content fits within viewport */
-    * {
-        box-sizing: border-box !important;
-    }
-
-    /* Mobile-specific input styling */
-    @media (max-width: 430px) {
-        input, textarea {
-            font-size: 16px !important; /* Prevents zoom on iOS */
-            -webkit-appearance: none !important;
-            border-radius: 12px !important;
-        }
-    }
-
-    /* Safari-specific fixes */
-    @supports (-webkit-touch-callout: none) {
-        .main-container {
-            -webkit-overflow-scrolling: touch !important;
-        }
-
-        /* Additional iOS Safari fixes */
-        body {
-            position: fixed !important;
-            width: 100% !important;
-            height: 100% !important;
-        }
-
-        .main-container {
-            position: relative !important;
-            height: 100vh !important;
-            overflow-y: scroll !important;
-        }
-    }
-    </style>
     """
     )
+    ui.add_head_html(stylesheet_link(LAYOUT_STYLESHEET))
+    lap("head_html")
 
-    # Add client-side timeout script
-    ui.add_head_html(
-        """
-    <script>
-      // Handle idle timeout - increased to 5 minutes for better mobile experience
-      let idleTimer = null;
-      const idleTime = 300000; // 5 minutes in milliseconds
-      let warningShown = false;
-      let warningElement = null;
-
-      // Reset the timer when user interacts
-      function resetIdleTimer() {
-        clearTimeout(idleTimer);
-        if (warningShown) {
-          hideWarning();
-        }
-        idleTimer = setTimeout(showWarning, idleTime);
-      }
-
-      // Show warning before timeout
-      function showWarning() {
-        warningShown = true;
-
-        // Create warning element if it doesn't exist
-        if (!warningElement) {
-          warningElement = document.createElement('div');
-          warningElement.style.position = 'fixed';
-          warningElement.style.bottom = '10px';
-          warningElement.style.left = '10px';
-          warningElement.style.backgroundColor = 'rgba(0,0,0,0.8)';
-          warningElement.style.color = 'white';
-          warningElement.style.padding = '10px';
-          warningElement.style.borderRadius = '5px';
-          warningElement.style.zIndex = '10000';
-          warningElement.style.fontSize = '14px';
-          warningElement.style.boxShadow = '0 0 10px rgba(255,255,255,0.2)';
-          warningElement.innerHTML = 'Your session is about to expire. Tap anywhere to continue.';
-          document.body.appendChild(warningElement);
-        } else {
-          warningElement.style.display = 'block';
-        }
-
-        // Set timeout for actual reload if no action is taken
-        idleTimer = setTimeout(handleIdleTimeout, 30000); // 30 seconds warning
-      }
-
-      // Hide warning
-      function hideWarning() {
-        warningShown = false;
-        if (warningElement) {
-          warningElement.style.display = 'none';
-        }
-      }
-
-      // Handle when idle timeout occurs
-      function handleIdleTimeout() {
-        // Reload the page which will trigger the server-side timeout
-        window.location.reload();
-      }
-
-      // Set up event listeners for user activity - more comprehensive for mobile
-      ['mousedown', 'mousemove', 'keypress', 'scroll', 'touchstart', 'touchmove', 'click', 'focus'].forEach(evt => {
-        document.addEventListener(evt, resetIdleTimer, false);
-      });
-
-      // Start the timer when page loads
-      document.addEventListener('DOMContentLoaded', resetIdleTimer, false);
-    </script>
-    """
-    )
+    log_element_count("Observatory page")
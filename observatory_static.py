@@ -0,0 +1,250 @@
+"""
+Static-first rendering of the observatory page.
+
+The page only changes when the fact of the day does, so in static mode it is
+rendered once per Oracle into an HTML snapshot. The app serves the snapshot
+from memory with an ETag and writes it to ``static-observatory/`` for nginx.
+The share form posts to a small JSON endpoint instead of a NiceGUI websocket.
+"""
+
+import html
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from nicegui import app as nicegui_app
+from slowapi.util import get_remote_address
+
+from css.observatory_css import get_cosmic_stars, get_load_stars
+from css.stylesheets import (
+    LAYOUT_STYLESHEET,
+    STATIC_PAGE_SCRIPT,
+    STATIC_PAGE_STYLESHEET,
+    muse_stylesheets,
+    script_tag,
+    stylesheet_link,
+)
+from models.helper import INSTRUCTIONS_HTML
+from models.muse import Oracle
+from models.schemas import ShareRequest
+from utils.assets import StaticAsset, asset_response, build_asset
+from utils.generate_projects import get_project_response, unstreamed_projects
+from utils.limiter import limiter
+from utils.logger import get_logger
+from utils.media import LOGO
+from utils.openai_scheduler import SchedulerBusy
+from utils.utils import validate_project_input
+
+logger = get_logger(__name__)
+
+# "live" renders every visit with NiceGUI; "static" serves the snapshot
+OBSERVATORY_MODE = os.getenv("OBSERVATORY_MODE", "live").lower()
+STATIC_MODE = OBSERVATORY_MODE == "static"
+
+OBSERVATORY_PATH = "/observatory"
+# Where the NiceGUI page lives; static mode keeps it reachable for comparison
+LIVE_OBSERVATORY_PATH = "/observatory/live" if STATIC_MODE else OBSERVATORY_PATH
+SHARE_PATH = "/observatory/share"
+
+# Folder shared with nginx, which serves the snapshot without reaching the app
+STATIC_DIR = Path(os.getenv("STATIC_OBSERVATORY_DIR", "static-observatory"))
+SNAPSHOT_FILE = STATIC_DIR / "observatory.html"
+
+# How often the snapshot is checked against today's Oracle, in seconds
+SNAPSHOT_REFRESH_INTERVAL = 60.0
+
+# The snapshot URL is stable, so clients revalidate it with the ETag
+SNAPSHOT_CACHE_CONTROL = "no-cache"
+
+_snapshot: Optional[Tuple[Oracle, StaticAsset]] = None
+_snapshot_lock = threading.Lock()
+
+
+def render_observatory(oracle_day: Oracle) -> str:
+    """Render the observatory page of ``oracle_day`` as a standalone document."""
+    stylesheets = muse_stylesheets(
+        oracle_day.color, oracle_day.support_color, oracle_day.astro_color
+    )
+    muse_name = html.escape(oracle_day.muse_name or "")
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
+  <title>Muse Observatory</title>
+  <link rel="icon" href="data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 100 100%22><text y=%22.9em%22 font-size=%2290%22>🔭</text></svg>">
+  {stylesheet_link(stylesheets.cosmic)}
+  {stylesheet_link(stylesheets.text)}
+  {stylesheet_link(LAYOUT_STYLESHEET)}
+  {stylesheet_link(STATIC_PAGE_STYLESHEET)}
+  {script_tag(STATIC_PAGE_SCRIPT)}
+</head>
+<body style="--muse-color: {oracle_day.color}">
+  {get_cosmic_stars()}
+  <button id="help-button" class="help-button" type="button" aria-label="Help">?</button>
+  <dialog id="help-dialog" class="muse-dialog help-dialog">
+    <h2>🔭 Observatory Instructions</h2>
+    {INSTRUCTIONS_HTML}
+    <div class="dialog-actions">
+      <button class="muse-button" type="button" data-close>Got it!</button>
+    </div>
+  </dialog>
+  <div class="main-container">
+    <div class="cosmic-overlay"></div>
+    <div class="static-overlay"></div>
+    <div class="logo-container">
+      <a href="https://cocoex.xyz" target="_blank">
+        {LOGO.html("logo-img", "cocoex Logo")}
+      </a>
+    </div>
+    <div class="muse-subtitle">Today's Muse is</div>
+    <div class="muse-title">{muse_name.upper()}</div>
+    <div class="muse-subtitle">for {html.escape(oracle_day.social_cause)}</div>
+    <div class="fun-fact">{html.escape(oracle_day.fun_fact)}</div>
+    <a class="source-link" href="{html.escape(oracle_day.fact_check_link)}" target="_blank" rel="noopener noreferrer">Source</a>
+    <div class="question-text">{html.escape(oracle_day.question_asked)}</div>
+    <form id="share-form" class="input-container share-form" action="{SHARE_PATH}" data-muse="{muse_name}">
+      <textarea class="clean-input" name="inspiration" maxlength="500" rows="3" placeholder="Share your inspiration..."></textarea>
+      <button class="muse-button" type="submit">SHARE WITH {muse_name.upper()}</button>
+    </form>
+    <div id="share-status" class="share-status" role="status"></div>
+  </div>
+  <template id="share-loader">
+    {stylesheet_link(stylesheets.loader)}
+    {get_load_stars()}
+    <div class="share-loader-text">Capting signals... 📡</div>
+  </template>
+  <dialog id="projects-dialog" class="muse-dialog projects-dialog">
+    <h2><span class="projects-muse" style="color: {oracle_day.color}"></span> Projects</h2>
+    <div class="projects-list"></div>
+    <div class="dialog-actions">
+      <button class="dialog-button" type="button" data-close>Close</button>
+    </div>
+  </dialog>
+</body>
+</html>
+"""
+
+
+def current_snapshot() -> StaticAsset:
+    """Return the page snapshot of today's Oracle, rendering it on roll-over."""
+    global _snapshot
+    oracle_day = Oracle.today()
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot[0] is not oracle_day:
+            page = render_observatory(oracle_day).encode("utf-8")
+            snapshot = build_asset("observatory.html", page, compress=True)
+            _snapshot = (oracle_day, snapshot)
+            logger.info(
+                f"🗞️ Rendered observatory snapshot for {oracle_day.muse_name} "
+                f"({len(page)} bytes)"
+            )
+            try:
+                write_snapshot(snapshot)
+            except OSError as e:
+                logger.error(f"❌ Could not write observatory snapshot: {e}")
+        return _snapshot[1]
+
+
+def write_snapshot(snapshot: StaticAsset) -> None:
+    """Atomically write the snapshot (and its gzip copy) for nginx."""
+    STATIC_DIR.mkdir(parents=True, exist_ok=True)
+    files = {SNAPSHOT_FILE: snapshot.content}
+    if "gzip" in snapshot.encoded:
+        files[SNAPSHOT_FILE.with_name(SNAPSHOT_FILE.name + ".gz")] = snapshot.encoded[
+            "gzip"
+        ]
+    for path, content in files.items():
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+
+
+def remove_snapshot() -> None:
+    """Drop a snapshot left from static mode, so nginx falls back to the app."""
+    for path in (SNAPSHOT_FILE, SNAPSHOT_FILE.with_name(SNAPSHOT_FILE.name + ".gz")):
+        path.unlink(missing_ok=True)
+
+
+def _refresh_snapshots() -> None:
+    while True:
+        try:
+            current_snapshot()
+        except Exception as e:
+            logger.error(f"❌ Failed to refresh the observatory snapshot: {e}")
+        time.sleep(SNAPSHOT_REFRESH_INTERVAL)
+
+
+def start_snapshots() -> None:
+    """Keep the snapshot on disk current, or clear it when running live."""
+    if not STATIC_MODE:
+        remove_snapshot()
+        return
+    logger.info("🗞️ Serving the observatory page as a static snapshot")
+    threading.Thread(
+        target=_refresh_snapshots, name="snapshot-refresher", daemon=True
+    ).start()
+
+
+if STATIC_MODE:
+
+    @nicegui_app.get(OBSERVATORY_PATH)
+    async def observatory_snapshot(request: Request):
+        """Serve today's pre-rendered observatory page."""
+        return asset_response(current_snapshot(), request, SNAPSHOT_CACHE_CONTROL)
+
+    @nicegui_app.post(SHARE_PATH)
+    @limiter.limit("3/day")
+    async def share_inspiration(request: Request, share: ShareRequest):
+        """Find projects for an inspiration shared from the static page and save it."""
+        return await answer_share(
+            Oracle.today(), share.user_input, get_remote_address(request)
+        )
+
+
+async def answer_share(oracle_day: Oracle, user_input: str, client_key: str):
+    """
+    Answer a share of the static page: the projects found, or an error status.
+
+    Projects are checked as on the live page, and a share the cosmic engine
+    couldn't answer (quota, error) is not saved.
+    """
+    validated_input = validate_project_input(user_input)
+    if validated_input is None:
+        logger.info("User input validation failed.")
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Please inspire {oracle_day.muse_name}!"},
+        )
+    logger.info(
+        f"✨ Static share with muse '{oracle_day.muse_name}'. Input: '{validated_input[:60]}...'"
+    )
+    try:
+        projects_data = await get_project_response(
+            oracle_day, validated_input, client_key
+        )
+        if projects_data and projects_data.get("error"):
+            logger.warning(f"🚫 Static share left unanswered: {projects_data['error']}")
+            return JSONResponse(
+                status_code=503, content={"error": projects_data["error"]}
+            )
+        # Malformed projects are dropped rather than failing the whole share
+        projects = unstreamed_projects([], projects_data)
+        await oracle_day.asave_inspiration(validated_input, projects)
+    except SchedulerBusy as e:
+        return JSONResponse(
+            status_code=503,
+            content={"error": str(e)},
+            headers={"Retry-After": "30"},
+        )
+    except Exception as e:
+        logger.error(f"☄️ Sandstorm turbulence during share: {str(e)}")
+        return JSONResponse(
+            status_code=500, content={"error": f"Sandstorm turbulences!: {str(e)}"}
+        )
+    logger.info(f"🌌 Inspiration shared with {oracle_day.muse_name}!")
+    return {"muse": oracle_day.muse_name, "projects": projects}
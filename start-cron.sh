@@ -1,3 +1,4 @@
 #!/bin/bash
 source /venv/bin/activate
-/venv/bin/python /app/generate_fact.py
\ No newline at end of file
+/venv/bin/python /app/generate_fact.py
+/venv/bin/python -m db.manage archive
\ No newline at end of file
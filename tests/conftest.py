@@ -0,0 +1,51 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+import pytest
+
+# The OpenAI clients are created on import; no call ever leaves the tests
+os.environ.setdefault("OPENAI_API_KEY", "test")
+# Module-level files (caches, results of shared calls) stay out of db_files/
+os.environ["DB_DIR"] = tempfile.mkdtemp(prefix="muse-tests-")
+
+from db.storage import LogTinyDB  # noqa: E402
+
+
+@pytest.fixture
+def db_file(tmp_path: Path) -> Path:
+    """Path of a JSON database that doesn't exist yet."""
+    return tmp_path / "muse_observatory.json"
+
+
+@pytest.fixture
+def open_db(db_file: Path) -> Iterator[Callable[..., LogTinyDB]]:
+    """Open ``LogTinyDB`` instances on ``db_file``, closed after the test."""
+    opened: List[LogTinyDB] = []
+
+    def open_(**kwargs) -> LogTinyDB:
+        kwargs.setdefault("fsync", False)
+        db = LogTinyDB(db_file, **kwargs)
+        opened.append(db)
+        return db
+
+    yield open_
+    for db in opened:
+        if not db.storage._closed:
+            db.close()
+
+
+@pytest.fixture(params=["tinydb", "sqlite"])
+def app_db(request, tmp_path: Path, monkeypatch):
+    """Point the ``db.db`` helpers at a new database of each backend."""
+    import db.db as database
+
+    monkeypatch.setattr(database, "DB_BACKEND", request.param)
+    monkeypatch.setattr(database, "DB_DIR", tmp_path)
+    monkeypatch.setattr(database, "DB_FILE", tmp_path / "muse_observatory.json")
+    monkeypatch.setattr(database, "SQLITE_FILE", tmp_path / "muse_observatory.sqlite3")
+    monkeypatch.setattr(database, "_db_instance", None)
+    yield database
+    if database._db_instance is not None:
+        database._db_instance.close()
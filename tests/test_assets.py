@@ -0,0 +1,131 @@
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+import utils.assets as assets
+from utils.assets import (
+    ASSETS_PATH,
+    CACHE_CONTROL,
+    asset_response,
+    build_asset,
+    get_asset,
+    register_bytes,
+)
+
+CSS = b"body { color: #0b3d2e; }\n" * 40
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Preference order as with brotli installed, whether it is or not
+    monkeypatch.setattr(assets, "ENCODINGS", ("br", "gzip"))
+    app = FastAPI()
+
+    @app.get(ASSETS_PATH + "/{filename}")
+    async def static_asset(request: Request, filename: str):
+        asset = get_asset(filename)
+        if asset is None:
+            return Response(status_code=404)
+        return asset_response(asset, request)
+
+    @app.get("/limited")
+    async def limited(request: Request):
+        page = build_asset("limited.html", b"<p>Come back tomorrow</p>")
+        return asset_response(page, request, "no-cache", status_code=429)
+
+    return TestClient(app)
+
+
+def test_url_is_fingerprinted_by_content():
+    first = register_bytes("observatory.css", CSS)
+    second = register_bytes("observatory.css", CSS + b"p {}\n")
+
+    assert first.url.startswith(f"{ASSETS_PATH}/observatory.")
+    assert first.url.endswith(".css")
+    assert first.url != second.url
+    assert first.etag != second.etag
+    assert get_asset(first.filename) is first
+
+
+def test_asset_is_served_immutable_with_a_strong_etag(client):
+    asset = register_bytes("observatory.css", CSS)
+
+    response = client.get(asset.url, headers={"Accept-Encoding": "identity"})
+
+    assert response.status_code == 200
+    assert response.content == CSS
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.headers["cache-control"] == CACHE_CONTROL
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["etag"] == asset.etag
+    assert not response.headers["etag"].startswith("W/")
+
+
+@pytest.mark.parametrize("sent", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+def test_known_version_gets_a_304(client, sent):
+    asset = register_bytes("observatory.css", CSS)
+    headers = {"Accept-Encoding": "identity"}
+    headers["If-None-Match"] = sent.format(etag=asset.etag)
+
+    response = client.get(asset.url, headers=headers)
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == asset.etag
+
+
+def test_other_version_is_sent_in_full(client):
+    asset = register_bytes("observatory.css", CSS)
+
+    response = client.get(
+        asset.url, headers={"If-None-Match": '"stale"', "Accept-Encoding": "identity"}
+    )
+    assert response.status_code == 200
+    assert response.content == CSS
+
+
+@pytest.mark.parametrize(
+    "accept, coding",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0, gzip;q=0.5", "gzip"),
+        ("identity", None),
+    ],
+)
+def test_encoding_follows_accept_encoding(client, accept, coding):
+    if coding == "br":
+        pytest.importorskip("brotli")
+    asset = register_bytes("observatory.css", CSS, compress=True)
+
+    response = client.get(asset.url, headers={"Accept-Encoding": accept})
+
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers.get("content-encoding") == coding
+    # The test client decodes the body again
+    assert response.content == CSS
+    if coding is None:
+        assert response.headers["etag"] == asset.etag
+    else:
+        # Each encoding is tagged apart, so caches never mix them up
+        assert response.headers["etag"] == f'{asset.etag[:-1]}-{coding}"'
+        assert int(response.headers["content-length"]) < len(CSS)
+
+
+def test_uncompressed_asset_doesnt_vary(client):
+    asset = register_bytes("logo.svg", b"<svg/>")
+
+    response = client.get(asset.url, headers={"Accept-Encoding": "gzip, br"})
+
+    assert "vary" not in response.headers
+    assert "content-encoding" not in response.headers
+
+
+def test_error_pages_are_never_304(client):
+    page = build_asset("limited.html", b"<p>Come back tomorrow</p>")
+
+    response = client.get("/limited", headers={"If-None-Match": page.etag})
+
+    assert response.status_code == 429
+    assert response.content == b"<p>Come back tomorrow</p>"
+    assert response.headers["cache-control"] == "no-cache"
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+import utils.clients as clients
+
+
+class FakeClient:
+    def __init__(self, client_id, path, created):
+        self.id = client_id
+        self.page = SimpleNamespace(path=path)
+        self.created = created
+        self.shared = False
+        self.has_socket_connection = True
+        self.scripts = []
+        self.deleted = False
+
+    def run_javascript(self, code):
+        self.scripts.append(code)
+
+    def delete(self):
+        self.deleted = True
+        del clients.Client.instances[self.id]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"time": 1000.0}
+    monkeypatch.setattr(clients, "time", SimpleNamespace(time=lambda: now["time"]))
+    monkeypatch.setattr(clients.Client, "instances", {})
+    monkeypatch.setattr(clients, "_last_activity", {})
+    monkeypatch.setattr(clients, "_evicting", {})
+    return now
+
+
+def add_client(client_id, path, now):
+    client = FakeClient(client_id, path, now["time"])
+    clients.Client.instances[client_id] = client
+    return client
+
+
+def test_idle_observatory_clients_are_reloaded_then_deleted(clock):
+    observatory = add_client("a", "/observatory", clock)
+    clients._touch("a")
+
+    clock["time"] += clients.IDLE_TIMEOUT + 1
+    clients.sweep_idle_clients()
+    assert observatory.scripts == ["window.location.reload()"]
+    assert not observatory.deleted
+
+    clock["time"] += clients.EVICTION_GRACE + 1
+    clients.sweep_idle_clients()
+    assert observatory.deleted
+    assert clients._last_activity == {} and clients._evicting == {}
+
+
+def test_activity_cancels_the_eviction(clock):
+    observatory = add_client("a", "/observatory", clock)
+    clients._touch("a")
+    clock["time"] += clients.IDLE_TIMEOUT + 1
+    clients.sweep_idle_clients()
+
+    clients._touch("a")
+    clock["time"] += clients.EVICTION_GRACE + 1
+    clients.sweep_idle_clients()
+    assert not observatory.deleted
+
+
+def test_pages_without_the_idle_script_are_left_alone(clock):
+    landing = add_client("b", "/", clock)
+
+    clock["time"] += clients.IDLE_TIMEOUT + clients.EVICTION_GRACE + 1
+    clients.sweep_idle_clients()
+    clients.sweep_idle_clients()
+
+    assert landing.scripts == [] and not landing.deleted
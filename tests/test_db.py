@@ -0,0 +1,136 @@
+import asyncio
+import threading
+
+import pytest
+from pydantic import ValidationError
+from tinydb import Query
+
+from models.muse import Oracle
+
+PROJECT = {
+    "project_name": "Kelp Commons",
+    "organization": "Reef Trust",
+    "geographic_level": "local",
+    "link_to_organization": "https://example.org/reef-trust",
+}
+
+
+def contents(database, *table_names):
+    db = database.get_db()
+    return {name: [dict(doc) for doc in db.table(name).all()] for name in table_names}
+
+
+def test_insert_many_commits_every_table(app_db):
+    doc_ids = app_db.insert_many(
+        [("inspirations", {"n": 1}), ("projects", {"n": 2}), ("inspirations", {"n": 3})]
+    )
+
+    assert doc_ids == [1, 1, 2]
+    assert contents(app_db, "inspirations", "projects") == {
+        "inspirations": [{"n": 1}, {"n": 3}],
+        "projects": [{"n": 2}],
+    }
+
+
+@pytest.mark.parametrize("bad", ["not a document", {"n": object()}])
+def test_insert_many_is_all_or_nothing(app_db, bad):
+    app_db.insert_many([("inspirations", {"n": 0})])
+
+    with pytest.raises((TypeError, ValueError)):
+        app_db.insert_many([("inspirations", {"n": 1}), ("projects", bad)])
+
+    assert contents(app_db, "inspirations", "projects") == {
+        "inspirations": [{"n": 0}],
+        "projects": [],
+    }
+
+
+def test_increments_create_then_add(app_db):
+    for tokens in (10, 5):
+        app_db.insert_many(
+            [],
+            [("totals", "date", "2025-01-01", {"calls": 1, "by": {"a": tokens}})],
+        )
+
+    assert contents(app_db, "totals") == {
+        "totals": [{"date": "2025-01-01", "calls": 2, "by": {"a": 15}}]
+    }
+
+
+def test_unit_of_work_writes_nothing_when_the_block_fails(app_db):
+    with pytest.raises(RuntimeError):
+        with app_db.unit_of_work() as work:
+            work.insert("inspirations", {"n": 1})
+            raise RuntimeError("interrupted")
+
+    with app_db.unit_of_work() as work:
+        work.insert("inspirations", {"n": 2})
+        work.insert("projects", {"n": 3})
+
+    assert contents(app_db, "inspirations", "projects") == {
+        "inspirations": [{"n": 2}],
+        "projects": [{"n": 3}],
+    }
+
+
+def test_save_inspiration_links_projects(app_db):
+    oracle = Oracle()
+    oracle.save_inspiration("Kelp forests in the harbour", [PROJECT, PROJECT])
+
+    db = app_db.get_db()
+    (inspiration,) = db.table("inspirations").all()
+    projects = db.table("projects").search(Query().sk_inspiration == inspiration["id"])
+    assert inspiration["user_inspiration"] == "Kelp forests in the harbour"
+    assert [project["project_name"] for project in projects] == ["Kelp Commons"] * 2
+
+
+def test_invalid_project_saves_nothing(app_db):
+    oracle = Oracle()
+    with pytest.raises(ValidationError):
+        oracle.save_inspiration("Kelp", [PROJECT, {"project_name": "Incomplete"}])
+
+    assert contents(app_db, "inspirations", "projects") == {
+        "inspirations": [],
+        "projects": [],
+    }
+
+
+def test_async_writes_run_in_order_on_the_writer_thread(app_db, monkeypatch):
+    threads = []
+    insert_with_logging = app_db.insert_with_logging
+
+    def recording_insert(table_name, data):
+        threads.append(threading.current_thread().name)
+        return insert_with_logging(table_name, data)
+
+    monkeypatch.setattr(app_db, "insert_with_logging", recording_insert)
+
+    async def share():
+        doc_ids = await asyncio.gather(
+            *(app_db.ainsert("inspirations", {"n": n}) for n in range(20))
+        )
+        found = await app_db.aget("inspirations", Query().n == 7)
+        matches = await app_db.asearch("inspirations", Query().n >= 18)
+        return doc_ids, found, matches
+
+    doc_ids, found, matches = asyncio.run(share())
+
+    # One writer: IDs follow the order the writes were submitted in
+    assert doc_ids == list(range(1, 21))
+    assert {name.split("_")[0] for name in threads} == {"db-writer"}
+    assert found == {"n": 7}
+    assert [doc["n"] for doc in matches] == [18, 19]
+
+
+def test_unit_of_work_acommit(app_db):
+    work = app_db.UnitOfWork()
+    work.insert("inspirations", {"n": 1})
+    work.increment("totals", "date", "2025-01-01", {"calls": 1})
+
+    assert asyncio.run(work.acommit()) == [1]
+    # Staged records are handed over, so a second commit writes nothing
+    assert asyncio.run(work.acommit()) == []
+    assert contents(app_db, "inspirations", "totals") == {
+        "inspirations": [{"n": 1}],
+        "totals": [{"date": "2025-01-01", "calls": 1}],
+    }
@@ -0,0 +1,106 @@
+from tinydb import Query
+
+from db.index import FieldIndex, TableIndexes
+
+Doc = Query()
+
+
+def build(docs, fields=("date", "muse")):
+    indexes = TableIndexes(fields)
+    for doc_id, doc in docs.items():
+        indexes.add(doc_id, doc)
+    return indexes
+
+
+DOCS = {
+    "1": {"date": "2025-01-01", "muse": "lunes"},
+    "2": {"date": "2025-01-02", "muse": "martes"},
+    "3": {"date": "2025-02-01", "muse": "lunes"},
+    "4": {"muse": "jueves"},
+    "5": {"date": ["not", "a", "scalar"], "muse": "viernes"},
+}
+
+
+def test_equality_uses_the_index():
+    indexes = build(DOCS)
+    # Unindexable values stay candidates of every lookup
+    assert indexes.plan(Doc.date == "2025-01-02") == {"2", "5"}
+    assert indexes.plan(Doc.muse == "lunes") == {"1", "3"}
+    assert indexes.plan(Doc.muse == "domingo") == set()
+
+
+def test_one_of_and_fragment():
+    indexes = build(DOCS)
+    assert indexes.plan(Doc.muse.one_of(["martes", "jueves"])) == {"2", "4"}
+    fragment = Doc.fragment({"muse": "lunes", "date": "2025-02-01"})
+    assert indexes.plan(fragment) == {"3"}
+
+
+def test_ranges():
+    indexes = build(DOCS)
+    assert indexes.plan(Doc.date < "2025-01-02") == {"1", "5"}
+    assert indexes.plan(Doc.date <= "2025-01-02") == {"1", "2", "5"}
+    assert indexes.plan(Doc.date > "2025-01-02") == {"3", "5"}
+    assert indexes.plan(Doc.date >= "2025-02-01") == {"3", "5"}
+
+
+def test_and_or_combine_candidates():
+    indexes = build(DOCS)
+    assert indexes.plan((Doc.muse == "lunes") & (Doc.date >= "2025-02")) == {"3"}
+    assert indexes.plan((Doc.muse == "lunes") | (Doc.muse == "martes")) == {
+        "1",
+        "2",
+        "3",
+    }
+    # One side without an index narrows nothing, the other still does
+    assert indexes.plan((Doc.muse == "lunes") & (Doc.text == "x")) == {"1", "3"}
+
+
+def test_queries_that_need_a_scan():
+    indexes = build(DOCS)
+    assert indexes.plan(Doc.text == "x") is None
+    assert indexes.plan((Doc.muse == "lunes") | (Doc.text == "x")) is None
+    assert indexes.plan(Doc.muse.search("lu")) is None
+    assert indexes.plan(Doc.nested.muse == "lunes") is None
+    assert indexes.plan(lambda doc: True) is None
+
+
+def test_index_follows_removals():
+    index = FieldIndex("n")
+    index.add("1", {"n": 1})
+    index.add("2", {"n": 2})
+    index.add("3", {"n": 2})
+    index.remove("2", {"n": 2})
+    index.remove("1", {"n": 1})
+
+    assert index.equal(2) == {"3"}
+    assert index.equal(1) == set()
+    assert index.range(">=", 0) == {"3"}
+    # Booleans are not ordered with numbers
+    assert index.range(">", True) is None
+
+
+def test_indexed_search_matches_a_scan(open_db):
+    db = open_db(indexes={"facts": ["date", "muse"]})
+    table = db.table("facts")
+    table.insert_multiple(
+        {"date": f"2025-01-{day:02d}", "muse": ["lunes", "martes"][day % 2]}
+        for day in range(1, 29)
+    )
+    table.update({"muse": "domingo"}, Doc.date == "2025-01-05")
+    table.update({"date": "2025-03-01"}, doc_ids=[6])
+    table.remove(Doc.date < "2025-01-03")
+
+    queries = [
+        Doc.muse == "lunes",
+        Doc.muse == "domingo",
+        Doc.date >= "2025-01-20",
+        (Doc.muse == "martes") & (Doc.date < "2025-01-10"),
+        Doc.muse.one_of(["domingo", "martes"]) | (Doc.date == "2025-03-01"),
+    ]
+    docs = table.all()
+    for query in queries:
+        assert table.search(query) == [doc for doc in docs if query(doc)]
+    reopened = open_db(indexes={"facts": ["date", "muse"]}).table("facts")
+    for query in queries:
+        assert reopened.search(query) == [doc for doc in docs if query(doc)]
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from utils.json_stream import ArrayItemStream
+
+KELP = {
+    "project_name": "Kelp Commons",
+    "organization": "Reef Trust",
+    "geographic_level": "local",
+    "link_to_organization": "https://example.org/reef-trust",
+}
+REEF = {
+    "project_name": "Reef {Restoration} [Phase 2]",
+    "organization": 'The "Coral" Society \\ Friends',
+    "geographic_level": "regional",
+    "link_to_organization": "https://example.org/coral",
+}
+ANSWER = json.dumps({"projects": [KELP, REEF]}, indent=2)
+
+
+def stream(chunks):
+    """Feed the chunks in turn; the items completed by each of them."""
+    parser = ArrayItemStream()
+    return [parser.feed(chunk) for chunk in chunks]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(ANSWER)])
+def test_items_come_out_whatever_the_chunk_size(size):
+    chunks = [ANSWER[i : i + size] for i in range(0, len(ANSWER), size)]
+
+    fed = stream(chunks)
+
+    assert [item for items in fed for item in items] == [KELP, REEF]
+
+
+def test_item_comes_out_with_the_chunk_that_closes_it():
+    first_end = ANSWER.index("}") + 1
+
+    fed = stream([ANSWER[: first_end - 1], ANSWER[first_end - 1 :]])
+
+    assert fed == [[], [KELP, REEF]]
+    assert stream([ANSWER[:first_end], ANSWER[first_end:]]) == [[KELP], [REEF]]
+
+
+def test_quotes_and_brackets_inside_strings_are_text():
+    # An escaped backslash right before a closing quote, then a closing brace
+    note = {"note": 'C:\\ "}]{[', "path": "C:\\"}
+    tricky = json.dumps({"projects": [REEF, note]})
+
+    fed = stream(list(tricky))
+
+    assert [item for items in fed for item in items] == [REEF, note]
+    # Each item is complete only at its own closing brace
+    assert fed[tricky.index("}, {")] == [REEF]
+
+
+def test_markdown_fence_is_skipped():
+    fenced = f"```json\n{ANSWER}\n```"
+
+    fed = stream([fenced[:5], fenced[5:40], fenced[40:]])
+
+    assert [item for items in fed for item in items] == [KELP, REEF]
+
+
+def test_truncated_last_item_is_held_back():
+    # The stream broke off in the middle of the second project's link
+    cut = ANSWER[: ANSWER.index("example.org/coral")]
+
+    assert stream([cut]) == [[KELP]]
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        json.dumps({"project": KELP}),
+        json.dumps([KELP, REEF]),
+        json.dumps({"projects": ["Kelp Commons", 3, None]}),
+        "No projects today.",
+    ],
+)
+def test_payload_without_an_array_of_objects_gives_nothing(payload):
+    assert stream([payload]) == [[]]
@@ -0,0 +1,129 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+
+from db.migrate import _JSONStream, _members, migrate_to_sqlite
+from db.sqlite import SQLiteDB
+
+INDEXES = {"facts": ["date"]}
+
+
+def contents(db):
+    return {
+        name: {doc.doc_id: dict(doc) for doc in db.table(name).all()}
+        for name in db.tables()
+    }
+
+
+@pytest.fixture
+def sqlite_file(tmp_path):
+    return tmp_path / "muse_observatory.sqlite3"
+
+
+def migrated(sqlite_file):
+    db = SQLiteDB(sqlite_file, indexes=INDEXES)
+    try:
+        return contents(db)
+    finally:
+        db.close()
+
+
+def test_migration_keeps_documents_and_ids(open_db, db_file, sqlite_file):
+    db = open_db(compact_bytes=1 << 30)
+    facts = db.table("facts")
+    facts.insert_multiple({"date": f"2025-01-{day:02d}", "n": day} for day in (1, 2, 3))
+    db.table("empty").insert({"n": 0})
+    db.table("empty").truncate()
+    db.storage.compact()
+
+    # Changes after the compaction are only in the write-ahead log
+    facts.remove(doc_ids=[2])
+    facts.update({"n": 30}, doc_ids=[3])
+    facts.insert({"date": "2025-01-04", "n": 4})
+    db.table("gone").insert({"n": 1})
+    db.drop_table("gone")
+
+    counts = migrate_to_sqlite(db_file, sqlite_file, indexes=INDEXES)
+
+    assert counts == {"empty": 0, "facts": 3}
+    assert migrated(sqlite_file) == contents(db)
+    assert sorted(migrated(sqlite_file)["facts"]) == [1, 3, 4]
+
+
+def test_migration_replays_an_interrupted_compaction(open_db, db_file, sqlite_file):
+    db = open_db(compact_bytes=1 << 30)
+    facts = db.table("facts")
+    facts.insert_multiple({"n": n} for n in range(3))
+    # A compaction that stopped after setting the old log aside
+    wal = db_file.with_name(db_file.name + ".wal")
+    os.replace(wal, db_file.with_name(db_file.name + ".wal.compacting"))
+    facts.remove(doc_ids=[1])
+    facts.insert({"n": 3})
+    # A write cut off halfway
+    with open(wal, "a", encoding="utf-8") as f:
+        f.write('[["put", "facts", "9", {"n"')
+
+    migrate_to_sqlite(db_file, sqlite_file)
+
+    assert migrated(sqlite_file) == {"facts": {2: {"n": 1}, 3: {"n": 2}, 4: {"n": 3}}}
+
+
+def test_ids_of_deleted_documents_stay_taken(open_db, db_file, sqlite_file):
+    db = open_db()
+    db.table("facts").insert_multiple([{"n": 1}, {"n": 2}])
+    db.table("facts").remove(doc_ids=[2])
+    db.close()
+
+    migrate_to_sqlite(db_file, sqlite_file)
+
+    migrated_db = SQLiteDB(sqlite_file)
+    assert migrated_db.table("facts").insert({"n": 3}) == 3
+    migrated_db.close()
+
+
+def test_single_file_database_is_migrated(db_file, sqlite_file):
+    db_file.write_text(
+        json.dumps({"facts": {"1": {"n": 1}, "7": {"n": 7}}, "projects": {}})
+    )
+
+    assert migrate_to_sqlite(db_file, sqlite_file) == {"facts": 2}
+    assert migrated(sqlite_file) == {"facts": {1: {"n": 1}, 7: {"n": 7}}}
+
+
+def test_existing_database_is_not_migrated_twice(open_db, db_file, sqlite_file):
+    open_db().table("facts").insert({"n": 1})
+    migrate_to_sqlite(db_file, sqlite_file)
+
+    with pytest.raises(FileExistsError):
+        migrate_to_sqlite(db_file, sqlite_file)
+    assert not list(sqlite_file.parent.glob("*.migrating*"))
+
+
+def test_snapshot_is_streamed_across_chunks():
+    data = {"facts": {"1": {"text": 'a "quoted" fact', "n": 12345}, "2": [1.5, None]}}
+    stream = _JSONStream(io.StringIO(json.dumps(data)), chunk_size=3)
+
+    rows = [
+        (name, doc_id, stream.value())
+        for name in _members(stream)
+        for doc_id in _members(stream)
+    ]
+    assert rows == [("facts", "1", data["facts"]["1"]), ("facts", "2", [1.5, None])]
+
+
+@pytest.mark.parametrize("app_db", ["tinydb"], indirect=True)
+def test_migrate_sqlite_command(app_db, monkeypatch):
+    from db import manage
+
+    app_db.insert_many([("inspirations", {"n": 1}), ("projects", {"n": 2})])
+
+    monkeypatch.setattr(sys, "argv", ["db.manage", "migrate-sqlite"])
+    manage.main()
+
+    db = SQLiteDB(app_db.SQLITE_FILE)
+    assert db.table("inspirations").all() == [{"n": 1}]
+    assert db.table("projects").all() == [{"n": 2}]
+    db.close()
@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import pytest
+
+import models.muse as muse
+from models.muse import FALLBACK_FACT, Oracle
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+
+FACT = {
+    "date": TODAY,
+    "muse": "lunes",
+    "social_cause": "oceans",
+    "fun_fact": "Kelp can grow half a metre a day.",
+    "question_asked": "What could grow that fast in your city?",
+    "fact_check_link": "https://example.org/kelp",
+}
+
+
+@pytest.fixture
+def archives(monkeypatch):
+    """Stand in for the ``daily_facts`` lookup, counting reads."""
+    state = {"reads": 0, "fact": FACT, "error": None}
+
+    def get_with_logging(table_name, query):
+        state["reads"] += 1
+        if state["error"]:
+            raise state["error"]
+        return state["fact"]
+
+    monkeypatch.setattr(muse, "get_with_logging", get_with_logging)
+    monkeypatch.setattr(Oracle, "_today", None)
+    monkeypatch.setattr(Oracle, "_today_date", None)
+    monkeypatch.setattr(Oracle, "_today_stale", False)
+    # No change watcher: tests mark the Oracle stale themselves
+    monkeypatch.setattr(Oracle, "_watching", True)
+    return state
+
+
+def test_today_is_shared_until_the_facts_change(archives):
+    first = Oracle.today()
+    assert Oracle.today() is first
+    assert archives["reads"] == 1
+    assert first.muse_name == "Lunes"
+
+    Oracle._facts_changed()
+    assert Oracle.today() is not first
+    assert archives["reads"] == 2
+
+
+def test_today_is_rebuilt_when_the_date_rolls_over(archives, monkeypatch):
+    first = Oracle.today()
+    monkeypatch.setattr(Oracle, "_today_date", "2000-01-01")
+
+    assert Oracle.today() is not first
+    assert Oracle._today_date == TODAY
+
+
+def test_oracle_is_read_only(archives):
+    with pytest.raises(AttributeError):
+        Oracle.today().muse_name = "Ares"
+
+
+def test_database_error_is_not_kept_for_the_day(archives):
+    archives["error"] = OSError("disk unavailable")
+    fallback = Oracle.today()
+    assert not fallback.answered
+    assert fallback.fun_fact == FALLBACK_FACT["fun_fact"]
+
+    # Every call retries until the archives answer
+    Oracle.today()
+    assert archives["reads"] == 2
+    archives["error"] = None
+    recovered = Oracle.today()
+    assert recovered.answered
+    assert recovered.fun_fact == FACT["fun_fact"]
+    assert Oracle.today() is recovered
+    assert archives["reads"] == 3
+
+
+def test_missing_fact_waits_for_a_change(archives):
+    archives["fact"] = None
+    oracle = Oracle.today()
+
+    # The scheduler storing the fact marks the Oracle stale
+    assert oracle.answered
+    assert oracle.fun_fact == FALLBACK_FACT["fun_fact"]
+    assert Oracle.today() is oracle
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from utils.openai_scheduler import OpenAIScheduler, SchedulerBusy
+
+
+async def until(condition):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), 5)
+
+
+async def hold_slot(scheduler, release):
+    # A call from elsewhere keeps the only slot busy
+    task = asyncio.ensure_future(scheduler.run("192.0.2.1", release.wait))
+    await until(lambda: scheduler.stats()["running"])
+    return task
+
+
+def test_free_slots_go_to_each_address_in_turn():
+    async def calls():
+        scheduler = OpenAIScheduler(concurrency=1, per_client=2, max_wait=60)
+        release = asyncio.Event()
+        busy = await hold_slot(scheduler, release)
+        served, positions = [], {}
+
+        def call(client_key, name):
+            async def func():
+                served.append(name)
+
+            def listener(ahead, wait):
+                positions.setdefault(name, []).append(ahead)
+
+            return asyncio.ensure_future(scheduler.run(client_key, func, listener))
+
+        waiting = [
+            call("198.51.100.1", "first"),
+            call("198.51.100.1", "second"),
+            call("203.0.113.7", "other"),
+        ]
+        await until(lambda: scheduler.queued == 3)
+        release.set()
+        await asyncio.gather(busy, *waiting)
+        return served, positions, scheduler.stats()
+
+    served, positions, stats = asyncio.run(calls())
+
+    # One busy address doesn't keep the other waiting behind all its calls
+    assert served == ["first", "other", "second"]
+    assert positions["other"][-1] == 0
+    assert positions["second"][-1] == 0
+    assert stats["running"] == 0 and stats["queued"] == 0
+
+
+def test_each_address_queues_a_limited_number_of_calls():
+    async def calls():
+        scheduler = OpenAIScheduler(concurrency=1, per_client=1, max_wait=60)
+        release = asyncio.Event()
+        busy = await hold_slot(scheduler, release)
+        waiting = asyncio.ensure_future(scheduler.run("198.51.100.1", release.wait))
+        await until(lambda: scheduler.queued == 1)
+
+        with pytest.raises(SchedulerBusy):
+            await scheduler.run("198.51.100.1", release.wait)
+        other = asyncio.ensure_future(scheduler.run("203.0.113.7", release.wait))
+        await until(lambda: scheduler.queued == 2)
+        release.set()
+        await asyncio.gather(busy, waiting, other)
+        return scheduler.stats()
+
+    assert asyncio.run(calls())["rejected"] == 1
+
+
+def test_calls_expected_to_wait_too_long_are_turned_away():
+    async def calls():
+        scheduler = OpenAIScheduler(concurrency=1, max_wait=5)
+        release = asyncio.Event()
+        release.set()
+        first = await scheduler.run("198.51.100.1", release.wait)
+
+        release.clear()
+        busy = await hold_slot(scheduler, release)
+        # Recent calls took 10 seconds, twice the longest wait allowed
+        scheduler._durations.extend([10.0] * 10)
+        with pytest.raises(SchedulerBusy):
+            await scheduler.run("203.0.113.7", release.wait)
+        release.set()
+        await busy
+        return first, scheduler.stats()
+
+    first, stats = asyncio.run(calls())
+
+    # Nothing was waiting then, so the first call got through
+    assert first is True
+    assert stats["rejected"] == 1 and stats["queued"] == 0
+
+
+def test_waiting_call_that_times_out_leaves_the_line():
+    async def calls():
+        scheduler = OpenAIScheduler(concurrency=1, max_wait=0.2)
+        scheduler._durations.append(0.01)
+        release = asyncio.Event()
+        busy = await hold_slot(scheduler, release)
+
+        with pytest.raises(SchedulerBusy):
+            await scheduler.run("198.51.100.1", release.wait)
+        stats = scheduler.stats()
+        release.set()
+        await busy
+        return stats
+
+    stats = asyncio.run(calls())
+
+    assert stats["rejected"] == 1
+    assert stats["queued"] == 0 and stats["queued_per_client"] == {}
+
+
+def test_cancelled_call_hands_its_turn_on():
+    async def calls():
+        scheduler = OpenAIScheduler(concurrency=1, max_wait=60)
+        release = asyncio.Event()
+        busy = await hold_slot(scheduler, release)
+        served = []
+
+        async def func():
+            served.append("next")
+
+        gone = asyncio.ensure_future(scheduler.run("198.51.100.1", release.wait))
+        after = asyncio.ensure_future(scheduler.run("203.0.113.7", func))
+        await until(lambda: scheduler.queued == 2)
+        # The visitor closed the page
+        gone.cancel()
+        await until(lambda: scheduler.queued == 1)
+        release.set()
+        await asyncio.gather(busy, after)
+        return gone, served, scheduler.stats()
+
+    gone, served, stats = asyncio.run(calls())
+
+    assert gone.cancelled()
+    assert served == ["next"]
+    assert stats["running"] == 0 and stats["rejected"] == 0
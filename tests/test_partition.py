@@ -0,0 +1,220 @@
+import json
+import sys
+from datetime import date
+
+from tinydb import Query
+
+from db.partition import UNDATED, partition_of, plan_partitions
+
+Doc = Query()
+
+MONTHS = ["2024-11", "2024-12", "2025-01", "2025-02", UNDATED]
+
+PARTITIONS = {"projects": "created_at"}
+
+
+def months_ago(count):
+    months = date.today().year * 12 + date.today().month - 1 - count
+    return f"{months // 12:04d}-{months % 12 + 1:02d}"
+
+
+def test_partition_of():
+    assert partition_of("2025-01-31") == "2025-01"
+    assert partition_of("2025-01-31T23:59:59.123456") == "2025-01"
+    assert partition_of("soon") == UNDATED
+    assert partition_of(None) == UNDATED
+    assert partition_of(20250131) == UNDATED
+
+
+def test_equality_and_fragment_pick_one_month():
+    assert plan_partitions(Doc.date == "2025-01-05", "date", MONTHS) == {"2025-01"}
+    assert plan_partitions(Doc.fragment({"date": "2024-12-01"}), "date", MONTHS) == {
+        "2024-12"
+    }
+    assert plan_partitions(
+        Doc.date.one_of(["2024-11-02", "2025-02-03"]), "date", MONTHS
+    ) == {"2024-11", "2025-02"}
+
+
+def test_ranges_keep_overlapping_months_and_undated():
+    assert plan_partitions(Doc.date >= "2025-01-15", "date", MONTHS) == {
+        "2025-01",
+        "2025-02",
+        UNDATED,
+    }
+    assert plan_partitions(Doc.date < "2024-12-01", "date", MONTHS) == {
+        "2024-11",
+        "2024-12",
+        UNDATED,
+    }
+    both = (Doc.date >= "2024-12-01") & (Doc.date < "2025-01-31")
+    assert plan_partitions(both, "date", MONTHS) == {"2024-12", "2025-01", UNDATED}
+
+
+def test_queries_that_read_every_month():
+    assert plan_partitions(Doc.muse == "lunes", "date", MONTHS) is None
+    assert plan_partitions(Doc.date < "later", "date", MONTHS) is None
+    either = (Doc.date == "2025-01-01") | (Doc.muse == "lunes")
+    assert plan_partitions(either, "date", MONTHS) is None
+    # Filters on other fields don't widen the months of an and
+    narrowed = (Doc.date == "2025-01-01") & (Doc.muse == "lunes")
+    assert plan_partitions(narrowed, "date", MONTHS) == {"2025-01"}
+
+
+def test_tables_are_split_by_month(open_db, db_file):
+    db = open_db(partitions=PARTITIONS)
+    table = db.table("projects")
+    table.insert_multiple(
+        [
+            {"created_at": "2025-01-03T10:00:00", "name": "a"},
+            {"created_at": "2025-02-01T10:00:00", "name": "b"},
+            {"created_at": None, "name": "c"},
+        ]
+    )
+    # Moving a document to another month empties its old file
+    table.update({"created_at": "2025-02-09T10:00:00"}, doc_ids=[1])
+    db.close()
+
+    data_dir = db_file.with_suffix("")
+    assert sorted(path.name for path in (data_dir / "projects").iterdir()) == [
+        "2025-02.json",
+        f"{UNDATED}.json",
+    ]
+    manifest = json.loads((data_dir / "manifest.json").read_text())
+    assert manifest["tables"]["projects"] == {
+        "last_id": 3,
+        "partitions": {"2025-02": 2, UNDATED: 1},
+    }
+
+
+def test_queries_only_read_the_months_they_need(open_db):
+    db = open_db(partitions=PARTITIONS)
+    db.table("projects").insert_multiple(
+        {"created_at": f"2025-{month:02d}-01", "n": month} for month in range(1, 7)
+    )
+    db.close()
+
+    reopened = open_db(partitions=PARTITIONS)
+    table = reopened.table("projects")
+    assert len(table) == 6
+    assert [doc["n"] for doc in table.search(Doc.created_at >= "2025-05-01")] == [
+        5,
+        6,
+    ]
+    loaded = {
+        part
+        for part, doc_ids in reopened.storage._parts["projects"].items()
+        if doc_ids is not None
+    }
+    assert loaded == {"2025-05", "2025-06"}
+
+
+def test_archive_moves_old_months_to_cold_storage(open_db, db_file):
+    db = open_db(partitions=PARTITIONS)
+    table = db.table("projects")
+    table.insert_multiple(
+        [
+            {"created_at": "2024-12-24", "n": 1},
+            {"created_at": "2025-01-02", "n": 2},
+            {"created_at": "2025-03-04", "n": 3},
+            {"created_at": None, "n": 4},
+        ]
+    )
+
+    assert db.storage.archive("2025-03") == [
+        ("projects", "2024-12"),
+        ("projects", "2025-01"),
+    ]
+    assert [doc["n"] for doc in table.all()] == [3, 4]
+    assert db.storage.archived_partitions("projects") == ["2024-12", "2025-01"]
+    assert db.storage.read_archive("projects", "2025-01") == {
+        "2": {"created_at": "2025-01-02", "n": 2}
+    }
+
+    # A late write to an archived month is merged into its archive
+    table.insert({"created_at": "2025-01-30", "n": 5})
+    db.storage.archive("2025-03")
+    assert sorted(db.storage.read_archive("projects", "2025-01")) == ["2", "5"]
+    db.close()
+
+    reopened = open_db(partitions=PARTITIONS).table("projects")
+    assert len(reopened) == 2
+    assert [doc["n"] for doc in reopened.all()] == [3, 4]
+
+
+def test_archive_command_keeps_recent_months(app_db, monkeypatch):
+    from db import manage
+
+    old, kept, current = months_ago(7), months_ago(6), months_ago(0)
+    app_db.insert_many(
+        [
+            ("projects", {"created_at": f"{old}-28T12:00:00", "n": 1}),
+            ("projects", {"created_at": f"{kept}-01T00:00:00", "n": 2}),
+            ("projects", {"created_at": f"{current}-01T00:00:00", "n": 3}),
+            ("projects", {"created_at": None, "n": 4}),
+            ("inspirations", {"date": f"{old}-01", "n": 5}),
+            ("daily_facts", {"date": f"{old}-01", "n": 6}),
+        ]
+    )
+
+    monkeypatch.setattr(sys, "argv", ["db.manage", "archive", "--keep-months", "6"])
+    manage.main()
+
+    db = app_db.get_db()
+    assert [doc["n"] for doc in db.table("projects").all()] == [2, 3, 4]
+    assert db.table("inspirations").all() == []
+    # Tables without partitions are never archived
+    assert len(db.table("daily_facts")) == 1
+    storage = db.storage
+    assert storage.archived_partitions("projects") == [old]
+    assert [doc["n"] for doc in storage.read_archive("projects", old).values()] == [1]
+    assert [doc["n"] for doc in storage.read_archive("inspirations", old).values()] == [
+        5
+    ]
+
+
+def loaded_months(db, name="projects"):
+    return {
+        part for part, doc_ids in db.storage._parts[name].items() if doc_ids is not None
+    }
+
+
+def test_writes_only_read_the_months_they_touch(open_db):
+    db = open_db(partitions=PARTITIONS)
+    db.table("projects").insert_multiple(
+        {"created_at": f"2025-{month:02d}-01", "n": month} for month in range(1, 7)
+    )
+    db.close()
+
+    reopened = open_db(partitions=PARTITIONS)
+    table = reopened.table("projects")
+    table.insert({"created_at": "2025-07-01", "n": 7})
+    assert loaded_months(reopened) == {"2025-07"}
+
+    assert table.update({"n": 20}, Doc.created_at == "2025-02-01") == [2]
+    table.upsert({"created_at": "2025-03-01", "n": 30}, Doc.created_at == "2025-03-01")
+    assert table.remove(Doc.created_at >= "2025-06-01") == [6, 7]
+    assert loaded_months(reopened) == {"2025-02", "2025-03", "2025-06", "2025-07"}
+    reopened.close()
+
+    assert [doc["n"] for doc in open_db(partitions=PARTITIONS).table("projects")] == [
+        1,
+        20,
+        30,
+        4,
+        5,
+    ]
+
+
+def test_truncate_reads_no_month(open_db):
+    db = open_db(partitions=PARTITIONS)
+    db.table("projects").insert_multiple(
+        {"created_at": f"2025-{month:02d}-01"} for month in range(1, 4)
+    )
+    db.close()
+
+    reopened = open_db(partitions=PARTITIONS)
+    reopened.table("projects").truncate()
+    assert loaded_months(reopened) == set()
+    reopened.close()
+    assert open_db(partitions=PARTITIONS).table("projects").all() == []
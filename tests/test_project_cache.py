@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import pytest
+
+import utils.project_cache as project_cache
+from utils.project_cache import ProjectCache
+
+INPUT = "Kelp forests in the harbour need protecting"
+ANSWER = {"projects": [{"project_name": "Kelp Commons"}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"time": 1000.0}
+    monkeypatch.setattr(
+        project_cache, "time", SimpleNamespace(time=lambda: now["time"])
+    )
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ProjectCache(tmp_path / "project_cache.json", ttl=3600, max_entries=2)
+
+
+def test_answer_expires_after_the_ttl(cache, clock):
+    cache.put("Lunes", "What grows?", INPUT, ANSWER)
+
+    clock["time"] += 3599
+    assert cache.get("Lunes", "What grows?", INPUT) == ANSWER
+    clock["time"] += 1
+    assert cache.get("Lunes", "What grows?", INPUT) is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "near_hits": 0, "misses": 1}
+
+
+def test_least_recently_used_goes_first(cache):
+    cache.put("Lunes", "What grows?", "kelp", {"projects": ["kelp"]})
+    cache.put("Lunes", "What grows?", "reef", {"projects": ["reef"]})
+    # Reading kelp makes reef the least recently used
+    assert cache.get("Lunes", "What grows?", "kelp") == {"projects": ["kelp"]}
+
+    cache.put("Lunes", "What grows?", "tide", {"projects": ["tide"]})
+
+    assert cache.get("Lunes", "What grows?", "reef") is None
+    assert cache.get("Lunes", "What grows?", "kelp") == {"projects": ["kelp"]}
+    assert cache.get("Lunes", "What grows?", "tide") == {"projects": ["tide"]}
+    assert cache.stats()["entries"] == 2
+
+
+def test_same_words_are_the_same_input(cache):
+    cache.put("Lunes", "What grows?", INPUT, ANSWER)
+
+    assert cache.get("Lunes", "What grows?", f"  {INPUT.upper()}!") == ANSWER
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize(
+    "user_input, hit",
+    [
+        # Similarity 0.93
+        ("Kelp forests in the harbour need protecting now", True),
+        # Same words in another order, similarity 0.85
+        ("Kelp forests need protecting in the harbour", False),
+    ],
+)
+def test_near_duplicates_share_an_answer(cache, user_input, hit):
+    cache.similarity = 0.9
+    cache.put("Lunes", "What grows?", INPUT, ANSWER)
+
+    assert cache.get("Lunes", "What grows?", user_input) == (ANSWER if hit else None)
+    assert cache.stats()["near_hits"] == int(hit)
+
+
+@pytest.mark.parametrize(
+    "muse, question", [("Soleil", "What grows?"), ("Lunes", "What flows?")]
+)
+def test_other_muse_or_question_never_matches(cache, muse, question):
+    cache.put("Lunes", "What grows?", INPUT, ANSWER)
+
+    assert cache.get(muse, question, INPUT) is None
+
+
+def test_answers_survive_a_restart(cache, clock):
+    cache.put("Lunes", "What grows?", INPUT, ANSWER)
+    clock["time"] += 60
+
+    reopened = ProjectCache(cache.path, ttl=3600, max_entries=2)
+
+    assert reopened.get("Lunes", "What grows?", INPUT) == ANSWER
+    clock["time"] += 3600
+    assert ProjectCache(cache.path, ttl=3600).get("Lunes", "What grows?", INPUT) is None
@@ -0,0 +1,225 @@
+import asyncio
+import json
+
+import pytest
+
+import utils.generate_projects as generate_projects
+from models.muse import Oracle
+from models.schemas import ProjectModel
+from utils.generate_projects import get_project_response, unstreamed_projects
+from utils.openai_scheduler import OpenAIScheduler, SchedulerBusy
+from utils.project_cache import ProjectCache
+from utils.singleflight import SingleFlight
+
+
+def project(name):
+    return {
+        "project_name": name,
+        "organization": f"{name} Trust",
+        "geographic_level": "local",
+        "link_to_organization": f"https://example.org/{name.lower()}",
+    }
+
+
+KELP, REEF, TIDE = project("Kelp"), project("Reef"), project("Tide")
+
+INPUT = "Kelp forests in the harbour"
+
+
+def test_cached_answer_is_shown_in_full():
+    # Extra fields are dropped, as when projects are streamed
+    answer = {"projects": [dict(KELP, rank=1), REEF, TIDE]}
+
+    assert unstreamed_projects([], answer) == [KELP, REEF, TIDE]
+
+
+def test_streamed_projects_are_not_shown_twice():
+    assert (
+        unstreamed_projects([KELP, REEF, TIDE], {"projects": [KELP, REEF, TIDE]}) == []
+    )
+    # The stream ended before the last project was complete
+    assert unstreamed_projects([KELP], {"projects": [KELP, REEF, TIDE]}) == [
+        REEF,
+        TIDE,
+    ]
+
+
+def test_projects_are_matched_by_content_not_position():
+    # The malformed project was skipped while streaming
+    answer = {"projects": [KELP, {"project_name": "Broken"}, TIDE, TIDE]}
+
+    assert unstreamed_projects([KELP, TIDE], answer) == []
+    assert unstreamed_projects([], answer) == [KELP, TIDE]
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [
+        None,
+        {"projects": []},
+        # The quota post-check or the JSON parsing failed after streaming
+        {"error": "OpenAI daily token quota exceeded. Please try again tomorrow."},
+    ],
+)
+def test_rejected_answer_keeps_the_streamed_projects(answer):
+    streamed = [KELP, REEF]
+
+    assert unstreamed_projects(streamed, answer) == []
+    assert streamed == [KELP, REEF]
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    """
+    Stand in for OpenAI: each call streams the three projects, one for every
+    ``engine.pace.put_nowait(None)``.
+    """
+
+    async def no_usage():
+        return 0
+
+    async def within_quota(tokens_used):
+        return True
+
+    async def log_usage(**kwargs):
+        pass
+
+    async def stream_projects(prompt, on_project):
+        engine.calls += 1
+        for item in (KELP, REEF, TIDE):
+            await engine.pace.get()
+            on_project(ProjectModel(**item))
+        return json.dumps({"projects": [KELP, REEF, TIDE]}), 100
+
+    engine.calls = 0
+    engine.pace = asyncio.Queue()
+    monkeypatch.setattr(generate_projects, "get_current_token_usage", no_usage)
+    monkeypatch.setattr(
+        generate_projects, "check_and_increment_token_quota", within_quota
+    )
+    monkeypatch.setattr(generate_projects, "log_openai_usage", log_usage)
+    monkeypatch.setattr(generate_projects, "_stream_projects", stream_projects)
+    monkeypatch.setattr(
+        generate_projects, "project_cache", ProjectCache(tmp_path / "cache.json")
+    )
+    monkeypatch.setattr(generate_projects, "project_flights", SingleFlight("test"))
+    monkeypatch.setattr(
+        generate_projects,
+        "openai_scheduler",
+        OpenAIScheduler(concurrency=1, per_client=1, max_wait=60),
+    )
+    return engine
+
+
+def oracle():
+    oracle_day = Oracle.__new__(Oracle)
+    oracle_day.muse_name = "Lunes"
+    oracle_day.question_asked = "What grows in the dark?"
+    return oracle_day
+
+
+async def until(condition):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), 5)
+
+
+def in_flight():
+    key = ("Lunes", "What grows in the dark?", "kelp forests in the harbour")
+    return generate_projects.project_flights.in_flight(key)
+
+
+async def hold_slot(client_key, release):
+    # Another visitor's call keeps the only slot busy
+    task = asyncio.ensure_future(
+        generate_projects.openai_scheduler.run(client_key, release.wait)
+    )
+    await until(lambda: generate_projects.openai_scheduler.stats()["running"])
+    return task
+
+
+def test_joining_visitor_sees_the_shared_call(engine):
+    async def share():
+        release = asyncio.Event()
+        busy = await hold_slot("198.51.100.9", release)
+        first = {"updates": [], "projects": []}
+        second = {"updates": [], "projects": []}
+
+        def visitor(seen, client_key):
+            return get_project_response(
+                oracle(),
+                INPUT,
+                client_key,
+                lambda ahead, wait: seen["updates"].append(ahead),
+                lambda project: seen["projects"].append(project.model_dump()),
+            )
+
+        leader = asyncio.ensure_future(visitor(first, "198.51.100.1"))
+        await until(lambda: first["updates"])
+        release.set()
+        engine.pace.put_nowait(None)
+        await until(lambda: first["projects"])
+        # Another address, joining once the first project is out
+        follower = asyncio.ensure_future(visitor(second, "203.0.113.7"))
+        await until(lambda: second["projects"])
+        engine.pace.put_nowait(None)
+        engine.pace.put_nowait(None)
+        await busy
+        return first, second, await leader, await follower
+
+    first, second, led, joined = asyncio.run(share())
+
+    assert engine.calls == 1
+    assert led == joined == {"projects": [KELP, REEF, TIDE]}
+    assert first == second == {"updates": [0], "projects": [KELP, REEF, TIDE]}
+    assert unstreamed_projects(second["projects"], joined) == []
+
+
+def test_joining_visitor_gets_in_line_when_the_call_is_turned_away(engine, monkeypatch):
+    async def share():
+        checked = asyncio.Event()
+
+        async def usage_once_joined():
+            await checked.wait()
+            return 0
+
+        monkeypatch.setattr(
+            generate_projects, "get_current_token_usage", usage_once_joined
+        )
+        for _ in range(3):
+            engine.pace.put_nowait(None)
+        release = asyncio.Event()
+        busy = await hold_slot("198.51.100.1", release)
+        streamed = []
+
+        # The first visitor already has a call waiting, the second doesn't
+        waiting = asyncio.ensure_future(
+            generate_projects.openai_scheduler.run("198.51.100.1", release.wait)
+        )
+        leader = asyncio.ensure_future(
+            get_project_response(oracle(), INPUT, "198.51.100.1")
+        )
+        await until(in_flight)
+        follower = asyncio.ensure_future(
+            get_project_response(
+                oracle(),
+                INPUT,
+                "203.0.113.7",
+                on_project=lambda project: streamed.append(project.model_dump()),
+            )
+        )
+        await until(lambda: generate_projects.project_flights.stats()["shared"])
+        checked.set()
+        with pytest.raises(SchedulerBusy):
+            await leader
+        release.set()
+        await asyncio.gather(busy, waiting)
+        return streamed, await follower
+
+    streamed, answer = asyncio.run(share())
+
+    assert engine.calls == 1
+    assert answer == {"projects": [KELP, REEF, TIDE]}
+    assert streamed == [KELP, REEF, TIDE]
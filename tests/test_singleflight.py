@@ -0,0 +1,47 @@
+import fcntl
+import os
+import time
+
+from utils.singleflight import STALE_AFTER, FileSingleFlight
+
+
+def _age(path, seconds):
+    path.touch()
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_files_of_unused_keys_are_removed(tmp_path):
+    flights = FileSingleFlight(tmp_path, "fact")
+    for name in (".fact-old.lock", ".fact-old.json", ".fact-old.tmp"):
+        _age(tmp_path / name, STALE_AFTER + 60)
+    _age(tmp_path / ".fact-held.lock", STALE_AFTER + 60)
+    _age(tmp_path / ".fact-recent.json", 60)
+    _age(tmp_path / ".other-old.json", STALE_AFTER + 60)
+
+    held = os.open(tmp_path / ".fact-held.lock", os.O_RDWR)
+    try:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        result = flights.do("2025-01-01", lambda: {"n": 1}, dict, dict)
+    finally:
+        os.close(held)
+
+    assert result == {"n": 1}
+    remaining = sorted(path.name for path in tmp_path.iterdir())
+    # The key just used keeps its lock and result for callers still waiting
+    assert len([name for name in remaining if name.startswith(".fact-")]) == 4
+    assert ".fact-held.lock" in remaining
+    assert ".fact-recent.json" in remaining
+    assert ".other-old.json" in remaining
+    assert not [name for name in remaining if name.startswith(".fact-old")]
+
+
+def test_lock_of_a_key_in_use_is_kept(tmp_path):
+    flights = FileSingleFlight(tmp_path, "fact")
+    flights.do("2025-01-01", lambda: 1, int, int)
+    (lock,) = tmp_path.glob("*.lock")
+    _age(lock, STALE_AFTER + 60)
+
+    # Using the key again marks it fresh before the sweep
+    assert flights.do("2025-01-01", lambda: 2, int, int) == 2
+    assert lock.exists()
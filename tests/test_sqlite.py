@@ -0,0 +1,176 @@
+import sqlite3
+
+import pytest
+from tinydb import Query
+
+from db.sqlite import SQLiteDB
+
+Doc = Query()
+
+INDEXES = {"facts": ["date", "muse"]}
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    db = SQLiteDB(tmp_path / "muse_observatory.sqlite3", indexes=INDEXES)
+    yield db
+    db.close()
+
+
+def test_table_api(sqlite_db):
+    table = sqlite_db.table("facts")
+    assert table.insert({"date": "2025-01-01", "muse": "lunes"}) == 1
+    assert table.insert_multiple(
+        [{"date": "2025-01-02", "muse": "martes"}, {"date": "2025-01-03"}]
+    ) == [2, 3]
+
+    assert len(table) == 3
+    assert table.get(Doc.muse == "martes").doc_id == 2
+    assert table.get(doc_id=3) == {"date": "2025-01-03"}
+    assert table.get(doc_ids=[1, 3, 9]) == [
+        {"date": "2025-01-01", "muse": "lunes"},
+        {"date": "2025-01-03"},
+    ]
+    assert table.contains(doc_id=2) and not table.contains(Doc.muse == "ares")
+    assert table.count(Doc.date >= "2025-01-02") == 2
+
+    assert table.update({"muse": "ares"}, Doc.date == "2025-01-03") == [3]
+    assert table.update(lambda doc: doc.update(seen=True), doc_ids=[1]) == [1]
+    assert table.remove(Doc.muse == "martes") == [2]
+    assert table.all() == [
+        {"date": "2025-01-01", "muse": "lunes", "seen": True},
+        {"date": "2025-01-03", "muse": "ares"},
+    ]
+
+    table.truncate()
+    assert table.all() == [] and len(table) == 0
+    assert sqlite_db.tables() == {"facts"}
+    sqlite_db.drop_table("facts")
+    assert sqlite_db.tables() == set()
+
+
+def test_indexed_queries_become_sql(sqlite_db):
+    storage = sqlite_db.storage
+    assert storage.where("facts", Doc.date == "2025-01-01") == (
+        '"date" = ?',
+        ["2025-01-01"],
+    )
+    is_null = Doc.muse == None  # noqa: E711
+    assert storage.where("facts", is_null) == ('"muse" IS NULL', [])
+    assert storage.where("facts", (Doc.date >= "2025") & (Doc.text == "x")) == (
+        '("date" >= ?)',
+        ["2025"],
+    )
+    assert storage.where("facts", Doc.muse.one_of([])) == ("0", [])
+    # Anything the index can't answer is left to a scan
+    assert storage.where("facts", Doc.text == "x") is None
+    assert storage.where("facts", (Doc.muse == "lunes") | (Doc.text == "x")) is None
+    assert storage.where("facts", Doc.date > True) is None
+    assert storage.where("other", Doc.date == "2025-01-01") is None
+
+
+def test_indexed_search_matches_a_scan(sqlite_db):
+    table = sqlite_db.table("facts")
+    table.insert_multiple(
+        [
+            {"date": "2025-01-01", "muse": "lunes"},
+            {"date": "2025-01-02", "muse": ["not", "a", "scalar"]},
+            {"date": "2025-01-03", "muse": "lunes"},
+            {"muse": None},
+            {"date": "2025-02-01", "muse": "martes"},
+        ]
+    )
+    queries = [
+        Doc.muse == "lunes",
+        Doc.muse == None,  # noqa: E711
+        Doc.date >= "2025-01-02",
+        Doc.date < "2025-01-03",
+        Doc.fragment({"muse": "lunes"}),
+        Doc.muse.one_of(["martes", "lunes"]) & (Doc.date < "2025-02"),
+        (Doc.date == "2025-02-01") | (Doc.muse == "lunes"),
+    ]
+    docs = table.all()
+    for query in queries:
+        assert table.search(query) == [doc for doc in docs if query(doc)]
+
+
+def test_indexes_are_added_to_existing_tables(tmp_path):
+    path = tmp_path / "muse_observatory.sqlite3"
+    db = SQLiteDB(path)
+    db.table("facts").insert({"date": "2025-01-01"})
+    db.close()
+
+    reopened = SQLiteDB(path, indexes=INDEXES)
+    table = reopened.table("facts")
+    table.insert({"date": "2025-01-02"})
+    plan = reopened.storage.connection().execute(
+        'EXPLAIN QUERY PLAN SELECT doc_id FROM "facts" WHERE "date" = ?', ["x"]
+    )
+    assert "facts__date" in " ".join(str(row) for row in plan)
+    assert table.search(Doc.date == "2025-01-01") == [{"date": "2025-01-01"}]
+    reopened.close()
+
+
+def test_reserved_columns_cant_be_indexed(tmp_path):
+    with pytest.raises(ValueError):
+        SQLiteDB(tmp_path / "db.sqlite3", indexes={"facts": ["doc_id"]})
+
+
+def test_writes_of_other_connections_are_seen(tmp_path):
+    path = tmp_path / "muse_observatory.sqlite3"
+    writer, reader = SQLiteDB(path), SQLiteDB(path)
+    before = reader.storage.table_version("facts")
+
+    writer.table("facts").insert({"n": 1})
+
+    assert reader.table("facts").all() == [{"n": 1}]
+    assert reader.storage.table_version("facts") > before
+    writer.close()
+    reader.close()
+
+
+def test_failed_transaction_rolls_back(sqlite_db):
+    table = sqlite_db.table("facts")
+    table.insert({"n": 1})
+    with pytest.raises(RuntimeError):
+        with sqlite_db.storage.transaction() as conn:
+            sqlite_db.storage.insert(conn, "facts", {"n": 2})
+            raise RuntimeError("interrupted")
+
+    assert table.all() == [{"n": 1}]
+
+
+def test_deleted_ids_are_not_handed_out_again(tmp_path):
+    path = tmp_path / "muse_observatory.sqlite3"
+    db = SQLiteDB(path)
+    table = db.table("facts")
+    table.insert_multiple([{"n": 1}, {"n": 2}])
+    table.remove(doc_ids=[2])
+    assert table.insert({"n": 3}) == 3
+    table.remove(doc_ids=[3])
+    db.close()
+
+    reopened = SQLiteDB(path)
+    table = reopened.table("facts")
+    assert table.insert({"n": 4}) == 4
+    # Like TinyDB, emptying a table starts its IDs over
+    table.truncate()
+    assert table.insert({"n": 5}) == 1
+    reopened.close()
+
+
+def test_tables_of_earlier_versions_stop_reusing_ids(tmp_path):
+    path = tmp_path / "muse_observatory.sqlite3"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE facts (doc_id INTEGER PRIMARY KEY, doc TEXT)")
+        conn.executemany(
+            "INSERT INTO facts VALUES (?, ?)", [(1, '{"n": 1}'), (2, '{"n": 2}')]
+        )
+    conn.close()
+
+    db = SQLiteDB(path, indexes={"facts": ["n"]})
+    table = db.table("facts")
+    assert table.search(Doc.n == 2) == [{"n": 2}]
+    table.remove(doc_ids=[2])
+    assert table.insert({"n": 3}) == 3
+    db.close()
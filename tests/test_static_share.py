@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+import observatory_static
+from utils.openai_scheduler import SchedulerBusy
+
+PROJECT = {
+    "project_name": "Kelp Commons",
+    "organization": "Reef Trust",
+    "geographic_level": "local",
+    "link_to_organization": "https://example.org/reef-trust",
+}
+
+
+class FakeOracle:
+    muse_name = "Lunes"
+
+    def __init__(self):
+        self.saved = []
+
+    async def asave_inspiration(self, user_input, projects):
+        self.saved.append((user_input, projects))
+
+
+@pytest.fixture
+def answer(monkeypatch):
+    """Stand in for the cosmic engine; returns ``share(answer)``."""
+    oracle = FakeOracle()
+
+    def share(projects_data, user_input="Kelp forests in the harbour"):
+        async def get_project_response(oracle_day, user_input, client_key):
+            if isinstance(projects_data, Exception):
+                raise projects_data
+            return projects_data
+
+        monkeypatch.setattr(
+            observatory_static, "get_project_response", get_project_response
+        )
+        return asyncio.run(
+            observatory_static.answer_share(oracle, user_input, "203.0.113.7")
+        )
+
+    share.oracle = oracle
+    return share
+
+
+def body(response):
+    return json.loads(response.body)
+
+
+def test_projects_are_saved_and_returned(answer):
+    assert answer({"projects": [PROJECT]}) == {"muse": "Lunes", "projects": [PROJECT]}
+    assert answer.oracle.saved == [("Kelp forests in the harbour", [PROJECT])]
+
+
+def test_malformed_projects_are_dropped(answer):
+    broken = {"project_name": "Half a project"}
+
+    assert answer({"projects": [broken, PROJECT]})["projects"] == [PROJECT]
+    assert answer.oracle.saved == [("Kelp forests in the harbour", [PROJECT])]
+
+
+def test_no_projects_is_still_a_share(answer):
+    assert answer({"projects": []})["projects"] == []
+    assert answer.oracle.saved == [("Kelp forests in the harbour", [])]
+
+
+def test_unanswered_share_is_an_error_and_not_saved(answer):
+    error = "OpenAI daily token quota exceeded. Please try again tomorrow."
+
+    response = answer({"error": error})
+
+    assert response.status_code == 503
+    assert body(response) == {"error": error}
+    assert answer.oracle.saved == []
+
+
+def test_busy_scheduler_asks_to_retry(answer):
+    response = answer(SchedulerBusy("Too many signals at once"))
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+    assert answer.oracle.saved == []
+
+
+def test_invalid_input_is_rejected(answer):
+    response = answer({"projects": [PROJECT]}, user_input="   ")
+
+    assert response.status_code == 400
+    assert body(response) == {"error": "Please inspire Lunes!"}
+    assert answer.oracle.saved == []
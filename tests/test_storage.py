@@ -0,0 +1,342 @@
+import json
+import multiprocessing
+import queue
+import threading
+
+import pytest
+from tinydb import Query, TinyDB, where
+from tinydb.operations import increment
+from tinydb.storages import MemoryStorage
+
+from db.storage import LogTinyDB
+from db.watch import ChangeWatcher
+
+Doc = Query()
+
+# Small enough that writers compact many times while they run
+COMPACT_BYTES = 3000
+
+
+def test_commits_survive_restart(open_db):
+    db = open_db()
+    table = db.table("inspirations")
+    first = table.insert({"muse": "lunes", "text": "tides"})
+    second = table.insert({"muse": "martes", "text": "embers"})
+    table.update({"text": "low tides"}, doc_ids=[first])
+    table.remove(doc_ids=[second])
+    db.close()
+
+    reopened = open_db().table("inspirations")
+    assert [(doc.doc_id, dict(doc)) for doc in reopened.all()] == [
+        (first, {"muse": "lunes", "text": "low tides"})
+    ]
+
+
+def test_log_is_replayed_without_compaction(open_db, db_file):
+    db = open_db()
+    db.table("facts").insert_multiple([{"n": n} for n in range(5)])
+    # Nothing folded into the table files yet: a second reader replays the log
+    assert not (db_file.with_suffix("") / "facts.json").exists()
+
+    reader = open_db()
+    assert [doc["n"] for doc in reader.table("facts").all()] == list(range(5))
+
+
+def test_other_process_commits_are_caught_up(open_db):
+    writer, reader = open_db(), open_db()
+    assert reader.table("facts").all() == []
+    writer.table("facts").insert({"n": 1})
+    assert reader.table("facts").get(Query().n == 1) == {"n": 1}
+    assert len(reader.table("facts")) == 1
+
+
+def _apply_changes(db):
+    facts = db.table("facts")
+    facts.insert_multiple(
+        {"date": f"2025-{month:02d}-{day:02d}", "muse": muse, "n": month * day}
+        for month, muse in ((1, "lunes"), (2, "martes"), (3, "lunes"))
+        for day in (1, 15)
+    )
+    facts.insert({"muse": "ares", "n": 0})
+    facts.update({"muse": "martes"}, Doc.date == "2025-03-15")
+    facts.update(increment("n"), Doc.muse == "lunes")
+    facts.remove(Doc.date == "2025-02-01")
+    facts.upsert({"date": "2025-04-01", "muse": "ares", "n": 4}, Doc.n == 4)
+    facts.upsert({"date": "2025-01-20", "muse": "ares", "n": 9}, Doc.n == 99)
+    db.table("other").insert({"n": 1})
+    db.table("other").truncate()
+
+
+def _query_results(db):
+    facts = db.table("facts")
+    queries = [
+        Doc.muse == "lunes",
+        Doc.date == "2025-03-15",
+        Doc.date >= "2025-02-15",
+        (Doc.date >= "2025-01-10") & (Doc.date < "2025-03"),
+        Doc.muse.one_of(["ares", "martes"]),
+        Doc.fragment({"muse": "lunes", "date": "2025-01-15"}),
+        (Doc.muse == "ares") | (Doc.n > 40),
+        ~Doc.date.exists(),
+        where("n").test(lambda n: n % 2 == 0),
+    ]
+    return {
+        "all": [(doc.doc_id, dict(doc)) for doc in facts.all()],
+        "len": len(facts),
+        "search": [[doc.doc_id for doc in facts.search(query)] for query in queries],
+        "count": [facts.count(query) for query in queries],
+        "get": [facts.get(doc_id=doc_id) for doc_id in (1, 3, 99)],
+        "contains": [facts.contains(Doc.muse == muse) for muse in ("ares", "zeus")],
+        "other": db.table("other").all(),
+    }
+
+
+def test_results_match_tinydb_memory_storage(open_db):
+    expected_db = TinyDB(storage=MemoryStorage)
+    _apply_changes(expected_db)
+    expected = _query_results(expected_db)
+
+    options = {"indexes": {"facts": ["muse"]}, "partitions": {"facts": "date"}}
+    db = open_db(**options)
+    _apply_changes(db)
+    assert _query_results(db) == expected
+
+    # A reader replaying the log and a restart from the table files agree
+    assert _query_results(open_db(**options)) == expected
+    db.close()
+    assert _query_results(open_db(**options)) == expected
+
+
+def test_torn_final_log_entry_is_skipped(open_db, db_file):
+    db = open_db(compact_bytes=1 << 30)
+    db.table("facts").insert_multiple([{"n": 1}, {"n": 2}])
+    # The writer died halfway through its last commit
+    with open(db_file.with_name(db_file.name + ".wal"), "a", encoding="utf-8") as f:
+        f.write('[["put", "facts", "3", {"n": 3')
+
+    reopened = open_db(compact_bytes=1 << 30)
+    assert reopened.table("facts").all() == [{"n": 1}, {"n": 2}]
+    # Later commits aren't glued to the torn entry
+    assert reopened.table("facts").insert({"n": 4}) == 3
+    assert open_db().table("facts").all() == [{"n": 1}, {"n": 2}, {"n": 4}]
+
+
+def test_interrupted_compaction_is_recovered(open_db, db_file, monkeypatch):
+    db = open_db(compact_bytes=1 << 30)
+    db.table("a").insert_multiple({"n": n} for n in range(3))
+    db.table("b").insert_multiple({"n": n} for n in range(3))
+    db.storage.compact()
+    db.table("a").update({"n": 10}, doc_ids=[1])
+    db.table("b").remove(doc_ids=[2])
+
+    # Crash after the first table file, before the manifest
+    write_json = db.storage._write_json
+    written = []
+
+    def crashing_write_json(path, data):
+        if written:
+            raise OSError("disk unplugged")
+        written.append(path)
+        write_json(path, data)
+
+    monkeypatch.setattr(db.storage, "_write_json", crashing_write_json)
+    with pytest.raises(OSError):
+        db.storage.compact()
+    compacting = db_file.with_name(db_file.name + ".wal.compacting")
+    assert compacting.exists()
+
+    expected = {"a": [{"n": 10}, {"n": 1}, {"n": 2}], "b": [{"n": 0}, {"n": 2}]}
+    reader = open_db()
+    assert {name: reader.table(name).all() for name in "ab"} == expected
+
+    # Writes after the crash are kept by the next compaction
+    reader.table("b").insert({"n": 3})
+    expected["b"].append({"n": 3})
+    reader.close()
+    assert not compacting.exists()
+    assert {name: open_db().table(name).all() for name in "ab"} == expected
+
+
+def test_retried_compaction_keeps_the_interrupted_log(open_db, db_file, monkeypatch):
+    db = open_db(compact_bytes=1 << 30)
+    db.table("a").insert_multiple({"n": n} for n in range(3))
+
+    def failing_write_json(path, data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(db.storage, "_write_json", failing_write_json)
+    with pytest.raises(OSError):
+        db.storage.compact()
+    monkeypatch.undo()
+
+    db.table("a").insert({"n": 3})
+    db.storage.compact()
+
+    assert not db_file.with_name(db_file.name + ".wal.compacting").exists()
+    assert [doc["n"] for doc in open_db().table("a").all()] == [0, 1, 2, 3]
+
+
+def test_document_ids_continue_after_restart(open_db):
+    db = open_db()
+    db.table("facts").insert_multiple([{"n": 1}, {"n": 2}])
+    db.table("facts").remove(doc_ids=[2])
+    db.close()
+
+    assert open_db().table("facts").insert({"n": 3}) == 3
+
+
+def test_unencodable_document_is_not_committed(open_db, db_file):
+    db = open_db()
+    table = db.table("facts")
+    table.insert({"n": 1})
+    wal_size = db_file.with_name(db_file.name + ".wal").stat().st_size
+
+    with pytest.raises(TypeError):
+        table.insert({"n": object()})
+
+    assert table.all() == [{"n": 1}]
+    assert db_file.with_name(db_file.name + ".wal").stat().st_size == wal_size
+
+
+def test_single_file_snapshot_is_split_by_table(open_db, db_file):
+    db_file.write_text(
+        json.dumps({"daily_facts": {"1": {"date": "2025-01-01"}}, "projects": {}})
+    )
+
+    db = open_db()
+    assert db.table("daily_facts").all() == [{"date": "2025-01-01"}]
+    db.close()
+
+    data_dir = db_file.with_suffix("")
+    assert json.loads((data_dir / "daily_facts.json").read_text()) == {
+        "1": {"date": "2025-01-01"}
+    }
+    assert not db_file.exists()
+    assert db_file.with_name(db_file.name + ".migrated").exists()
+    assert open_db().tables() == {"daily_facts", "projects"}
+
+
+def test_table_version_moves_on_every_change(open_db):
+    db = open_db()
+    storage = db.storage
+    before = storage.table_version("facts")
+    db.table("facts").insert({"n": 1})
+    after_insert = storage.table_version("facts")
+    db.table("facts").truncate()
+
+    assert before < after_insert < storage.table_version("facts")
+
+
+def test_documents_come_back_in_id_order(open_db):
+    db = open_db(partitions={"projects": "created_at"})
+    table = db.table("projects")
+    table.insert_multiple(
+        [
+            {"created_at": "2025-02-01", "name": "b"},
+            {"created_at": "2025-01-01", "name": "a"},
+            {"created_at": "2025-02-02", "name": "c"},
+        ]
+    )
+    # Moving a document to another partition must not move it in the table
+    table.update({"created_at": "2025-03-01"}, doc_ids=[1])
+
+    assert [doc.doc_id for doc in table.all()] == [1, 2, 3]
+    db.close()
+    reopened = open_db(partitions={"projects": "created_at"}).table("projects")
+    assert [doc.doc_id for doc in reopened.all()] == [1, 2, 3]
+
+
+def test_reader_follows_a_log_started_by_another_compaction(open_db, db_file):
+    writer, reader = open_db(), open_db()
+    writer.table("docs").insert_multiple({"n": n} for n in range(20))
+    assert len(reader.table("docs").all()) == 20
+
+    # The new log outgrows the old one before the reader looks again; it
+    # may well reuse the old log's inode number
+    writer.storage.compact()
+    writer.table("docs").insert_multiple({"n": n} for n in range(20, 60))
+
+    assert [doc["n"] for doc in reader.table("docs").all()] == list(range(60))
+    reader.table("docs").insert({"n": 60})
+    reader.storage.compact()
+    assert len(open_db().table("docs")) == 61
+
+
+def _insert(path, proc, count):
+    db = LogTinyDB(path, compact_bytes=COMPACT_BYTES, fsync=False)
+    table = db.table("docs")
+    for n in range(count):
+        table.insert({"proc": proc, "n": n})
+    db.close()
+
+
+def test_concurrent_writers_keep_every_document_through_compactions(db_file):
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_insert, args=(db_file, proc, 300)) for proc in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0] * 4
+
+    manifest = json.loads((db_file.with_suffix("") / "manifest.json").read_text())
+    assert manifest["generation"] > 4
+
+    expected = sorted((proc, n) for proc in range(4) for n in range(300))
+    for _ in range(2):
+        db = LogTinyDB(db_file, fsync=False)
+        table = db.table("docs")
+        docs = table.all()
+        assert sorted((doc["proc"], doc["n"]) for doc in docs) == expected
+        assert len(table) == len(docs) == 1200
+        db.close()
+
+
+def _increment(path, count):
+    db = LogTinyDB(path, compact_bytes=COMPACT_BYTES, fsync=False)
+    table = db.table("counters")
+    for _ in range(count):
+        table.update(increment("calls"), doc_ids=[1])
+    db.close()
+
+
+def test_concurrent_updates_are_not_lost(open_db, db_file):
+    open_db().table("counters").insert({"calls": 0})
+
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_increment, args=(db_file, 100)) for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0] * 4
+
+    assert open_db().table("counters").get(doc_id=1) == {"calls": 400}
+
+
+def test_watcher_reports_changes_of_other_writers(open_db):
+    writer, reader = open_db(), open_db()
+    writer.table("facts").insert({"n": 1})
+    changes = queue.Queue()
+    polled = threading.Event()
+
+    def versions():
+        current = reader.storage.versions()
+        polled.set()
+        return current
+
+    watcher = ChangeWatcher(versions, interval=0.01)
+    watcher.subscribe(changes.put)
+    assert polled.wait(timeout=5)
+
+    try:
+        writer.table("daily_facts").insert({"n": 1})
+        assert changes.get(timeout=5) == {"daily_facts"}
+        writer.table("facts").truncate()
+        assert changes.get(timeout=5) == {"facts"}
+    finally:
+        watcher.stop()
@@ -0,0 +1,91 @@
+import asyncio
+import sys
+from datetime import datetime
+
+from utils.generate_projects import get_current_token_usage
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+
+
+def log_usage(database, date, tokens, status="success", endpoint="projects"):
+    work = database.UnitOfWork()
+    database.stage_usage_entry(
+        work,
+        {
+            "date": date,
+            "endpoint": endpoint,
+            "tokens_used": tokens,
+            "status": status,
+        },
+    )
+    work.commit()
+
+
+def daily_totals(database):
+    table = database.get_db().table(database.USAGE_DAILY_TABLE)
+    return {day["date"]: dict(day) for day in table.all()}
+
+
+def test_usage_entries_update_the_daily_total(app_db):
+    log_usage(app_db, TODAY, 100)
+    log_usage(app_db, TODAY, 50, endpoint="fun_fact")
+    # Failed calls are counted but spend no quota
+    log_usage(app_db, TODAY, 999, status="error")
+
+    assert daily_totals(app_db)[TODAY] == {
+        "date": TODAY,
+        "calls": 3,
+        "tokens_used": 150,
+        "endpoints": {"projects": 100, "fun_fact": 50},
+    }
+    assert len(app_db.get_db().table(app_db.USAGE_TABLE)) == 3
+    assert asyncio.run(get_current_token_usage()) == 150
+
+
+def test_rebuild_recomputes_drifted_totals(app_db):
+    log_usage(app_db, "2025-01-01", 10)
+    log_usage(app_db, "2025-01-02", 20)
+    log_usage(app_db, "2025-01-02", 5)
+    db = app_db.get_db()
+    db.replace_table(
+        app_db.USAGE_DAILY_TABLE,
+        [
+            {"date": "2025-01-01", "calls": 7, "tokens_used": 0},
+            # A day whose log entries were archived
+            {"date": "2024-06-01", "calls": 2, "tokens_used": 40},
+        ],
+    )
+
+    assert app_db.rebuild_daily_token_usage() == 3
+    totals = daily_totals(app_db)
+    assert totals["2025-01-01"]["tokens_used"] == 10
+    assert totals["2025-01-02"] == {
+        "date": "2025-01-02",
+        "calls": 2,
+        "tokens_used": 25,
+        "endpoints": {"projects": 25},
+    }
+    assert totals["2024-06-01"]["tokens_used"] == 40
+
+
+def test_missing_totals_are_built_on_open(app_db):
+    db = app_db.get_db()
+    db.table(app_db.USAGE_TABLE).insert(
+        {"date": TODAY, "endpoint": "projects", "tokens_used": 30, "status": "success"}
+    )
+    db.close()
+    app_db._db_instance = None
+
+    assert daily_totals(app_db)[TODAY]["tokens_used"] == 30
+
+
+def test_rebuild_usage_command(app_db, monkeypatch):
+    from db import manage
+
+    log_usage(app_db, TODAY, 12)
+    app_db.get_db().table(app_db.USAGE_DAILY_TABLE).truncate()
+
+    monkeypatch.setattr(sys, "argv", ["db.manage", "rebuild-usage"])
+    manage.main()
+
+    assert daily_totals(app_db)[TODAY]["tokens_used"] == 12
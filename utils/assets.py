@@ -0,0 +1,166 @@
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Set
+
+from fastapi import Request, Response
+
+from utils.logger import get_logger
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+logger = get_logger(__name__)
+
+# URL prefix the fingerprinted assets are served under
+ASSETS_PATH = "/assets"
+
+# The URL changes with the content, so browsers may keep a copy for a year
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Precompressed encodings, in order of preference
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+
+@dataclass(frozen=True)
+class StaticAsset:
+    """A file held in memory and served under a content-hashed name."""
+
+    filename: str
+    content: bytes
+    media_type: str
+    etag: str
+    # Content-Encoding -> precompressed body
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def url(self: "StaticAsset") -> str:
+        return f"{ASSETS_PATH}/{self.filename}"
+
+
+_assets: Dict[str, StaticAsset] = {}
+
+
+def register_asset(
+    path: str, media_type: Optional[str] = None, compress: bool = False
+) -> StaticAsset:
+    """Read ``path`` once and serve it as ``/assets/<stem>.<hash><suffix>``."""
+    source = Path(path)
+    return register_bytes(source.name, source.read_bytes(), media_type, compress)
+
+
+def register_bytes(
+    name: str,
+    content: bytes,
+    media_type: Optional[str] = None,
+    compress: bool = False,
+) -> StaticAsset:
+    """Serve ``content`` as ``/assets/<stem>.<hash><suffix>`` of ``name``."""
+    asset = build_asset(name, content, media_type, compress)
+    _assets[asset.filename] = asset
+    logger.debug(f"📦 Registered {name} as {asset.url} ({len(content)} bytes)")
+    return asset
+
+
+def register_bundle(
+    name: str,
+    paths: Sequence[str],
+    media_type: Optional[str] = None,
+    compress: bool = True,
+) -> StaticAsset:
+    """Concatenate ``paths``, in order, into one asset served as ``name``."""
+    content = b"\n".join(Path(path).read_bytes() for path in paths)
+    return register_bytes(name, content, media_type, compress)
+
+
+def build_asset(
+    name: str,
+    content: bytes,
+    media_type: Optional[str] = None,
+    compress: bool = False,
+) -> StaticAsset:
+    """
+    Fingerprint ``content`` without serving it under ``/assets``.
+
+    With ``compress``, gzip (and brotli, when installed) copies are made
+    once here and picked per request from ``Accept-Encoding``.
+    """
+    stem, dot, suffix = name.rpartition(".")
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    return StaticAsset(
+        filename=f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}",
+        content=content,
+        media_type=media_type
+        or mimetypes.guess_type(name)[0]
+        or "application/octet-stream",
+        etag=f'"{digest}"',
+        encoded=_compress(content) if compress else {},
+    )
+
+
+def get_asset(filename: str) -> Optional[StaticAsset]:
+    return _assets.get(filename)
+
+
+def _compress(content: bytes) -> Dict[str, bytes]:
+    encoded = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli:
+        encoded["br"] = brotli.compress(content, quality=11)
+    return encoded
+
+
+def _accepted_encodings(request: Request) -> Set[str]:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                pass
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def asset_response(
+    asset: StaticAsset,
+    request: Request,
+    cache_control: str = CACHE_CONTROL,
+    status_code: int = 200,
+) -> Response:
+    """
+    Serve ``asset``, or an empty 304 when the client already has this version.
+
+    Only successful responses are conditional; an error page such as a 429
+    is always sent in full.
+    """
+    headers = {"Cache-Control": cache_control, "ETag": asset.etag}
+    content = asset.content
+    if asset.encoded:
+        headers["Vary"] = "Accept-Encoding"
+        accepted = _accepted_encodings(request)
+        for coding in ENCODINGS:
+            if coding in asset.encoded and coding in accepted:
+                content = asset.encoded[coding]
+                headers["Content-Encoding"] = coding
+                # Each encoding is its own representation with its own tag
+                headers["ETag"] = f'{asset.etag[:-1]}-{coding}"'
+                break
+
+    if_none_match = request.headers.get("if-none-match", "")
+    cached = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if status_code == 200 and (headers["ETag"] in cached or "*" in cached):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=content,
+        status_code=status_code,
+        media_type=asset.media_type,
+        headers=headers,
+    )
@@ -0,0 +1,130 @@
+import json
+import resource
+import sys
+import time
+from typing import Dict, List
+
+from nicegui import Client, ui
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Same window as the idle script of the observatory page: 5 minutes without
+# activity, then 30 seconds of warning before it reloads the page, plus the
+# 30 seconds the script may wait before reporting activity
+IDLE_TIMEOUT = 360.0
+
+# A client asked to reload that is still there this much later is deleted
+EVICTION_GRACE = 60.0
+
+# Seconds between two idle sweeps
+SWEEP_INTERVAL = 30.0
+
+# Client ID -> last time the browser reported user activity
+_last_activity: Dict[str, float] = {}
+# Client ID -> when the client was asked to reload
+_evicting: Dict[str, float] = {}
+
+
+def track_activity() -> None:
+    """
+    Count ``emitEvent('activity')`` from the browser as activity of this client.
+
+    Only pages calling this, the ones loading the idle script, are swept.
+    """
+    client = ui.context.client
+    _last_activity[client.id] = time.time()
+    ui.on("activity", lambda: _touch(client.id))
+
+
+def _touch(client_id: str) -> None:
+    _last_activity[client_id] = time.time()
+    _evicting.pop(client_id, None)
+
+
+def _approx_bytes(client: Client) -> int:
+    # The serialized elements are what the client keeps and syncs
+    return sum(
+        len(json.dumps(element._to_dict(), default=str))
+        for element in list(client.elements.values())
+    )
+
+
+def rss_bytes() -> int:
+    """Current resident set size of the process (peak where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def client_stats() -> Dict:
+    """Live NiceGUI clients with their element counts and approximate size."""
+    now = time.time()
+    clients: List[Dict] = []
+    for client in list(Client.instances.values()):
+        if client.shared:
+            continue
+        clients.append(
+            {
+                "id": client.id,
+                "path": client.page.path,
+                "connected": client.has_socket_connection,
+                "elements": len(client.elements),
+                "approx_bytes": _approx_bytes(client),
+                "age_seconds": round(now - client.created, 1),
+                "idle_seconds": round(
+                    now - _last_activity.get(client.id, client.created), 1
+                ),
+            }
+        )
+    return {
+        "clients": len(clients),
+        "elements": sum(c["elements"] for c in clients),
+        "approx_bytes": sum(c["approx_bytes"] for c in clients),
+        "rss_bytes": rss_bytes(),
+        "per_client": clients,
+    }
+
+
+def sweep_idle_clients() -> None:
+    """
+    Reload clients idle for longer than ``IDLE_TIMEOUT`` and delete the ones
+    that don't go away by themselves.
+
+    The reload mirrors what the idle script does in the browser; the delete
+    covers tabs whose script doesn't run anymore (e.g. a sleeping phone).
+    Clients of pages without the script never report activity and are left
+    to NiceGUI, which deletes them once they disconnect.
+    """
+    now = time.time()
+    evicted = 0
+    for client in list(Client.instances.values()):
+        if client.shared or client.id not in _last_activity:
+            continue
+        asked = _evicting.get(client.id)
+        if asked is not None and now - asked > EVICTION_GRACE:
+            logger.info(f"🧹 Deleting idle client {client.id} ({client.page.path})")
+            client.delete()
+            evicted += 1
+            continue
+        idle = now - _last_activity[client.id]
+        if asked is None and idle > IDLE_TIMEOUT:
+            _evicting[client.id] = now
+            if client.has_socket_connection:
+                client.run_javascript("window.location.reload()")
+
+    # Forget clients NiceGUI has deleted on its own (disconnects, pruning)
+    for tracked in (_last_activity, _evicting):
+        for client_id in list(tracked):
+            if client_id not in Client.instances:
+                del tracked[client_id]
+
+    if evicted or _evicting:
+        logger.info(
+            f"👥 {len(Client.instances)} clients, {len(_evicting)} idle being "
+            f"evicted, {evicted} deleted, RSS {rss_bytes() // 2**20} MB"
+        )
@@ -1,15 +1,23 @@
+import asyncio
 import json
 import os
 import re
 from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from openai import AsyncOpenAI  # Changed to async
+from pydantic import ValidationError
 from tinydb import Query
 
-from db.db import get_db, insert_with_logging, search_with_logging
+from db.db import USAGE_DAILY_TABLE, UnitOfWork, aget, stage_usage_entry
 from models.muse import Oracle
+from models.schemas import ProjectModel
+from utils.json_stream import ArrayItemStream
 from utils.logger import get_logger
+from utils.openai_scheduler import QueueListener, SchedulerBusy, openai_scheduler
+from utils.project_cache import normalize_input, project_cache
+from utils.singleflight import SingleFlight
 
 # Create a logger
 logger = get_logger(__name__)
@@ -17,12 +25,70 @@ logger = get_logger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Connect to OpenAI API
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=60)  # Async client
+# Connect to OpenAI API, or a stand-in such as benchmarks/fake_openai.py
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"), base_url=OPENAI_BASE_URL, timeout=60
+)  # Async client
 
 # --- OpenAI Token Quota Config ---
 DAILY_TOKEN_QUOTA = 100_000  # Set your daily quota here
 
+# Visitors sharing the same words at the same time wait for a single call
+project_flights = SingleFlight("get_project_response")
+
+# Called with each project as soon as it has been generated
+ProjectListener = Callable[[ProjectModel], None]
+
+
+class _Audience:
+    """
+    Everyone waiting on one shared call: its queue updates and streamed
+    projects go to each of them, and those joining late get what they missed.
+    """
+
+    def __init__(self: "_Audience") -> None:
+        self.listeners: List[QueueListener] = []
+        self.on_projects: List[ProjectListener] = []
+        self.update: Optional[Tuple[int, float]] = None
+        self.projects: List[ProjectModel] = []
+
+    def join(
+        self: "_Audience",
+        listener: Optional[QueueListener],
+        on_project: Optional[ProjectListener],
+    ) -> None:
+        if listener:
+            self.listeners.append(listener)
+            if self.update:
+                _notify(listener, *self.update)
+        if on_project:
+            self.on_projects.append(on_project)
+            for project in self.projects:
+                _notify(on_project, project)
+
+    def queue_update(self: "_Audience", ahead: int, wait: float) -> None:
+        self.update = (ahead, wait)
+        for listener in self.listeners:
+            _notify(listener, ahead, wait)
+
+    def project(self: "_Audience", project: ProjectModel) -> None:
+        self.projects.append(project)
+        for on_project in self.on_projects:
+            _notify(on_project, project)
+
+
+def _notify(callback: Callable, *args) -> None:
+    # One visitor's broken page mustn't keep the others from being told
+    try:
+        callback(*args)
+    except Exception as e:
+        logger.error(f"Error telling a visitor about their share: {e}")
+
+
+# Key of each shared call in flight -> the visitors waiting on it
+_audiences: Dict[Tuple[str, str, str], _Audience] = {}
+
 
 async def check_and_increment_token_quota(tokens_used: int) -> bool:
     """
@@ -63,8 +129,10 @@ async def log_openai_usage(
             "error": error,
         }
 
-        # Use the helper function to insert with logging
-        insert_with_logging("openai_usage_log", usage_data)
+        # Commit the entry and its daily total update in one durable write
+        work = UnitOfWork()
+        stage_usage_entry(work, usage_data)
+        await work.acommit()
 
         logger.info(
             f"Logged OpenAI API usage: {endpoint}, {tokens_used} tokens, status: {status}"
@@ -75,20 +143,17 @@ async def log_openai_usage(
 
 async def get_current_token_usage() -> int:
     """
-    Get the current total tokens used today from the usage log.
-    This replaces the need for a separate token_usage table.
+    Get the current total tokens used today.
+    Reads the per-day total maintained alongside the usage log, so the cost
+    doesn't grow with the log.
     """
     try:
         today = datetime.now().strftime("%Y-%m-%d")
 
-        # Use the search helper to find all logs for today
-        Usage = Query()
-        logs = search_with_logging("openai_usage_log", Usage.date == today)
-
-        # Sum tokens from successful calls
-        total = sum(
-            log.get("tokens_used", 0) for log in logs if log.get("status") == "success"
-        )
+        # Successful calls are summed into today's record as they are logged
+        Daily = Query()
+        day = await aget(USAGE_DAILY_TABLE, Daily.date == today)
+        total = day.get("tokens_used", 0) if day else 0
 
         logger.info(f"Current token usage for today ({today}): {total}")
         return total
@@ -97,11 +162,24 @@ async def get_current_token_usage() -> int:
         return 0
 
 
-async def get_project_response(oracle_day: Oracle, user_paragraph: str):  # Added async
+async def get_project_response(
+    oracle_day: Oracle,
+    user_paragraph: str,
+    client_key: str = "anonymous",
+    listener: Optional[QueueListener] = None,
+    on_project: Optional[ProjectListener] = None,
+):
     """
     Given a fact_info dictionary and a user's paragraph,
     use OpenAI to generate three real-world environmental or sustainability-related
     projects that connect the user's ideas to the natural adaptation of the organism.
+
+    The call waits in line under ``client_key`` (the visitor's IP address) and
+    ``listener`` is told its position; raises ``SchedulerBusy`` when turned away.
+    The answer is streamed, and ``on_project`` gets each project as soon as it
+    is complete; answers from the cache only come as a whole. Visitors joining
+    a call already in flight for the same words get its queue updates and
+    projects too, and wait in line themselves if it is turned away.
     """
     logger.debug("get_project_response called")
 
@@ -109,6 +187,86 @@ async def get_project_response(oracle_day: Oracle, user_paragraph: str):  # Adde
         logger.error("No Oracle has been assigned today")
         return {"projects": []}
 
+    # Same muse, same question, (nearly) the same words: no need to ask again
+    cached = await asyncio.to_thread(
+        project_cache.get,
+        oracle_day.muse_name,
+        oracle_day.question_asked,
+        user_paragraph,
+    )
+    if cached is not None:
+        return cached
+
+    key = (
+        oracle_day.muse_name,
+        oracle_day.question_asked,
+        normalize_input(user_paragraph),
+    )
+    joining = project_flights.in_flight(key)
+    if not joining:
+        _audiences[key] = _Audience()
+    # Callers joining just as the call ends only get its answer
+    audience = _audiences.get(key) or _Audience()
+    audience.join(listener, on_project)
+
+    async def ask():
+        try:
+            return await _ask_for_projects(
+                oracle_day,
+                user_paragraph,
+                client_key,
+                audience.queue_update,
+                audience.project,
+            )
+        finally:
+            if _audiences.get(key) is audience:
+                del _audiences[key]
+
+    try:
+        return await project_flights.do(key, ask)
+    except SchedulerBusy:
+        if not joining:
+            raise
+    # The visitor who made the call was turned away, which says nothing
+    # about this one: get in line under its own address
+    logger.info(f"🚦 [OpenAI] Shared call turned away, {client_key} asks itself")
+    return await _ask_for_projects(
+        oracle_day, user_paragraph, client_key, listener, on_project
+    )
+
+
+def unstreamed_projects(
+    streamed: List[Dict], projects_data: Optional[Dict]
+) -> List[Dict]:
+    """
+    Return the projects of a ``get_project_response`` answer that weren't
+    streamed to ``on_project``, e.g. all of them for cached or shared answers.
+
+    Projects are validated as when streaming and matched by content, not by
+    position, since malformed ones were skipped along the way. An answer that
+    was rejected after streaming (quota exceeded, broken JSON) adds nothing
+    but takes nothing back either.
+    """
+    missing: List[Dict] = []
+    for item in (projects_data or {}).get("projects") or []:
+        try:
+            project = ProjectModel(**item).model_dump()
+        except (TypeError, ValidationError) as e:
+            logger.warning(f"⚠️ [OpenAI] Skipping a malformed project: {e}")
+            continue
+        if project not in streamed and project not in missing:
+            missing.append(project)
+    return missing
+
+
+async def _ask_for_projects(
+    oracle_day: Oracle,
+    user_paragraph: str,
+    client_key: str,
+    listener: Optional[QueueListener],
+    on_project: Optional[ProjectListener],
+):
+    """Ask gpt-4o for the projects, log the usage and cache the answer."""
     prompt = f"""
     Based on this user reflection:
     \"\"\"{user_paragraph}\"\"\"
@@ -153,19 +311,9 @@ async def get_project_response(oracle_day: Oracle, user_paragraph: str):  # Adde
         }
     # --- End pre-check ---
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an environmental research assistant. Return only real projects in exact JSON format.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-        )
-        usage = getattr(response, "usage", None)
-        tokens_used = (
-            usage.total_tokens if usage and hasattr(usage, "total_tokens") else 0
+        # Waits for a free slot, fairly shared between visitors
+        raw_content, tokens_used = await openai_scheduler.run(
+            client_key, lambda: _stream_projects(prompt, on_project), listener
         )
         logger.info(
             f"🌌 [OpenAI] User submission for muse '{getattr(oracle_day, 'muse_name', 'unknown')}' | Tokens used: {tokens_used} | Prompt length: {len(prompt)} | Model: gpt-4o"
@@ -188,7 +336,6 @@ async def get_project_response(oracle_day: Oracle, user_paragraph: str):  # Adde
             model="gpt-4o",
             status="success",
         )
-        raw_content = response.choices[0].message.content
         cleaned_content = re.sub(
             r"^```(?:json)?\s*|\s*```$", "", raw_content.strip(), flags=re.MULTILINE
         )
@@ -197,7 +344,19 @@ async def get_project_response(oracle_day: Oracle, user_paragraph: str):  # Adde
             f"🌠 [OpenAI] Response received: {len(raw_content)} chars | Projects found: {len(result.get('projects', []))}"
         )
         logger.debug(f"🪐 [OpenAI] Project details: {result}")
+        if result.get("projects"):
+            await asyncio.to_thread(
+                project_cache.put,
+                oracle_day.muse_name,
+                oracle_day.question_asked,
+                user_paragraph,
+                result,
+            )
         return result
+    except SchedulerBusy as e:
+        # Nothing was sent; the visitor is asked to come back
+        logger.warning(f"🚦 [OpenAI] Share of {client_key} turned away: {e}")
+        raise
     except json.JSONDecodeError as e:
         await log_openai_usage(
             endpoint="get_project_response",
@@ -207,7 +366,7 @@ async def get_project_response(oracle_day: Oracle, user_paragraph: str):  # Adde
             error=str(e),
         )
         logger.error(f"JSON decode error: {e}")
-        logger.error(f"Raw response: {response.choices[0].message.content}")
+        logger.error(f"Raw response: {raw_content}")
         return {"projects": []}
     except Exception as e:
         await log_openai_usage(
@@ -219,3 +378,51 @@ async def get_project_response(oracle_day: Oracle, user_paragraph: str):  # Adde
         )
         logger.error(f"Error generating projects: {str(e)}")
         return {"projects": []}
+
+
+async def _stream_projects(
+    prompt: str, on_project: Optional[ProjectListener]
+) -> Tuple[str, int]:
+    """
+    Stream the completion, handing each project to ``on_project`` as soon as
+    its JSON object is closed. Returns the whole answer and the tokens used.
+    """
+    stream = await client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are an environmental research assistant. Return only real projects in exact JSON format.",
+            },
+            {"role": "user", "content": prompt},
+        ],
+        stream=True,
+        # The last chunk carries the usage of the whole call
+        stream_options={"include_usage": True},
+    )
+    parser = ArrayItemStream()
+    parts = []
+    tokens_used = 0
+    async for chunk in stream:
+        if chunk.usage:
+            tokens_used = chunk.usage.total_tokens
+        for choice in chunk.choices:
+            delta = choice.delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            for item in parser.feed(delta):
+                try:
+                    project = ProjectModel(**item)
+                except ValidationError as e:
+                    logger.warning(f"⚠️ [OpenAI] Skipping a malformed project: {e}")
+                    continue
+                logger.info(f"🌠 [OpenAI] Project streamed: {project.project_name}")
+                if on_project:
+                    try:
+                        on_project(project)
+                    except Exception as e:
+                        logger.error(f"Error showing a streamed project: {e}")
+    if not tokens_used:
+        logger.warning("⚠️ [OpenAI] The stream reported no token usage")
+    return "".join(parts), tokens_used
@@ -0,0 +1,64 @@
+import json
+from typing import Dict, List, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ArrayItemStream:
+    """
+    Pick the items of the arrays in a JSON object out of text that is still
+    arriving, such as ``{"projects": [{...}, {...}]}`` streamed token by token.
+
+    ``feed`` returns the objects completed by each chunk. Text around the
+    object, like Markdown code fences, is skipped.
+    """
+
+    def __init__(self: "ArrayItemStream") -> None:
+        # Open brackets, outermost first
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        # Characters of the item being read, once one has started
+        self._item: List[str] = []
+
+    def feed(self: "ArrayItemStream", text: str) -> List[Dict]:
+        items = []
+        for char in text:
+            if self._item:
+                self._item.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"' and self._stack:
+                self._in_string = True
+            elif char in "{[":
+                # An object right inside an array of the top-level object
+                if char == "{" and self._stack == ["{", "["]:
+                    self._item = [char]
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if char == "}" and self._item and self._stack == ["{", "["]:
+                    item = self._parse("".join(self._item))
+                    if item is not None:
+                        items.append(item)
+                    self._item = []
+        return items
+
+    @staticmethod
+    def _parse(raw: str) -> Optional[Dict]:
+        try:
+            item = json.loads(raw)
+        except ValueError as e:
+            logger.warning(f"⚠️ Skipping a streamed item that is not JSON: {e}")
+            return None
+        return item if isinstance(item, dict) else None
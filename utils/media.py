@@ -1,10 +1,99 @@
 import base64
+import io
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Tuple
 
+from PIL import Image
+
+from models.muse import CHART
+from utils.assets import StaticAsset, register_bytes
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Pixel densities generated for every image, as in ``srcset="... 2x"``
+DENSITIES = (1, 2, 3)
+
+# Pillow format name and save options per generated variant
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 85, "method": 6}),
+    "png": ("PNG", {"optimize": True}),
+}
+
+
+@dataclass(frozen=True)
+class ImageVariants:
+    """Downscaled copies of an image, per format and pixel density."""
+
+    width: int
+    height: int
+    assets: Dict[Tuple[str, int], StaticAsset]
+
+    def srcset(self: "ImageVariants", fmt: str) -> str:
+        return ", ".join(
+            f"{self.assets[fmt, density].url} {density}x" for density in DENSITIES
+        )
+
+    def html(self: "ImageVariants", css_class: str = "", alt: str = "") -> str:
+        """Return a ``<picture>`` offering WebP with a PNG fallback."""
+        return (
+            f'<picture><source type="image/webp" srcset="{self.srcset("webp")}">'
+            f'<img src="{self.assets["png", 1].url}" srcset="{self.srcset("png")}" '
+            f'width="{self.width}" height="{self.height}" class="{css_class}" '
+            f'alt="{alt}"></picture>'
+        )
+
+
+def build_variants(path: str, height: int) -> ImageVariants:
+    """
+    Render ``path`` at ``height`` CSS pixels for every density and format.
+
+    The variants are encoded once and served from memory under fingerprinted
+    URLs, so pages only ship the few kilobytes the display size needs.
+    """
+    source = Path(path)
+    with Image.open(source) as original:
+        original = original.convert("RGBA")
+        width = round(original.width * height / original.height)
+        assets = {}
+        for density in DENSITIES:
+            size = (width * density, height * density)
+            resized = original.resize(size, Image.LANCZOS)
+            for fmt, (pil_format, options) in VARIANT_FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                assets[fmt, density] = register_bytes(
+                    f"{source.stem}-{height}@{density}x.{fmt}", buffer.getvalue()
+                )
+    largest = max(len(asset.content) for asset in assets.values())
+    logger.info(
+        f"🖼️ Built {len(assets)} variants of {path} "
+        f"({source.stat().st_size} bytes -> at most {largest} bytes)"
+    )
+    return ImageVariants(width=width, height=height, assets=assets)
+
+
+def comet_svg(muse_color: str) -> bytes:
+    """Colored dot shown where a comet image is missing."""
+    return f"""
+        <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
+            <circle cx="12" cy="12" r="12" fill="{muse_color}"/>
+        </svg>
+        """.encode(
+        "utf-8"
+    )
+
+
+# Comet fallbacks for every muse color, ready to be linked or inlined
+COMET_FALLBACKS: Dict[str, StaticAsset] = {
+    muse["color"]: register_bytes(f"comet-{name}.svg", comet_svg(muse["color"]))
+    for name, muse in CHART.items()
+}
+
 
+@lru_cache(maxsize=None)
 def get_base64_comet(comet_path: str, muse_color: str) -> str:
     """Get base64-encoded comet image with colored dot fallback"""
     try:
@@ -13,12 +102,10 @@ def get_base64_comet(comet_path: str, muse_color: str) -> str:
             return base64.b64encode(f.read()).decode()
     except Exception as e:
         logger.warning(f"Comet image not found at {comet_path}: {e}")
-        # Create SVG fallback
-        svg_dot = f"""
-        <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
-            <circle cx="12" cy="12" r="12" fill="{muse_color}"/>
-        </svg>
-        """.encode(
-            "utf-8"
-        )
+        fallback = COMET_FALLBACKS.get(muse_color)
+        svg_dot = fallback.content if fallback else comet_svg(muse_color)
         return base64.b64encode(svg_dot).decode()
+
+
+# The logo is shown at 50-60px on every page
+LOGO = build_variants("img/logo.png", height=60)
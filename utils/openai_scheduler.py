@@ -0,0 +1,194 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Calls to OpenAI running at the same time
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "4"))
+
+# Calls waiting per visitor, and in total
+OPENAI_QUEUE_PER_CLIENT = int(os.getenv("OPENAI_QUEUE_PER_CLIENT", "2"))
+OPENAI_QUEUE_SIZE = int(os.getenv("OPENAI_QUEUE_SIZE", "50"))
+
+# Longest wait for a free slot, in seconds; calls expected to wait longer are
+# turned away up front
+OPENAI_MAX_WAIT = float(os.getenv("OPENAI_MAX_WAIT", "45"))
+
+# Duration assumed for a call until some have been measured
+DEFAULT_CALL_SECONDS = 10.0
+
+# Called with (calls ahead, expected wait in seconds) while a call waits
+QueueListener = Callable[[int, float], None]
+
+
+class SchedulerBusy(Exception):
+    """The call was not admitted, or waited longer than allowed."""
+
+
+class _Ticket:
+    def __init__(
+        self: "_Ticket", client_key: str, listener: Optional[QueueListener]
+    ) -> None:
+        self.client_key = client_key
+        self.listener = listener
+        self.enqueued = time.monotonic()
+        self.granted: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class OpenAIScheduler:
+    """
+    Run at most ``concurrency`` calls at once; the others wait in line.
+
+    Each client (IP address) has its own queue of at most ``per_client``
+    calls, and free slots go to the queues in turn, so one busy client can't
+    starve the others. A call is refused with ``SchedulerBusy`` when the
+    queues are full or when its expected wait is beyond ``max_wait``, and
+    given up once it has actually waited that long.
+    """
+
+    def __init__(
+        self: "OpenAIScheduler",
+        concurrency: int = OPENAI_CONCURRENCY,
+        per_client: int = OPENAI_QUEUE_PER_CLIENT,
+        max_queued: int = OPENAI_QUEUE_SIZE,
+        max_wait: float = OPENAI_MAX_WAIT,
+    ) -> None:
+        self.concurrency = concurrency
+        self.per_client = per_client
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        # Client key -> waiting tickets; the first client is served next
+        self._queues: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._running = 0
+        self._durations: Deque[float] = deque(maxlen=50)
+        self._waits: Deque[float] = deque(maxlen=50)
+        self.rejected = 0
+
+    @property
+    def queued(self: "OpenAIScheduler") -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def call_seconds(self: "OpenAIScheduler") -> float:
+        """Average duration of the recent calls."""
+        if not self._durations:
+            return DEFAULT_CALL_SECONDS
+        return sum(self._durations) / len(self._durations)
+
+    def expected_wait(self: "OpenAIScheduler", ahead: int) -> float:
+        """Seconds until a slot frees up for a call with ``ahead`` calls before it."""
+        # Calls that have to finish first, at ``concurrency`` calls at a time
+        finishing = self._running + ahead - self.concurrency + 1
+        if finishing <= 0:
+            return 0.0
+        return finishing / self.concurrency * self.call_seconds()
+
+    def _order(self: "OpenAIScheduler") -> List[_Ticket]:
+        # The order the queued tickets will be served in, one per client a round
+        queues = [list(queue) for queue in self._queues.values()]
+        return [
+            queue[depth]
+            for depth in range(max(map(len, queues), default=0))
+            for queue in queues
+            if depth < len(queue)
+        ]
+
+    def _dispatch(self: "OpenAIScheduler") -> None:
+        while self._running < self.concurrency and self._queues:
+            client_key, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            # The client goes to the back of the line for its next call
+            del self._queues[client_key]
+            if queue:
+                self._queues[client_key] = queue
+            if ticket.granted.done():
+                continue
+            self._running += 1
+            ticket.granted.set_result(None)
+        for ahead, ticket in enumerate(self._order()):
+            if ticket.listener:
+                try:
+                    ticket.listener(ahead, self.expected_wait(ahead))
+                except Exception as e:
+                    logger.debug(f"Queue listener of {ticket.client_key} failed: {e}")
+
+    def _withdraw(self: "OpenAIScheduler", ticket: _Ticket) -> None:
+        queue = self._queues.get(ticket.client_key)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.client_key]
+        self._dispatch()
+
+    async def run(
+        self: "OpenAIScheduler",
+        client_key: str,
+        func: Callable[[], Awaitable[T]],
+        listener: Optional[QueueListener] = None,
+    ) -> T:
+        """Await ``func()`` once a slot is free for ``client_key``."""
+        queue = self._queues.get(client_key, ())
+        if len(queue) >= self.per_client or self.queued >= self.max_queued:
+            self.rejected += 1
+            raise SchedulerBusy("Too many signals in line, please try again soon.")
+        # Worst case: every other client gets a turn before this one
+        ahead = sum(min(len(other), len(queue) + 1) for other in self._queues.values())
+        if self.expected_wait(ahead) > self.max_wait:
+            self.rejected += 1
+            raise SchedulerBusy("The observatory is crowded, please try again soon.")
+
+        ticket = _Ticket(client_key, listener)
+        self._queues.setdefault(client_key, deque()).append(ticket)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.granted), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if ticket.granted.done() and not ticket.granted.cancelled():
+                # The slot came through just now; hand it on
+                self._release()
+            else:
+                ticket.granted.cancel()
+                self._withdraw(ticket)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected += 1
+            raise SchedulerBusy("The observatory is crowded, please try again soon.")
+
+        waited = time.monotonic() - ticket.enqueued
+        self._waits.append(waited)
+        if waited > 1:
+            logger.info(f"⏳ OpenAI call of {client_key} waited {waited:.1f}s")
+        started = time.monotonic()
+        try:
+            return await func()
+        finally:
+            self._durations.append(time.monotonic() - started)
+            self._release()
+
+    def _release(self: "OpenAIScheduler") -> None:
+        self._running -= 1
+        self._dispatch()
+
+    def stats(self: "OpenAIScheduler") -> Dict:
+        return {
+            "running": self._running,
+            "concurrency": self.concurrency,
+            "queued": self.queued,
+            "queued_per_client": {
+                key: len(queue) for key, queue in self._queues.items()
+            },
+            "avg_wait_seconds": (
+                round(sum(self._waits) / len(self._waits), 3) if self._waits else 0.0
+            ),
+            "avg_call_seconds": round(self.call_seconds(), 3),
+            "rejected": self.rejected,
+        }
+
+
+openai_scheduler = OpenAIScheduler()
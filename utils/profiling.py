@@ -0,0 +1,215 @@
+import bisect
+import cProfile
+import functools
+import inspect
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from utils.logger import get_logger
+
+try:
+    import pyinstrument
+except ImportError:  # cProfile only
+    pyinstrument = None
+
+logger = get_logger(__name__)
+
+# Stage timings are only recorded with PROFILE_PAGES=true
+PROFILING = os.getenv("PROFILE_PAGES", "false").lower() == "true"
+
+# Write a full trace of every Nth render of a page (0 disables traces)
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "logs/profiles"))
+
+# Upper bounds of the histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Trace files listed by the stats, most recent last
+MAX_TRACES = 20
+
+
+class StageHistogram:
+    """Durations of one render stage, bucketed by ``BUCKETS_MS``."""
+
+    def __init__(self: "StageHistogram") -> None:
+        # One more bucket for everything slower than the last bound
+        self.counts: List[int] = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self: "StageHistogram", duration_ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def quantile(self: "StageHistogram", q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile ``q``."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, seen in zip(BUCKETS_MS, itertools.accumulate(self.counts)):
+            if seen >= rank:
+                return float(bound)
+        return round(self.max_ms, 3)
+
+    def to_dict(self: "StageHistogram") -> Dict:
+        labels = [f"le_{bound}" for bound in BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class _Render:
+    """Clock of the render in progress, moved forward by every ``lap``."""
+
+    def __init__(self: "_Render", page: str) -> None:
+        self.page = page
+        self.start = self.last = time.perf_counter()
+
+
+# Page -> stage -> histogram
+_histograms: Dict[str, Dict[str, StageHistogram]] = {}
+_renders: Dict[str, "itertools.count[int]"] = {}
+_traces: deque = deque(maxlen=MAX_TRACES)
+_lock = threading.Lock()
+_current: ContextVar[Optional[_Render]] = ContextVar("profiled_render", default=None)
+
+
+def _record(page: str, stage: str, seconds: float) -> None:
+    with _lock:
+        stages = _histograms.setdefault(page, {})
+        stages.setdefault(stage, StageHistogram()).record(seconds * 1000)
+
+
+def lap(stage: str) -> None:
+    """
+    Record the time since the previous lap (or the start) as ``stage``.
+
+    Does nothing outside a ``profiled`` render, or when profiling is off.
+    """
+    render = _current.get()
+    if render is None:
+        return
+    now = time.perf_counter()
+    _record(render.page, stage, now - render.last)
+    render.last = now
+
+
+def _render_number(page: str) -> int:
+    with _lock:
+        return next(_renders.setdefault(page, itertools.count(1)))
+
+
+def _start_trace(number: int):
+    if not PROFILE_SAMPLE_EVERY or number % PROFILE_SAMPLE_EVERY:
+        return None
+    if pyinstrument:
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+
+def _write_trace(page: str, number: int, profiler) -> None:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"{page}-{time.strftime('%Y%m%d-%H%M%S')}-{number}"
+    if pyinstrument:
+        profiler.stop()
+        path = PROFILE_DIR / f"{name}.html"
+        path.write_text(profiler.output_html())
+    else:
+        profiler.disable()
+        path = PROFILE_DIR / f"{name}.prof"
+        profiler.dump_stats(path)
+    _traces.append(str(path))
+    logger.info(f"🔬 Wrote {page} render trace to {path}")
+
+
+def profiled(page: str) -> Callable:
+    """
+    Time a page render and its ``lap`` stages under ``page``.
+
+    The whole render is recorded as the ``total`` stage. Every
+    ``PROFILE_SAMPLE_EVERY``-th synchronous render is also traced to
+    ``PROFILE_DIR``; coroutines are not traced, since the profiler would
+    charge them for whatever else runs while they await.
+    Without ``PROFILE_PAGES`` the function is returned untouched.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if not PROFILING:
+            return func
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                render = _Render(page)
+                token = _current.set(render)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _current.reset(token)
+                    _record(page, "total", time.perf_counter() - render.start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            render = _Render(page)
+            token = _current.set(render)
+            number = _render_number(page)
+            profiler = _start_trace(number)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current.reset(token)
+                _record(page, "total", time.perf_counter() - render.start)
+                if profiler is not None:
+                    try:
+                        _write_trace(page, number, profiler)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Could not write {page} trace: {e}")
+
+        return wrapper
+
+    return decorator
+
+
+def profile_stats() -> Dict:
+    """Per-page stage histograms and the most recent trace files."""
+    with _lock:
+        pages = {
+            page: {stage: hist.to_dict() for stage, hist in stages.items()}
+            for page, stages in _histograms.items()
+        }
+    return {
+        "enabled": PROFILING,
+        "sample_every": PROFILE_SAMPLE_EVERY,
+        "tracer": "pyinstrument" if pyinstrument else "cProfile",
+        "pages": pages,
+        "traces": list(_traces),
+    }
+
+
+def reset_profile_stats() -> None:
+    with _lock:
+        _histograms.clear()
+        _traces.clear()
@@ -0,0 +1,201 @@
+import copy
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from db.db import DB_DIR
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FILE = DB_DIR / "project_cache.json"
+
+# Answers are reused for a day by default: the question changes with the muse
+PROJECT_CACHE_TTL = float(os.getenv("PROJECT_CACHE_TTL", str(24 * 3600)))
+PROJECT_CACHE_SIZE = int(os.getenv("PROJECT_CACHE_SIZE", "1000"))
+
+# Cosine similarity above which two inspirations get the same projects
+PROJECT_CACHE_SIMILARITY = float(os.getenv("PROJECT_CACHE_SIMILARITY", "0.9"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_input(user_input: str) -> str:
+    """Lowercase words only, so case, punctuation and spacing don't matter."""
+    return " ".join(_WORD.findall(user_input.lower()))
+
+
+def _terms(normalized: str) -> Counter:
+    # Bigrams keep reworded sentences apart from their bag of words
+    words = normalized.split()
+    return Counter(words + [" ".join(pair) for pair in zip(words, words[1:])])
+
+
+def cosine_similarity(a: Counter, b: Counter) -> float:
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    if not dot:
+        return 0.0
+    norm_a = math.sqrt(sum(count * count for count in a.values()))
+    norm_b = math.sqrt(sum(count * count for count in b.values()))
+    return dot / (norm_a * norm_b)
+
+
+class ProjectCache:
+    """
+    Project answers keyed on (muse, question, normalized input).
+
+    Entries expire after ``ttl`` seconds and the least recently used go first
+    once there are more than ``max_entries``. Lookups also accept an earlier
+    input of the same muse and question whose term vector is at least
+    ``similarity`` close. The entries are written to ``path`` on every store,
+    so a restart keeps them.
+    """
+
+    def __init__(
+        self: "ProjectCache",
+        path: Path = CACHE_FILE,
+        ttl: float = PROJECT_CACHE_TTL,
+        max_entries: int = PROJECT_CACHE_SIZE,
+        similarity: float = PROJECT_CACHE_SIMILARITY,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        # Key -> entry, least recently used first
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        # Terms of each entry's input, for near-duplicate lookups
+        self._terms: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(muse: str, question: str, normalized: str) -> str:
+        raw = json.dumps([muse, question, normalized])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self: "ProjectCache") -> None:
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable project cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, entry in entries:
+            if now - entry["stored_at"] < self.ttl:
+                self._entries[key] = entry
+                self._terms[key] = _terms(entry["input"])
+        logger.info(f"♻️ Loaded {len(self._entries)} cached project answers")
+
+    def _drop(self: "ProjectCache", key: str) -> None:
+        self._entries.pop(key, None)
+        self._terms.pop(key, None)
+
+    def _evict(self: "ProjectCache", now: float) -> None:
+        for key in [
+            key
+            for key, entry in self._entries.items()
+            if now - entry["stored_at"] >= self.ttl
+        ]:
+            self._drop(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _find(
+        self: "ProjectCache", muse: str, question: str, normalized: str
+    ) -> Tuple[Optional[str], float]:
+        key = self._key(muse, question, normalized)
+        if key in self._entries:
+            return key, 1.0
+        terms = _terms(normalized)
+        best, best_score = None, 0.0
+        for other, entry in self._entries.items():
+            if entry["muse"] != muse or entry["question"] != question:
+                continue
+            score = cosine_similarity(terms, self._terms[other])
+            if score > best_score:
+                best, best_score = other, score
+        if best_score >= self.similarity:
+            return best, best_score
+        return None, best_score
+
+    def get(
+        self: "ProjectCache", muse: str, question: str, user_input: str
+    ) -> Optional[Dict]:
+        """The cached answer for this input or a near duplicate of it."""
+        normalized = normalize_input(user_input)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._evict(time.time())
+            key, score = self._find(muse, question, normalized)
+            if key is None:
+                self.misses += 1
+                logger.info(f"🔭 Project cache miss (closest match {score:.2f})")
+                return None
+            self._entries.move_to_end(key)
+            if score < 1.0:
+                self.near_hits += 1
+            else:
+                self.hits += 1
+            logger.info(f"♻️ Project cache hit for {muse} (similarity {score:.2f})")
+            return copy.deepcopy(self._entries[key]["result"])
+
+    def put(
+        self: "ProjectCache", muse: str, question: str, user_input: str, result: Dict
+    ) -> None:
+        """Store an answer and write the cache to disk."""
+        normalized = normalize_input(user_input)
+        key = self._key(muse, question, normalized)
+        now = time.time()
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._drop(key)
+            self._entries[key] = {
+                "muse": muse,
+                "question": question,
+                "input": normalized,
+                "result": copy.deepcopy(result),
+                "stored_at": now,
+            }
+            self._terms[key] = _terms(normalized)
+            self._evict(now)
+            self._save()
+
+    def _save(self: "ProjectCache") -> None:
+        # Written next to the file, then swapped in: readers never see half of it
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._entries.items()), f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"❌ Could not write project cache {self.path}: {e}")
+
+    def stats(self: "ProjectCache") -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+            }
+
+
+project_cache = ProjectCache()
@@ -0,0 +1,136 @@
+import asyncio
+import copy
+import fcntl
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Lock and result files of keys unused for this long are removed, in seconds
+STALE_AFTER = 3600.0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent coroutine calls that share a key into one.
+
+    The first caller starts the call as a task of its own, so it keeps going
+    for the others even if that caller is cancelled; callers arriving while
+    it runs wait for the same task and get a copy of its result.
+    """
+
+    def __init__(self: "SingleFlight", name: str) -> None:
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(
+        self: "SingleFlight", key: Hashable, func: Callable[[], Awaitable[T]]
+    ) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            return await asyncio.shield(task)
+
+        self.shared += 1
+        logger.info(f"🛰️ Joining the {self.name} call already in flight")
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def in_flight(self: "SingleFlight", key: Hashable) -> bool:
+        """Whether a call for ``key`` is running, so that ``do`` would join it."""
+        return key in self._calls
+
+    def stats(self: "SingleFlight") -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "shared": self.shared,
+        }
+
+
+class FileSingleFlight:
+    """
+    Coalesce identical calls across threads and processes sharing ``directory``.
+
+    Callers with the same key take turns on an ``flock``; whoever gets it
+    first makes the call and leaves the result next to the lock. The ones
+    that were waiting meanwhile read that result instead of calling again,
+    while callers arriving afterwards start a new call. The files of keys
+    nobody has used for ``STALE_AFTER`` seconds are removed after each call.
+    """
+
+    def __init__(self: "FileSingleFlight", directory: Path, name: str) -> None:
+        self.directory = directory
+        self.name = name
+
+    def do(
+        self: "FileSingleFlight",
+        key: str,
+        func: Callable[[], T],
+        encode: Callable[[T], Any],
+        decode: Callable[[Any], T],
+    ) -> T:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        stem = self.directory / f".{self.name}-{digest}"
+        result_path = stem.with_suffix(".json")
+        started = time.time()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(stem.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            # Marks the key as in use, so its files aren't removed as stale
+            os.utime(fd)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if result_path.stat().st_mtime >= started:
+                    with open(result_path, "r", encoding="utf-8") as f:
+                        logger.info(f"🛰️ Reusing the {self.name} result of {key}")
+                        return decode(json.load(f))
+            except (OSError, ValueError):
+                pass
+
+            result = func()
+            tmp_path = result_path.with_suffix(".tmp")
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(encode(result), f)
+                os.replace(tmp_path, result_path)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not share the {self.name} result: {e}")
+            return result
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+            self._remove_stale()
+
+    def _remove_stale(self: "FileSingleFlight") -> None:
+        """Delete the files of keys unused for ``STALE_AFTER`` seconds."""
+        cutoff = time.time() - STALE_AFTER
+        for path in self.directory.glob(f".{self.name}-*"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                if path.suffix != ".lock":
+                    path.unlink()
+                    continue
+                fd = os.open(path, os.O_RDWR)
+                try:
+                    # A lock someone still holds stays
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    path.unlink()
+                finally:
+                    os.close(fd)
+            except OSError:
+                continue